@@ -0,0 +1,180 @@
+"""
+Adaptive Rate Controller
+========================
+
+AIMD (additive increase, multiplicative decrease) pacing for snapshot
+requests to web.archive.org, replacing the fixed pauses of the scrapers'
+get_snapshot_content(): `base_delay + random.uniform(1, 5)` seconds before
+every request, a doubled `base_delay` after a non-200 response and
+`(2 ** attempt) * 60` seconds after a connection error. Those were too slow
+while the archive was healthy and ignored `Retry-After`.
+
+Key Features:
+- Requests are spaced `1 / rate` seconds apart (with a little jitter),
+  shared by all threads of the process
+- Every fast 200 response raises the rate by `increase` requests/second,
+  up to `max_rate`
+- 429, 5xx, connection errors and latency spikes (a response slower than
+  `latency_factor` times the running mean) multiply the rate by
+  `decrease`, down to `min_rate`
+- `Retry-After` (seconds or an HTTP date) holds every request back until
+  the time the server asked for
+- Metrics: current rate, error ratio over the last `window` responses,
+  429s, Retry-After waits and latency spikes
+
+Usage:
+    controller = get_rate_controller()
+    response = controller.call(lambda: get_transport().get(url, timeout=30))
+    print(controller.rate, controller.error_ratio)
+    controller.report()
+
+Author: ISB Fintech Research Team
+Project: Historical App Data Collection
+Institution: Indian School of Business (ISB)
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), else None"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        return None
+    return max(when.timestamp() - (time.time() if now is None else now), 0.0)
+
+
+class AdaptiveRateController:
+    """Thread-safe AIMD request pacing driven by response status, latency and Retry-After"""
+
+    def __init__(self, initial_rate=0.1, min_rate=1 / 120, max_rate=1.0, increase=0.02, decrease=0.5,
+                 latency_factor=3.0, window=50, jitter=0.2, max_retry_after=900):
+        self.rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.jitter = jitter
+        self.max_retry_after = max_retry_after
+        self.lock = threading.Lock()
+        self.next_at = 0.0
+        self.hold_until = 0.0
+        self.mean_latency = None
+        self.outcomes = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+        self.retry_after_waits = 0
+        self.latency_spikes = 0
+        self.peak_rate = initial_rate
+
+    @property
+    def error_ratio(self):
+        """Share of 429/5xx/failed requests among the last `window` responses"""
+        return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def metrics(self):
+        return {
+            'rate': self.rate,
+            'error_ratio': self.error_ratio,
+            'requests': self.requests,
+            'errors': self.errors,
+            'throttled': self.throttled,
+            'retry_after_waits': self.retry_after_waits,
+            'latency_spikes': self.latency_spikes,
+            'mean_latency': self.mean_latency,
+        }
+
+    def wait(self):
+        """
+        Block until this caller's request slot; slots are 1 / rate seconds
+        apart and none fires before a Retry-After deadline, including slots
+        reserved before the deadline was set
+        """
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                slot = max(now, self.next_at, self.hold_until)
+                interval = 1 / self.rate
+                self.next_at = slot + interval * (1 + random.uniform(0, self.jitter))
+            if slot > now:
+                time.sleep(slot - now)
+            with self.lock:
+                if time.monotonic() >= self.hold_until:
+                    return
+            # A Retry-After arrived while this caller slept: queue again behind it
+
+    def _back_off(self):
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+
+    def record(self, status, latency, retry_after=None):
+        """Adjust the rate for one response (status None for a failed request)"""
+        with self.lock:
+            self.requests += 1
+            error = status is None or status == 429 or status >= 500
+            self.outcomes.append(error)
+            if error:
+                self.errors += 1
+                self.throttled += int(status == 429)
+                self._back_off()
+                delay = parse_retry_after(retry_after)
+                if delay is not None:
+                    # Nothing is sent before the time the server asked for
+                    self.retry_after_waits += 1
+                    self.hold_until = max(self.hold_until, time.monotonic() + min(delay, self.max_retry_after))
+                    self.next_at = max(self.next_at, self.hold_until)
+                return
+            if status != 200:
+                return  # e.g. 404: says nothing about the archive's load
+
+            spike = self.mean_latency is not None and latency > self.latency_factor * self.mean_latency
+            if spike:
+                self.latency_spikes += 1
+                self._back_off()
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+                self.peak_rate = max(self.peak_rate, self.rate)
+            self.mean_latency = latency if self.mean_latency is None else 0.8 * self.mean_latency + 0.2 * latency
+
+    def call(self, send):
+        """wait(), then send() timed and recorded; a raised exception counts as an error"""
+        self.wait()
+        start = time.perf_counter()
+        try:
+            response = send()
+        except Exception:
+            self.record(None, time.perf_counter() - start)
+            raise
+        self.record(response.status_code, time.perf_counter() - start, response.headers.get('Retry-After'))
+        return response
+
+    def report(self):
+        latency = f"{self.mean_latency * 1000:.0f} ms" if self.mean_latency is not None else "n/a"
+        print(f"Rate controller: {self.rate:.3f} req/s now (peak {self.peak_rate:.3f}), "
+              f"error ratio {self.error_ratio:.1%} over the last {len(self.outcomes)} responses")
+        print(f"  {self.requests} requests, {self.errors} errors ({self.throttled} x 429), "
+              f"{self.retry_after_waits} Retry-After waits, {self.latency_spikes} latency spikes, "
+              f"mean latency {latency}")
+
+
+# Shared controller, created on first use
+_controller = None
+
+
+def get_rate_controller():
+    """Controller pacing every snapshot request of this process"""
+    global _controller
+    if _controller is None:
+        _controller = AdaptiveRateController()
+    return _controller
@@ -1,9 +1,13 @@
 import os
+import csv
+import math
 import pandas as pd
 import json
 import time
 import requests
 import google.generativeai as genai
+from fintech_data_cleaner_standardizer import read_snapshot_csv
+from llm_batch_cleaner import BatchRecordCleaner, TierStats, clean_frame_tiered
 # Set your Gemini API key and endpoint (update these values based on actual API details)
 GEMINI_API_KEY = "API_KEY"
 GEMINI_ENDPOINT = "https://api.generativeai.googleapis.com/v1beta2/models/YOUR_MODEL:generateText"  # 
@@ -42,17 +46,87 @@ def clean_record_gemini(record):
         print("Error cleaning record with Gemini:", e)
         return record
 
-# Load the CSV file
-df = pd.read_csv("output_lxml_hdfc.csv", encoding='utf-8')
-cleaned_records = []
+# Rows per chunk when streaming the CSV; None loads the whole file
+CHUNK_SIZE = 10000
 
-for i, row in df.iterrows():
-    record = row.to_dict()
-    cleaned = clean_record_gemini(record)
-    cleaned_records.append(cleaned)
-    time.sleep(1)
+# Batch mode: records per prompt, prompts in flight and the response cache;
+# BATCH_SIZE = None sends one request per row as before
+BATCH_SIZE = 20
+MAX_IN_FLIGHT = 4
+CACHE_PATH = "gemini_cleaning_cache.sqlite"
 
-# Save cleaned data to CSV
-cleaned_df = pd.DataFrame(cleaned_records)
-cleaned_df.to_csv("output_lxml_cleaned_gemini.csv", index=False, encoding='utf-8')
-print("Cleaned CSV (using Gemini) written to output_lxml_cleaned_gemini.csv")
+# Tiered mode: deterministic rules first, Gemini only for the rows they cannot normalize
+TIERED = True
+
+def csv_value(value):
+    """CSV cell for a cleaned value; missing values become empty cells"""
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return value
+
+def clean_csv_gemini(input_csv, output_csv, chunksize=None, batch_size=None):
+    """
+    Clean every row of a snapshot CSV with Gemini. Rows are written with the
+    input's columns as they are cleaned, so with chunksize only one chunk is
+    held in memory and the output is the same as for a whole-file read.
+    With batch_size, each chunk goes through a cached, concurrent
+    BatchRecordCleaner instead of one request per row.
+    """
+    frames = read_snapshot_csv(input_csv, chunksize) if chunksize else [read_snapshot_csv(input_csv)]
+    if batch_size:
+        batch_cleaner = BatchRecordCleaner(GEMINI_ENDPOINT, GEMINI_API_KEY, batch_size=batch_size,
+                                           max_in_flight=MAX_IN_FLIGHT, cache_path=CACHE_PATH)
+    rows = 0
+    with open(output_csv, 'w', newline='', encoding='utf-8') as out:
+        writer = None
+        for df in frames:
+            if writer is None:
+                # Keys the model adds beyond the input columns are dropped
+                writer = csv.DictWriter(out, fieldnames=list(df.columns), extrasaction='ignore')
+                writer.writeheader()
+            if batch_size:
+                for cleaned in batch_cleaner.clean(df.to_dict('records')):
+                    writer.writerow({k: csv_value(v) for k, v in cleaned.items()})
+                    rows += 1
+            else:
+                for i, row in df.iterrows():
+                    record = row.to_dict()
+                    cleaned = clean_record_gemini(record)
+                    writer.writerow({k: csv_value(v) for k, v in cleaned.items()})
+                    rows += 1
+                    time.sleep(1)
+            out.flush()
+    if batch_size:
+        batch_cleaner.report()
+        batch_cleaner.close()
+    return rows
+
+def clean_csv_tiered(input_csv, output_csv, chunksize=None, batch_size=BATCH_SIZE):
+    """
+    Tiered cleaning of a snapshot CSV: vectorized rules for every row, Gemini
+    (batched and cached) only for the rows the rule validator flags. The
+    output has the rule cleaner's format, and the hit rate of each tier is
+    reported at the end.
+    """
+    frames = read_snapshot_csv(input_csv, chunksize) if chunksize else [read_snapshot_csv(input_csv)]
+    batch_cleaner = BatchRecordCleaner(GEMINI_ENDPOINT, GEMINI_API_KEY, batch_size=batch_size or 1,
+                                       max_in_flight=MAX_IN_FLIGHT, cache_path=CACHE_PATH)
+    stats = TierStats()
+    with open(output_csv, 'w', newline='', encoding='utf-8') as out:
+        for i, df in enumerate(frames):
+            clean_frame_tiered(df, batch_cleaner, stats).to_csv(out, header=(i == 0), index=False)
+    stats.report()
+    batch_cleaner.report()
+    batch_cleaner.close()
+    return stats.rows
+
+def main(input_csv="output_lxml_hdfc.csv", output_csv="output_lxml_cleaned_gemini.csv",
+         chunksize=CHUNK_SIZE, batch_size=BATCH_SIZE, tiered=TIERED):
+    if tiered:
+        rows = clean_csv_tiered(input_csv, output_csv, chunksize, batch_size)
+    else:
+        rows = clean_csv_gemini(input_csv, output_csv, chunksize, batch_size)
+    print(f"Cleaned CSV (using Gemini) written to {output_csv} ({rows} rows)")
+
+if __name__ == "__main__":
+    main()
@@ -1,59 +1,59 @@
-import requests
 import pandas as pd
 from bs4 import BeautifulSoup
-import random
-import time
 from datetime import datetime
-import csv
 import os
-from urllib.parse import quote
 from requests.exceptions import ConnectionError
+from snapshot_store import CaptureDeduplicator, SnapshotStore
+from progress_ledger import ProgressLedger
+from buffered_csv_writer import open_record_writer
+from wayback_http_transport import get_transport
+from adaptive_rate_controller import get_rate_controller
+from cdx_discovery import get_cdx_discovery, plan_discovery
+from snapshot_sampling_planner import SamplingPlanner
 
-# Disable SSL warnings
-import urllib3
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+# Record output: "csv" or "parquet" (dataset partitioned by app and year)
+OUTPUT_FORMAT = "csv"
+
+# Snapshot discovery for all apps before fetching: "concurrent" per-app
+# CDX queries (DISCOVERY_WORKERS at a time) or one "prefix" scan
+DISCOVERY_MODE = "concurrent"
+DISCOVERY_WORKERS = 8
+
+# Captures fetched per app: one per "week"/"month"/"quarter"/"year" (None: all
+# discovered), optionally capped at SAMPLES_PER_APP spread over the period
+SAMPLING_CADENCE = "month"
+SAMPLES_PER_APP = None
+
+# Shared snapshot store, opened on first use
+SNAPSHOT_STORE_DIR = "html_snapshots/store"
+_snapshot_store = None
+
+def get_snapshot_store():
+    global _snapshot_store
+    if _snapshot_store is None:
+        _snapshot_store = SnapshotStore(SNAPSHOT_STORE_DIR)
+    return _snapshot_store
 
 def get_wayback_snapshots(url):
-    """Get all available snapshots from Wayback Machine for a URL"""
-    encoded_url = quote(url, safe='')
-    cdx_api_url = f"https://web.archive.org/cdx/search/cdx?url={encoded_url}&output=json&fl=timestamp,original,statuscode,digest,length&filter=statuscode:200&collapse=timestamp:6"
-    
-    try:
-        response = requests.get(cdx_api_url, verify=False)
-        if response.status_code == 200:
-            snapshots = response.json()
-            # Remove header row
-            if snapshots and len(snapshots) > 0:
-                return snapshots[1:]
-            return []
-        else:
-            print(f"Failed to get snapshots: {response.status_code}")
-            return []
-    except Exception as e:
-        print(f"Error getting snapshots: {e}")
-        return []
+    """Get all available snapshots from Wayback Machine for a URL (paged, resumable, cached)"""
+    return get_cdx_discovery().snapshots(url)
 
-def get_snapshot_content(timestamp, url, max_retries=3, base_delay=10):
-    """Get the content of a specific snapshot with retry logic"""
+def get_snapshot_content(timestamp, url, max_retries=3):
+    """Get the content of a specific snapshot with retry logic, paced by the rate controller"""
     wayback_url = f"https://web.archive.org/web/{timestamp}/{url}"
     
     for attempt in range(max_retries):
         try:
-            delay = base_delay + random.uniform(1, 5)
-            print(f"Waiting {delay:.2f} seconds before request...")
-            time.sleep(delay)
-            
-            response = requests.get(wayback_url, timeout=30, verify=False)
+            # Waits for the next request slot; 429/5xx/errors slow the rate, Retry-After is honoured
+            response = get_rate_controller().call(
+                lambda: get_transport().get(wayback_url, timeout=30)
+            )
             if response.status_code == 200:
                 return response.text
             else:
                 print(f"Failed to get snapshot content: {response.status_code}")
-                base_delay *= 2
         except ConnectionError as e:
             print(f"Connection error on attempt {attempt+1}/{max_retries}: {e}")
-            wait_time = (2 ** attempt) * 60 + random.uniform(1, 30)
-            print(f"Waiting {wait_time:.2f} seconds before retrying...")
-            time.sleep(wait_time)
     
     return None
 
@@ -209,37 +209,16 @@ def extract_app_data(html_content):
     
     return app_data
 
-def save_html_to_file(app_id, timestamp, html_content):
-    """Save the complete HTML content to a text file in the app's dedicated directory"""
-    # Create subdirectory for the app_id inside html_snapshots
-    html_dir = os.path.join("html_snapshots", app_id + "_data")
-    if not os.path.exists(html_dir):
-        os.makedirs(html_dir)
-    
-    # Format timestamp for filename
-    formatted_date = datetime.strptime(timestamp, '%Y%m%d%H%M%S').strftime('%Y%m%d_%H%M%S')
-    filename = os.path.join(html_dir, f"{app_id}_app_{formatted_date}.html")
-    
+def save_html_to_file(app_id, timestamp, html_content, digest=None, original_url=None):
+    """Save the complete HTML content to the content-addressed snapshot store"""
     try:
-        with open(filename, 'w', encoding='utf-8') as file:
-            file.write(html_content)
-        return True, filename
+        store = get_snapshot_store()
+        digest = store.put(app_id, timestamp, html_content, digest=digest, original_url=original_url)
+        return True, store.ref(digest)
     except Exception as e:
-        print(f"Error saving HTML to file: {e}")
+        print(f"Error saving HTML to snapshot store: {e}")
         return False, None
 
-def save_to_csv(app_data, csv_filename, fields):
-    """Save a single entry to CSV file"""
-    file_exists = os.path.isfile(csv_filename)
-    
-    with open(csv_filename, 'a', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fields)
-        
-        if not file_exists:
-            writer.writeheader()
-        
-        writer.writerow(app_data)
-
 def main():
     # Read the list of app IDs from the file
     app_list_file = "arch_scraper_app_list.txt"
@@ -258,43 +237,58 @@ def main():
         'html_file'
     ]
     
-    progress_file = "scraping_progress.txt"
-    processed_snapshots = set()
+    # Resume state lives in the ledger; the legacy text file is imported once
+    ledger = ProgressLedger("scraping_progress.sqlite")
+    ledger.import_progress_file("scraping_progress.txt")
+    
+    dedup = CaptureDeduplicator(get_snapshot_store(), extract_app_data)
+    writer = open_record_writer(OUTPUT_FORMAT, csv_filename, fields, ledger=ledger)
     
-    if os.path.exists(progress_file):
-        with open(progress_file, 'r') as f:
-            processed_snapshots = set(line.strip() for line in f)
+    # Discover every app's snapshots up front; the loop below reads the cache
+    plan = plan_discovery(app_ids, mode=DISCOVERY_MODE, max_workers=DISCOVERY_WORKERS)
+    planner = SamplingPlanner(SAMPLING_CADENCE, SAMPLES_PER_APP, seconds_per_request=1 / get_rate_controller().rate)
+    planner.report(planner.estimate(plan, is_done=ledger.is_done, known_digest=get_snapshot_store().has_blob))
     
     # Process each app_id from the list
     for app_id in app_ids:
         target_url = f"https://play.google.com/store/apps/details?id={app_id}"
         print(f"\nFetching snapshots for {target_url}...")
-        snapshots = get_wayback_snapshots(target_url)
-        print(f"Found {len(snapshots)} snapshots for {app_id}")
+        discovered = get_wayback_snapshots(target_url)
+        snapshots = planner.select(discovered)
+        print(f"Found {len(discovered)} snapshots for {app_id}, {len(snapshots)} selected")
         
         for i, snapshot in enumerate(snapshots):
             timestamp = snapshot[0]
             original_url = snapshot[1]
-            # Create a unique key for the app and snapshot timestamp.
-            progress_key = f"{app_id}|{timestamp}"
-            if progress_key in processed_snapshots:
-                print(f"Skipping already processed snapshot {i+1}/{len(snapshots)} for {app_id} from {timestamp}")
-                continue
-            progress_key2 = f"{app_id}_data|{timestamp}"
-            if progress_key2 in processed_snapshots:
+            if ledger.is_done(app_id, timestamp):
                 print(f"Skipping already processed snapshot {i+1}/{len(snapshots)} for {app_id} from {timestamp}")
                 continue
             readable_date = datetime.strptime(timestamp, '%Y%m%d%H%M%S').strftime('%Y-%m-%d %H:%M:%S')
             print(f"Processing snapshot {i+1}/{len(snapshots)} for {app_id} from {readable_date}...")
+            digest = snapshot[3] if len(snapshot) > 3 else None
+            
+            # Identical digest already fetched: reuse its parsed record, no request
+            app_data = dedup.reuse(app_id, snapshot)
+            if app_data is not None:
+                app_data['app_id'] = app_id
+                app_data['timestamp'] = timestamp
+                app_data['snapshot_url'] = f"https://web.archive.org/web/{timestamp}/{original_url}"
+                app_data['html_file'] = get_snapshot_store().ref(digest)
+                writer.writerow(app_data, progress=(app_id, timestamp))
+                print(f"Reused data for duplicate snapshot from {readable_date} for app {app_id}")
+                continue
             
             content = get_snapshot_content(timestamp, original_url)
             
             if content:
-                # Save the complete HTML to a file in the app's directory
-                html_saved, html_filename = save_html_to_file(app_id, timestamp, content)
+                # Save the complete HTML to the snapshot store
+                html_saved, html_filename = save_html_to_file(
+                    app_id, timestamp, content, digest=digest, original_url=original_url
+                )
                 
                 # Extract app data
                 app_data = extract_app_data(content)
+                dedup.remember(app_id, digest, app_data)
                 app_data['app_id'] = app_id
                 app_data['timestamp'] = timestamp
                 app_data['snapshot_url'] = f"https://web.archive.org/web/{timestamp}/{original_url}"
@@ -303,23 +297,22 @@ def main():
                 else:
                     app_data['html_file'] = "Failed to save HTML"
                 
-                # Append the progress_key to the progress file
-                with open(progress_file, 'a') as f:
-                    f.write(f"{progress_key}\n")
-                
-                # Save the data row to CSV
-                save_to_csv(app_data, csv_filename, fields)
+                # Save the data row; its ledger mark is committed once the row is fsynced
+                writer.writerow(app_data, progress=(app_id, timestamp))
                 
                 print(f"Data extracted and saved for snapshot from {readable_date} for app {app_id}")
                 if html_saved:
-                    print(f"HTML content saved to {html_filename}")
+                    print(f"HTML content saved as {html_filename}")
             else:
                 print(f"Skipping snapshot from {readable_date} for {app_id} - could not retrieve content")
-            
-            # Pause briefly between snapshots to be gentle on the server.
-            time.sleep(1)
     
-    print(f"\nAll data has been saved to {csv_filename}")
+    writer.close()
+    ledger.close()
+    dedup.report()
+    get_cdx_discovery().report()
+    get_transport().report()
+    get_rate_controller().report()
+    print(f"\nAll data has been saved to {writer.path}")
 
 if __name__ == "__main__":
     main()
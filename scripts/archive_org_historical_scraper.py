@@ -1,21 +1,27 @@
-import requests
 import pandas as pd
 from bs4 import BeautifulSoup
-import random
-import time
 from datetime import datetime
-import csv
 import os
-from urllib.parse import quote
+from urllib.parse import parse_qs, urlparse
 from requests.exceptions import ConnectionError
-
-# Disable SSL warnings
-import urllib3
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from progress_ledger import ProgressLedger
+from buffered_csv_writer import open_record_writer
+from wayback_http_transport import get_transport
+from adaptive_rate_controller import get_rate_controller
+from cdx_discovery import get_cdx_discovery
+from snapshot_sampling_planner import SamplingPlanner
 
 # Target URL
 target_url = "https://play.google.com/store/apps/details?id=com.indiainfoline"
 
+# Record output: "csv" or "parquet" (dataset partitioned by app and year)
+OUTPUT_FORMAT = "csv"
+
+# Captures fetched: one per "week"/"month"/"quarter"/"year" (None: all
+# discovered), optionally capped at SAMPLES_PER_APP spread over the period
+SAMPLING_CADENCE = "month"
+SAMPLES_PER_APP = None
+
 # User agent
 headers = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:125.0) Gecko/20100101 Firefox/125.0",
@@ -33,49 +39,25 @@ headers = {
 }
 
 def get_wayback_snapshots(url):
-    """Get all available snapshots from Wayback Machine for a URL"""
-    encoded_url = quote(url, safe='')
-    cdx_api_url = f"https://web.archive.org/cdx/search/cdx?url={encoded_url}&output=json&fl=timestamp,original,statuscode,digest,length&filter=statuscode:200&collapse=timestamp:6"
-    
-    try:
-        response = requests.get(cdx_api_url, headers=headers, verify=False)
-        if response.status_code == 200:
-            snapshots = response.json()
-            # Remove the header row
-            if snapshots and len(snapshots) > 0:
-                return snapshots[1:]
-            return []
-        else:
-            print(f"Failed to get snapshots: {response.status_code}")
-            return []
-    except Exception as e:
-        print(f"Error getting snapshots: {e}")
-        return []
+    """Get all available snapshots from Wayback Machine for a URL (paged, resumable, cached)"""
+    return get_cdx_discovery().snapshots(url, headers=headers)
 
-def get_snapshot_content(timestamp, url, max_retries=3, base_delay=10):
-    """Get the content of a specific snapshot with retry logic"""
+def get_snapshot_content(timestamp, url, max_retries=3):
+    """Get the content of a specific snapshot with retry logic, paced by the rate controller"""
     wayback_url = f"https://web.archive.org/web/{timestamp}/{url}"
     
     for attempt in range(max_retries):
         try:
-            # Add randomization to delay to appear more human-like
-            delay = base_delay + random.uniform(1, 5)
-            print(f"Waiting {delay:.2f} seconds before request...")
-            time.sleep(delay)
-            
-            response = requests.get(wayback_url, headers=headers, verify=False, timeout=30)
+            # Waits for the next request slot; 429/5xx/errors slow the rate, Retry-After is honoured
+            response = get_rate_controller().call(
+                lambda: get_transport().get(wayback_url, headers=headers, timeout=30)
+            )
             if response.status_code == 200:
                 return response.text
             else:
                 print(f"Failed to get snapshot content: {response.status_code}")
-                # Increase delay for next attempt
-                base_delay *= 2
         except ConnectionError as e:
             print(f"Connection error on attempt {attempt+1}/{max_retries}: {e}")
-            # Exponential backoff with jitter
-            wait_time = (2 ** attempt) * 60 + random.uniform(1, 30)
-            print(f"Waiting {wait_time:.2f} seconds before retrying...")
-            time.sleep(wait_time)
     
     return None
 
@@ -254,24 +236,12 @@ def save_html_to_file(timestamp, html_content):
         print(f"Error saving HTML to file: {e}")
         return False
 
-def save_to_csv(app_data, csv_filename, fields):
-    """Save a single entry to CSV file"""
-    file_exists = os.path.isfile(csv_filename)
-    
-    with open(csv_filename, 'a', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fields)
-        
-        # Write header if file doesn't exist
-        if not file_exists:
-            writer.writeheader()
-        
-        # Write the data row
-        writer.writerow(app_data)
-
 def main():
     print(f"Fetching snapshots for {target_url}...")
-    snapshots = get_wayback_snapshots(target_url)
-    print(f"Found {len(snapshots)} snapshots")
+    discovered = get_wayback_snapshots(target_url)
+    planner = SamplingPlanner(SAMPLING_CADENCE, SAMPLES_PER_APP, seconds_per_request=1 / get_rate_controller().rate)
+    snapshots = planner.select(discovered)
+    print(f"Found {len(discovered)} snapshots")
     
     # Create CSV file
     csv_filename = "grow_app_data_timeseries_final_3.csv"
@@ -283,17 +253,17 @@ def main():
         'version', 'size', 'content_rating', 'whats_new', 'full_description',
         'html_file'  # New field to store the HTML file reference
     ]
-    progress_file = "scraping_progress.txt"
-    processed_timestamps = set()
-    
-    if os.path.exists(progress_file):
-        with open(progress_file, 'r') as f:
-            processed_timestamps = set(line.strip() for line in f)
+    # Resume state lives in the ledger; the legacy text file is imported once
+    app_id = parse_qs(urlparse(target_url).query)['id'][0]
+    ledger = ProgressLedger("scraping_progress.sqlite")
+    ledger.import_progress_file("scraping_progress.txt", app_id=app_id)
+    writer = open_record_writer(OUTPUT_FORMAT, csv_filename, fields, ledger=ledger, app_id=app_id)
+    planner.report(planner.estimate({app_id: discovered}, is_done=ledger.is_done))
     # Process each snapshot
     for i, snapshot in enumerate(snapshots):
         timestamp = snapshot[0]
         original_url = snapshot[1]
-        if timestamp in processed_timestamps:
+        if ledger.is_done(app_id, timestamp):
             print(f"Skipping already processed snapshot {i+1}/{len(snapshots)} from {timestamp}")
             continue
         # Convert timestamp to readable date for display
@@ -317,26 +287,26 @@ def main():
             app_data['snapshot_url'] = f"https://web.archive.org/web/{timestamp}/{original_url}"
             
             # Add HTML file reference
+            # Save to CSV; the ledger mark is committed once the row is fsynced
             if html_saved:
                 app_data['html_file'] = html_filename
-                with open(progress_file, 'a') as f:
-                  f.write(f"{timestamp}\n")
+                writer.writerow(app_data, progress=(app_id, timestamp))
             else:
                 app_data['html_file'] = "Failed to save HTML"
-            
-            # Save to CSV
-            save_to_csv(app_data, csv_filename, fields)
+                writer.writerow(app_data)
             
             print(f"Data extracted and saved for snapshot from {readable_date}")
             if html_saved:
                 print(f"HTML content saved to {html_filename}")
         else:
             print(f"Skipping snapshot from {readable_date} - could not retrieve content")
-        
-        # Be nice to the Wayback Machine servers
-        time.sleep(1)
     
-    print(f"All data has been saved to {csv_filename}")
+    writer.close()
+    ledger.close()
+    get_cdx_discovery().report()
+    get_transport().report()
+    get_rate_controller().report()
+    print(f"All data has been saved to {writer.path}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,155 @@
+"""
+Asynchronous Wayback Snapshot Fetcher
+=====================================
+
+Concurrent fetch engine for Wayback Machine snapshots. Several snapshots are
+in flight at once, while the request rate is set by the same
+AdaptiveRateController (adaptive_rate_controller) that paces
+get_snapshot_content(): one pacing authority for every snapshot request of
+the process, with no separate token bucket or fixed backoff.
+
+Requests go through the shared pooled transport (wayback_http_transport) on
+`concurrency` request threads, so they reuse its keep-alive connections and
+count in its connection-reuse and handshake metrics.
+
+Key Features:
+- Bounded pool of in-flight requests (`concurrency`)
+- Every request waits for its controller slot and reports status and
+  latency back: the rate grows while responses are fast 200s and backs off
+  on 429/5xx/errors/latency spikes; Retry-After holds all requests back
+- Up to `max_retries` attempts per snapshot, with no sleep of their own
+- Optional proxy rotation using the scraper's proxy list
+- Results are handed back as each snapshot completes, on the thread that
+  called fetch_snapshots() (the one owning the scraper's SQLite store and
+  ledger connections); the event loop runs on its own thread, so parsing
+  and fsynced writes never block requests in flight
+- A failed snapshot (any exception on every attempt) is reported as None,
+  like get_snapshot_content(), instead of aborting the batch
+
+Throughput grows with `concurrency` until the controller's rate is the
+limit, after which extra concurrency only adds queued requests.
+
+Usage:
+    from async_snapshot_fetcher import fetch_snapshots
+
+    fetch_snapshots(snapshots, on_result, headers=headers, proxies=PROXIES, concurrency=8)
+
+Dependencies:
+    - requests (through wayback_http_transport)
+
+Author: ISB Fintech Research Team
+Project: Comprehensive Fintech App Market Analysis
+Institution: Indian School of Business (ISB)
+"""
+
+import asyncio
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from adaptive_rate_controller import get_rate_controller
+from wayback_http_transport import get_transport
+
+
+class AsyncSnapshotFetcher:
+    """Fetch Wayback snapshots concurrently, paced by the shared rate controller"""
+
+    def __init__(self, headers=None, proxies=None, concurrency=8, max_retries=3, timeout=30,
+                 base_url="https://web.archive.org/web", transport=None, controller=None):
+        self.headers = headers or {}
+        self.proxies = proxies or []
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.base_url = base_url
+        self.transport = transport or get_transport()
+        self.controller = controller or get_rate_controller()
+        self.requests_made = 0
+        self.stopped = False
+
+    def _get(self, url, proxy):
+        """Paced, recorded GET on the shared pooled transport (runs on a request thread)"""
+        proxies = {"http": proxy, "https": proxy} if proxy else None
+        return self.controller.call(
+            lambda: self.transport.get(url, headers=self.headers, proxies=proxies, timeout=self.timeout)
+        )
+
+    async def fetch(self, requests_pool, timestamp, url):
+        """Async counterpart of get_snapshot_content(): returns the HTML text or None"""
+        wayback_url = f"{self.base_url}/{timestamp}/{url}"
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(self.max_retries):
+            if self.stopped:
+                return None
+            proxy = random.choice(self.proxies) if self.proxies else None
+            try:
+                self.requests_made += 1
+                response = await loop.run_in_executor(requests_pool, self._get, wayback_url, proxy)
+                if response.status_code == 200:
+                    return response.text
+                print(f"Failed to get snapshot content for {timestamp}: {response.status_code}")
+            except Exception as e:
+                print(f"Error on attempt {attempt+1}/{self.max_retries} for {timestamp}: {e}")
+
+        return None
+
+    async def run(self, snapshots, on_result):
+        """
+        Fetch every snapshot row and call on_result(snapshot, content) on the
+        event loop as each completes; on_result must not block.
+        """
+        # `concurrency` request threads bound the requests in flight
+        with ThreadPoolExecutor(max_workers=self.concurrency) as requests_pool:
+            async def worker(snapshot):
+                content = await self.fetch(requests_pool, snapshot[0], snapshot[1])
+                return snapshot, content
+
+            tasks = [asyncio.ensure_future(worker(snapshot)) for snapshot in snapshots]
+            for finished in asyncio.as_completed(tasks):
+                on_result(*await finished)
+
+
+def fetch_snapshots(snapshots, on_result, **fetcher_kwargs):
+    """
+    Synchronous entry point: fetch CDX snapshot rows concurrently and report
+    throughput. on_result(snapshot, content) runs on the calling thread, in
+    completion order, while the event loop keeps the next requests in flight.
+    """
+    fetcher = AsyncSnapshotFetcher(**fetcher_kwargs)
+    results = queue.Queue()
+    finished = object()
+    failures = []
+
+    def run_loop():
+        try:
+            asyncio.run(fetcher.run(snapshots, lambda snapshot, content: results.put((snapshot, content))))
+        except Exception as e:
+            failures.append(e)
+        finally:
+            results.put(finished)
+
+    start = time.monotonic()
+    loop_thread = threading.Thread(target=run_loop, name="snapshot-fetcher", daemon=True)
+    loop_thread.start()
+    try:
+        while True:
+            result = results.get()
+            if result is finished:
+                break
+            on_result(*result)
+    except BaseException:
+        # Let the snapshots still queued end without further requests
+        fetcher.stopped = True
+        raise
+    loop_thread.join()
+    if failures:
+        raise failures[0]
+    elapsed = time.monotonic() - start
+    if snapshots and elapsed > 0:
+        print(f"Fetched {len(snapshots)} snapshots with {fetcher.requests_made} requests "
+              f"in {elapsed:.1f}s ({len(snapshots) / elapsed:.2f} snapshots/sec, "
+              f"concurrency={fetcher.concurrency}, controller rate {fetcher.controller.rate:.2f}/s)")
+    return fetcher
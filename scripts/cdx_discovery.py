@@ -0,0 +1,317 @@
+"""
+Paged CDX Discovery
+===================
+
+Resumable snapshot discovery for the Wayback scrapers, replacing one
+unbounded CDX query per app whose whole JSON body was loaded with
+`response.json()` (slow and prone to timeouts for heavily archived apps;
+the entire list was lost on any failure).
+
+Key Features:
+- Pages of `page_size` captures with `limit` + `showResumeKey=true`
+- Rows are parsed from the plain-text CDX output line by line as they
+  arrive, never as one JSON document
+- Rows are appended to `{cache_dir}/{key}.partial` as they stream; after
+  every page the resume key and row count are checkpointed, so an
+  interrupted discovery continues where it stopped (rows of a half-read
+  page are never duplicated)
+- Completed discoveries are cached per URL and query as
+  `{cache_dir}/{key}.cdx` (one capture per line), reused until
+  `max_age_days` old
+- `collapse=timestamp:N` is re-applied across page boundaries
+- `plan_discovery()` builds the whole app -> snapshots plan before any
+  fetching: bounded-concurrency per-app queries, or one
+  `matchType=prefix` scan of the Play Store details URLs filtered locally
+  for our app IDs (which then fills the per-app caches)
+
+Rows have the same fields and order as the previous JSON query (without
+its header row): timestamp, original, statuscode, digest, length.
+
+Usage:
+    discovery = get_cdx_discovery()
+    snapshots = discovery.snapshots(target_url, headers=headers)
+    complete = discovery.is_complete(target_url)
+    plan = plan_discovery(app_ids, mode="concurrent", max_workers=8)
+
+Author: ISB Fintech Research Team
+Project: Historical App Data Collection
+Institution: Indian School of Business (ISB)
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlparse
+
+from wayback_http_transport import get_transport
+
+CDX_ENDPOINT = "https://web.archive.org/cdx/search/cdx"
+PLAY_DETAILS_URL = "https://play.google.com/store/apps/details"
+
+# Fields and filters used by every scraper's snapshot query
+DEFAULT_PARAMS = {
+    'fl': "timestamp,original,statuscode,digest,length",
+    'filter': "statuscode:200",
+    'collapse': "timestamp:6",
+}
+
+
+class CdxDiscovery:
+    """Paged, checkpointed and cached CDX queries"""
+
+    def __init__(self, cache_dir="cdx_cache", page_size=5000, max_age_days=30, transport=None,
+                 endpoint=CDX_ENDPOINT, timeout=60, max_retries=3, retry_delay=10):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.page_size = page_size
+        self.max_age_days = max_age_days
+        self.transport = transport or get_transport()
+        self.endpoint = endpoint
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.lock = threading.Lock()
+        self.pages = 0
+        self.cache_hits = 0
+
+    def _query(self, url, params):
+        query = dict(DEFAULT_PARAMS)
+        query.update(params or {})
+        query['url'] = url
+        # None removes a default parameter (e.g. collapse)
+        return {k: v for k, v in query.items() if v is not None}
+
+    def _paths(self, query, cache_tag=None):
+        key = query if cache_tag is None else [query, cache_tag]
+        digest = hashlib.sha1(json.dumps(key, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        name = re.sub(r'[^A-Za-z0-9._-]+', '_', query['url'])[-80:] + "-" + digest
+        base = os.path.join(self.cache_dir, name)
+        return base + ".cdx", base + ".partial", base + ".resume"
+
+    def _cached(self, path):
+        if not os.path.isfile(path):
+            return False
+        if self.max_age_days is None:
+            return True
+        return time.time() - os.path.getmtime(path) < self.max_age_days * 86400
+
+    def is_complete(self, url, params=None, cache_tag=None):
+        """True if the discovery for url has been read to the end (and is cached)"""
+        return self._cached(self._paths(self._query(url, params), cache_tag)[0])
+
+    def _read_state(self, partial_path, resume_path):
+        """(resume key, rows checkpointed so far) of an interrupted discovery"""
+        if not os.path.isfile(resume_path) or not os.path.isfile(partial_path):
+            return None, []
+        with open(resume_path, 'r') as f:
+            state = json.load(f)
+        with open(partial_path, 'r', encoding='utf-8') as f:
+            rows = [line.split(' ') for line in f.read().splitlines()[:state['rows']]]
+        return state['resume_key'], rows
+
+    def _write_state(self, resume_path, resume_key, rows):
+        with open(resume_path + ".tmp", 'w') as f:
+            json.dump({'resume_key': resume_key, 'rows': rows}, f)
+        os.replace(resume_path + ".tmp", resume_path)
+
+    def _collapse_digits(self, query):
+        match = re.fullmatch(r'timestamp:(\d+)', str(query.get('collapse', '')))
+        return int(match.group(1)) if match else None
+
+    def _stream_page(self, query, resume_key, headers):
+        """Yield the rows of one page, then the page's resume key (or None) as a str"""
+        params = dict(query, limit=self.page_size, showResumeKey='true')
+        if resume_key:
+            params['resumeKey'] = resume_key
+        response = self.transport.get(self.endpoint, params=params, headers=headers,
+                                      timeout=self.timeout, stream=True)
+        try:
+            if response.status_code != 200:
+                raise IOError(f"CDX query failed: HTTP {response.status_code}")
+            blank = False
+            next_key = None
+            for line in response.iter_lines(decode_unicode=True):
+                line = line.strip()
+                if not line:
+                    # A blank line separates the rows from the resume key
+                    blank = True
+                elif blank:
+                    next_key = line
+                else:
+                    yield line.split(' ')
+            yield next_key
+        finally:
+            response.close()
+
+    def iter_snapshots(self, url, params=None, headers=None, row_filter=None, cache_tag=None):
+        """
+        Stream every capture of url, page by page. Rows checkpointed by an
+        earlier interrupted run are yielded first, then discovery resumes
+        from the saved resume key. With row_filter, only rows it accepts are
+        kept (and cached under cache_tag, which must identify the filter).
+        """
+        query = self._query(url, params)
+        done_path, partial_path, resume_path = self._paths(query, cache_tag)
+        digits = self._collapse_digits(query)
+
+        resume_key, rows = self._read_state(partial_path, resume_path)
+        for row in rows:
+            yield row
+        count = len(rows)
+        last_group = rows[-1][0][:digits] if rows and digits else None
+
+        with open(partial_path, 'r+' if resume_key else 'w', encoding='utf-8') as partial:
+            # Drop rows written after the last checkpoint
+            partial.seek(0)
+            partial.writelines(' '.join(row) + "\n" for row in rows)
+            partial.truncate()
+
+            while True:
+                page_rows = 0
+                next_key = None
+                for attempt in range(self.max_retries):
+                    try:
+                        for position, row in enumerate(self._stream_page(query, resume_key, headers)):
+                            if row is None or isinstance(row, str):
+                                next_key = row
+                                break
+                            if position < page_rows:
+                                continue  # yielded before this retry
+                            page_rows += 1
+                            if row_filter is not None and not row_filter(row):
+                                continue
+                            if digits and row[0][:digits] == last_group:
+                                continue  # collapse group continued from the previous page
+                            last_group = row[0][:digits] if digits else None
+                            partial.write(' '.join(row) + "\n")
+                            count += 1
+                            yield row
+                        break
+                    except Exception as e:
+                        if attempt == self.max_retries - 1:
+                            print(f"CDX discovery interrupted for {url} after {count} rows: {e}")
+                            return
+                        wait = self.retry_delay * (2 ** attempt)
+                        print(f"CDX page error ({e}); retrying in {wait}s...")
+                        time.sleep(wait)
+
+                with self.lock:
+                    self.pages += 1
+                partial.flush()
+                os.fsync(partial.fileno())
+                if not next_key:
+                    break
+                resume_key = next_key
+                self._write_state(resume_path, resume_key, count)
+
+        # Complete: the partial file becomes the cached snapshot list
+        os.replace(partial_path, done_path)
+        if os.path.exists(resume_path):
+            os.remove(resume_path)
+
+    def snapshots(self, url, params=None, headers=None, refresh=False, row_filter=None, cache_tag=None):
+        """All captures of url as a list of rows, from the cache when it is fresh"""
+        done_path = self._paths(self._query(url, params), cache_tag)[0]
+        if not refresh and self._cached(done_path):
+            with self.lock:
+                self.cache_hits += 1
+            with open(done_path, 'r', encoding='utf-8') as f:
+                return [line.split(' ') for line in f.read().splitlines()]
+        return list(self.iter_snapshots(url, params, headers, row_filter, cache_tag))
+
+    def store(self, url, rows, params=None):
+        """Cache rows as the complete listing of url (e.g. split out of a prefix scan)"""
+        done_path = self._paths(self._query(url, params))[0]
+        with open(done_path + ".tmp", 'w', encoding='utf-8') as f:
+            f.writelines(' '.join(row) + "\n" for row in rows)
+        os.replace(done_path + ".tmp", done_path)
+
+    def report(self):
+        print(f"CDX discovery: {self.pages} pages fetched, {self.cache_hits} cached snapshot lists reused")
+
+
+# Shared discovery client, opened on first use
+CDX_CACHE_DIR = "cdx_cache"
+_discovery = None
+
+
+def get_cdx_discovery():
+    """Discovery client shared by every scraper running in this process"""
+    global _discovery
+    if _discovery is None:
+        _discovery = CdxDiscovery(CDX_CACHE_DIR)
+    return _discovery
+
+
+def app_url(app_id):
+    return f"{PLAY_DETAILS_URL}?id={app_id}"
+
+
+def app_id_of(original):
+    """App ID of a Play Store details URL with only an id parameter, else None"""
+    parsed = urlparse(original)
+    if not parsed.path.endswith("/store/apps/details"):
+        return None
+    query = parse_qs(parsed.query)
+    if list(query) != ['id'] or len(query['id']) != 1:
+        return None
+    return query['id'][0]
+
+
+def _discover_prefix(app_ids, discovery, headers):
+    """
+    One paged matchType=prefix scan over every Play Store details URL, kept
+    only for our app IDs. CDX collapse compares neighbouring rows across
+    different apps, so collapse=timestamp:N is applied per app locally.
+    """
+    wanted = set(app_ids)
+    params = {'matchType': 'prefix', 'collapse': None}
+    tag = hashlib.sha1("\n".join(sorted(wanted)).encode('utf-8')).hexdigest()
+    rows = discovery.snapshots(PLAY_DETAILS_URL, params, headers,
+                               row_filter=lambda row: app_id_of(row[1]) in wanted, cache_tag=tag)
+
+    digits = discovery._collapse_digits(discovery._query(PLAY_DETAILS_URL, None))
+    plan = {app_id: [] for app_id in app_ids}
+    last_group = {}
+    for row in sorted(rows, key=lambda row: (app_id_of(row[1]), row[0])):
+        app_id = app_id_of(row[1])
+        group = row[0][:digits] if digits else row[0]
+        if last_group.get(app_id) == group:
+            continue
+        last_group[app_id] = group
+        plan[app_id].append(row)
+
+    if discovery.is_complete(PLAY_DETAILS_URL, params, cache_tag=tag):
+        # Seed the per-app caches, so get_wayback_snapshots() needs no request
+        for app_id, snapshots in plan.items():
+            discovery.store(app_url(app_id), snapshots)
+    return plan
+
+
+def plan_discovery(app_ids, mode="concurrent", max_workers=8, discovery=None, headers=None):
+    """
+    Snapshot lists for all app_ids before any fetching starts, as
+    {app_id: snapshots}. mode="concurrent" runs the per-app (cached,
+    resumable) queries max_workers at a time; mode="prefix" makes one
+    matchType=prefix scan and filters it locally. Either way the per-app
+    caches are filled, so the scrapers' get_wayback_snapshots() reads them.
+    """
+    discovery = discovery or get_cdx_discovery()
+    start = time.perf_counter()
+    if mode == "prefix":
+        plan = _discover_prefix(app_ids, discovery, headers)
+    elif mode == "concurrent":
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            lists = pool.map(lambda app_id: discovery.snapshots(app_url(app_id), headers=headers), app_ids)
+            plan = dict(zip(app_ids, lists))
+    else:
+        raise ValueError(f"Unknown discovery mode: {mode}")
+
+    total = sum(len(snapshots) for snapshots in plan.values())
+    print(f"Discovery plan: {total} snapshots for {len(plan)} apps "
+          f"({sum(1 for s in plan.values() if not s)} with none) in {time.perf_counter() - start:.1f}s")
+    return plan
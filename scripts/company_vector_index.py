@@ -0,0 +1,142 @@
+"""
+Company Vector Index
+====================
+
+Top-k nearest-company search for the semantic app-company matchers,
+replacing the dense N x C `util.cos_sim` matrix and the full per-app
+argsort. Only a block of query rows is ever scored at once, so memory is
+O(N * k) for the results plus one bounded block, instead of O(N * C).
+
+Backends:
+- faiss: exact inner-product search (IndexFlatIP), or HNSW once the company
+  list reaches `hnsw_min_size` rows
+- hnswlib: HNSW graph over normalized vectors
+- exact: blocked matrix products with torch.topk when torch is installed,
+  NumPy argpartition otherwise (results match the original cos_sim + argsort)
+
+"auto" uses faiss if installed, then hnswlib, then exact. Vectors are
+L2-normalized, so inner product equals cosine similarity.
+
+Usage:
+    index = CompanyVectorIndex(company_embeddings)
+    scores, indices = index.search(app_embeddings, k=5)
+
+Dependencies:
+    - numpy
+    - faiss-cpu or hnswlib (optional)
+
+Author: ISB Fintech Research Team
+Project: Advanced App-Company Relationship Mining
+Institution: Indian School of Business (ISB)
+"""
+
+import numpy as np
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+# Upper bound on query x company scores held at once by the exact backend
+EXACT_BLOCK_ELEMENTS = 1 << 26
+
+
+def as_float32(embeddings):
+    """NumPy float32 matrix from a NumPy array or torch tensor"""
+    if hasattr(embeddings, 'detach'):
+        embeddings = embeddings.detach().cpu().numpy()
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    # Same epsilon as sentence_transformers.util.cos_sim, so zero vectors score 0
+    return matrix / np.maximum(norms, 1e-12)
+
+
+class CompanyVectorIndex:
+    """Cosine-similarity top-k index over company embeddings"""
+
+    def __init__(self, embeddings, backend="auto", hnsw_min_size=50000, m=32,
+                 ef_construction=200, ef_search=128):
+        self.vectors = normalize_rows(as_float32(embeddings))
+        self.size, self.dim = self.vectors.shape
+        self.ef_search = ef_search
+        if backend == "auto":
+            backend = "faiss" if faiss else "hnswlib" if hnswlib else "exact"
+        self.backend = backend
+
+        if backend == "faiss":
+            if faiss is None:
+                raise ImportError("The faiss backend requires faiss-cpu: pip install faiss-cpu")
+            if self.size >= hnsw_min_size:
+                self.index = faiss.IndexHNSWFlat(self.dim, m, faiss.METRIC_INNER_PRODUCT)
+                self.index.hnsw.efConstruction = ef_construction
+                self.index.hnsw.efSearch = ef_search
+            else:
+                self.index = faiss.IndexFlatIP(self.dim)
+            self.index.add(self.vectors)
+        elif backend == "hnswlib":
+            if hnswlib is None:
+                raise ImportError("The hnswlib backend requires hnswlib: pip install hnswlib")
+            self.index = hnswlib.Index(space='ip', dim=self.dim)
+            self.index.init_index(max_elements=self.size, ef_construction=ef_construction, M=m)
+            self.index.add_items(self.vectors, np.arange(self.size))
+        elif backend == "exact":
+            self.index = torch.from_numpy(self.vectors) if torch is not None else None
+        else:
+            raise ValueError(f"Unknown vector index backend: {backend}")
+
+    def __len__(self):
+        return self.size
+
+    def _search_exact(self, queries, k):
+        if self.index is not None:
+            top = torch.topk(torch.from_numpy(queries) @ self.index.T, k, dim=1)
+            return top.values.numpy(), top.indices.numpy()
+        scores = queries @ self.vectors.T
+        if k < self.size:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(self.size), scores.shape)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        return np.take_along_axis(top_scores, order, axis=1), np.take_along_axis(top, order, axis=1)
+
+    def _search_block(self, queries, k):
+        if self.backend == "faiss":
+            return self.index.search(queries, k)
+        if self.backend == "hnswlib":
+            self.index.set_ef(max(self.ef_search, k))
+            labels, distances = self.index.knn_query(queries, k=k)
+            # hnswlib's 'ip' distance is 1 - inner product
+            return 1.0 - distances, labels
+        return self._search_exact(queries, k)
+
+    def search(self, queries, k=1, batch_size=4096):
+        """
+        Best k companies for every query row, best first: (scores, indices),
+        both shaped (len(queries), k). Queries are processed in blocks.
+        """
+        queries = normalize_rows(as_float32(queries))
+        k = min(k, self.size)
+        if self.backend == "exact":
+            batch_size = max(1, min(batch_size, EXACT_BLOCK_ELEMENTS // max(self.size, 1)))
+
+        scores = np.empty((len(queries), k), dtype=np.float32)
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        for start in range(0, len(queries), batch_size):
+            block_scores, block_indices = self._search_block(queries[start:start + batch_size], k)
+            scores[start:start + batch_size] = block_scores
+            indices[start:start + batch_size] = block_indices
+        return scores, indices
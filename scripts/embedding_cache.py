@@ -0,0 +1,213 @@
+"""
+Persistent Embedding Cache
+==========================
+
+On-disk store of sentence embeddings for the app-company matchers, so that
+repeat runs only encode texts that are new or changed instead of
+re-encoding every `company_text` and `app_text` with the SentenceTransformer.
+
+Layout (one directory per model):
+    {root}/{model}/shard-000001.npy    float32/float16 embedding rows
+    {root}/{model}/shard-000001.keys   SHA-256 of each row's text, one per line
+
+Key Features:
+- Keyed by (model name, SHA-256 of the text); duplicate texts encode once
+- Shards are memory-mapped, so a warm start reads only the rows it needs
+- The model is loaded only when there is something to encode
+- A shard's keys file is written after its array, so an interrupted write
+  leaves an unindexed shard that is ignored, never a key without a vector
+- Optional float16 storage halves the disk footprint (returned as float32)
+- Misses are sorted by length (less padding per batch) and encoded in
+  chunks of `shard_rows`, each streamed to its own shard, so only one
+  chunk of new embeddings is held in memory while encoding
+- processes > 1 encodes with sentence-transformers' multi-process pool,
+  one model copy per CPU worker, but only for at least `pool_min_misses`
+  misses (a warm run with a few changed texts encodes in-process instead of
+  loading a model per core); each worker gets cpu_count / processes torch
+  threads, so the pool does not oversubscribe the cores
+- Per-call hit/miss counts, cold (encode) vs warm (lookup) timings and
+  encoding throughput in sentences/sec, overall and per process
+
+Usage:
+    cache = EmbeddingCache('all-MiniLM-L6-v2', processes=os.cpu_count())
+    embeddings = cache.encode(texts)
+    cache.report()
+
+    cache = open_embedding_cache('all-MiniLM-L6-v2', backend='onnx-int8')
+
+Dependencies:
+    - numpy
+    - sentence-transformers (only when texts need encoding)
+    - onnxruntime (onnx backends only)
+
+Author: ISB Fintech Research Team
+Project: Advanced App-Company Relationship Mining
+Institution: Indian School of Business (ISB)
+"""
+
+import glob
+import hashlib
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+# Fewer misses than this are encoded in-process: starting the pool loads one model per worker
+POOL_MIN_MISSES = 2000
+
+# os.environ is process-wide: caches starting pools from several threads take turns
+_environ_lock = threading.Lock()
+
+
+def text_key(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """Memory-mapped embedding shards keyed by text hash, for one model"""
+
+    def __init__(self, model_name, root="embedding_cache", dtype="float32", model=None,
+                 processes=1, shard_rows=20000, pool_min_misses=POOL_MIN_MISSES):
+        self.model_name = model_name
+        self.dir = os.path.join(root, re.sub(r'[^A-Za-z0-9._-]+', '_', model_name))
+        os.makedirs(self.dir, exist_ok=True)
+        self.dtype = np.dtype(dtype)
+        self.model = model
+        self.processes = max(1, processes or 1)
+        self.shard_rows = shard_rows
+        self.pool_min_misses = pool_min_misses
+        self.pool_used = False
+
+        self.keys = {}
+        self.shards = {}
+        for keys_path in sorted(glob.glob(os.path.join(self.dir, "shard-*.keys"))):
+            shard = int(os.path.basename(keys_path)[len("shard-"):-len(".keys")])
+            with open(keys_path, 'r') as f:
+                for row, key in enumerate(f.read().split()):
+                    self.keys[key] = (shard, row)
+        self.next_shard = max((shard for shard, _ in self.keys.values()), default=0) + 1
+
+        self.hits = 0
+        self.misses = 0
+        self.encode_seconds = 0.0
+        self.lookup_seconds = 0.0
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _shard(self, shard):
+        if shard not in self.shards:
+            path = os.path.join(self.dir, f"shard-{shard:06d}.npy")
+            self.shards[shard] = np.load(path, mmap_mode='r')
+        return self.shards[shard]
+
+    def _load_model(self):
+        if self.model is None:
+            from sentence_transformers import SentenceTransformer
+            self.model = SentenceTransformer(self.model_name)
+        return self.model
+
+    def _write_shard(self, keys, vectors):
+        shard = self.next_shard
+        self.next_shard += 1
+        base = os.path.join(self.dir, f"shard-{shard:06d}")
+        np.save(base + ".npy", np.ascontiguousarray(vectors, dtype=self.dtype))
+        with open(base + ".keys.tmp", 'w') as f:
+            f.write("\n".join(keys) + "\n")
+        os.replace(base + ".keys.tmp", base + ".keys")
+        for row, key in enumerate(keys):
+            self.keys[key] = (shard, row)
+
+    def _start_pool(self, model):
+        """Multi-process pool whose workers split the cores instead of each using all of them"""
+        threads = str(max(1, (os.cpu_count() or 1) // self.processes))
+        # Workers are spawned and read these when they import torch
+        with _environ_lock:
+            saved = {name: os.environ.get(name) for name in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS')}
+            os.environ.update({name: threads for name in saved})
+            try:
+                pool = model.start_multi_process_pool(['cpu'] * self.processes)
+            finally:
+                for name, value in saved.items():
+                    if value is None:
+                        os.environ.pop(name, None)
+                    else:
+                        os.environ[name] = value
+        self.pool_used = True
+        return pool
+
+    def _encode_missing(self, keys, texts, batch_size):
+        """Encode texts shortest first, writing one shard per shard_rows chunk"""
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        model = self._load_model()
+        pool = None
+        if self.processes > 1 and len(texts) >= self.pool_min_misses:
+            pool = self._start_pool(model)
+        try:
+            for start in range(0, len(order), self.shard_rows):
+                rows = order[start:start + self.shard_rows]
+                chunk = [texts[i] for i in rows]
+                if pool is not None:
+                    vectors = model.encode_multi_process(chunk, pool, batch_size=batch_size)
+                else:
+                    vectors = model.encode(chunk, batch_size=batch_size, convert_to_numpy=True)
+                self._write_shard([keys[i] for i in rows], vectors)
+        finally:
+            if pool is not None:
+                model.stop_multi_process_pool(pool)
+
+    def encode(self, texts, batch_size=64):
+        """Embeddings for texts as a float32 (len(texts), dim) array, encoding only cache misses"""
+        texts = ["" if text is None else str(text) for text in texts]
+        keys = [text_key(text) for text in texts]
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self.keys:
+                missing.setdefault(key, text)
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)
+
+        if missing:
+            start = time.perf_counter()
+            self._encode_missing(list(missing.keys()), list(missing.values()), batch_size)
+            self.encode_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        locations = np.array([self.keys[key] for key in keys], dtype=np.int64).reshape(-1, 2)
+        dim = self._shard(int(locations[0, 0])).shape[1] if len(keys) else 0
+        result = np.empty((len(keys), dim), dtype=np.float32)
+        for shard in np.unique(locations[:, 0]):
+            positions = np.nonzero(locations[:, 0] == shard)[0]
+            result[positions] = self._shard(int(shard))[locations[positions, 1]]
+        self.lookup_seconds += time.perf_counter() - start
+        return result
+
+    def report(self):
+        print(f"Embedding cache ({self.model_name}): {self.hits} cached, {self.misses} encoded; "
+              f"encode {self.encode_seconds:.2f}s, cache reads {self.lookup_seconds:.2f}s")
+        if self.misses and self.encode_seconds:
+            rate = self.misses / self.encode_seconds
+            processes = self.processes if self.pool_used else 1
+            print(f"Encoding throughput: {rate:.1f} sentences/sec with {processes} process(es), "
+                  f"{rate / processes:.1f} sentences/sec per process")
+
+
+def open_embedding_cache(model_name, backend="torch", processes=None, root="embedding_cache"):
+    """
+    EmbeddingCache for model_name on an inference backend: "torch"
+    (SentenceTransformer, up to `processes` workers, default one per core,
+    used only for large batches of misses), or
+    "onnx" / "onnx-int8" (ONNX Runtime, float32 or int8 weights). Each
+    backend has its own cache directory.
+    """
+    if backend in ("onnx", "onnx-int8"):
+        from onnx_sentence_encoder import OnnxSentenceEncoder
+        encoder = OnnxSentenceEncoder(model_name, quantize=(backend == "onnx-int8"))
+        # ONNX Runtime already spreads each batch over all cores
+        return EmbeddingCache(encoder.cache_name, root, model=encoder)
+    if backend != "torch":
+        raise ValueError(f"Unknown inference backend: {backend}")
+    return EmbeddingCache(model_name, root, processes=processes or os.cpu_count())
@@ -26,6 +26,12 @@ Technical Implementation:
 - Pandas-based data manipulation and transformation
 - Statistical validation and sanity checking
 - Memory-efficient processing for large datasets
+- Vectorized clean_frame() engine on Arrow string kernels (pandas .str
+  fallback) with output identical to the row-by-row functions
+- Chunked streaming mode: bounded memory, output identical to the
+  in-memory path
+- validate_frame() flags the values the rules could not normalize, for the
+  tiered cleaner in advanced_fintech_data_cleaner.py
 - Comprehensive error handling and logging
 
 Processing Pipeline:
@@ -49,13 +55,18 @@ Input/Output:
 - Maintains original data integrity while adding standardized columns
 
 Usage:
-    python csvcleaner.py
+    python fintech_data_cleaner_standardizer.py
+
+    from fintech_data_cleaner_standardizer import clean_csv, clean_frame
+    cleaned = clean_frame(df)
+    clean_csv("merged_snapshots.csv", "merged_cleaned.csv", chunksize=100000)
 
 Dependencies:
     - pandas: Data manipulation and analysis
     - numpy: Numerical computations
     - re: Regular expression processing
     - datetime: Temporal data handling
+    - pyarrow: Arrow string kernels for clean_frame() (optional)
 
 Author: ISB Fintech Research Team
 Project: Fintech App Data Processing Pipeline
@@ -64,9 +75,22 @@ Institution: Indian School of Business (ISB)
 
 import pandas as pd
 import re
+import sys
 import numpy as np
 from datetime import datetime
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+    pc = None
+
+TEXT_COLUMNS = ['app_title', 'description', 'whats_new']
+
+# Rows per chunk when streaming a CSV through the cleaner; None loads the whole file
+CHUNK_SIZE = 100000
+
 def clean_text(text):
     if pd.isnull(text):
         return ""
@@ -91,19 +115,199 @@ def normalize_installs(installs):
     installs = installs.replace(',', '').replace('+', '').strip()
     return installs
 
-# Load CSV file (update the file path as needed)
-df = pd.read_csv("output_lxml_hdfc.csv", encoding='utf-8')
+def normalize_reviews(reviews):
+    return re.sub(r'\D', '', str(reviews)) if pd.notnull(reviews) else ""
+
+def clean_frame_rows(df):
+    """Reference row-by-row cleaner: one Python call per cell"""
+    df = df.copy()
+    for col in TEXT_COLUMNS:
+        df[col] = df[col].apply(clean_text)
+    df['downloads'] = df['downloads'].apply(normalize_installs)
+    df['rating'] = df['rating'].apply(normalize_rating)
+    df['reviews'] = df['reviews'].apply(normalize_reviews)
+    return df
+
+# ---------------------------------------------------------------------------
+# Vectorized engine
+# ---------------------------------------------------------------------------
+# Arrow regexes run on RE2, whose \s is ASCII-only and whose \p{Nd} table
+# follows a different Unicode version than Python's re. The character classes
+# are therefore built from the running Python's own \s and \d so that both
+# engines match exactly the same code points.
+_PYTHON_CLASSES = {}
+
+def _python_chars(python_pattern):
+    """Every code point a single-character Python re class matches, as one string"""
+    if python_pattern not in _PYTHON_CLASSES:
+        alphabet = ''.join(chr(c) for c in range(sys.maxunicode + 1) if not 0xD800 <= c <= 0xDFFF)
+        _PYTHON_CLASSES[python_pattern] = ''.join(re.findall(python_pattern, alphabet))
+    return _PYTHON_CLASSES[python_pattern]
+
+def _re2_class(python_pattern):
+    """RE2 character class body matching the same code points as a Python re class"""
+    ranges = []
+    for point in map(ord, _python_chars(python_pattern)):
+        if ranges and ranges[-1][1] == point - 1:
+            ranges[-1][1] = point
+        else:
+            ranges.append([point, point])
+    return ''.join(
+        f"\\x{{{lo:x}}}" if lo == hi else f"\\x{{{lo:x}}}-\\x{{{hi:x}}}" for lo, hi in ranges
+    )
+
+def _as_arrow(series):
+    """Series as an Arrow large_string array, missing values as nulls, other values str()'d"""
+    if not (pd.api.types.is_string_dtype(series) or series.isna().all()):
+        series = series.map(str, na_action='ignore')
+    return pa.array(series, type=pa.large_string(), from_pandas=True)
+
+def _to_series(array, index, name):
+    series = array.to_pandas()
+    series.index = index
+    series.name = name
+    return series
+
+def _clean_text_arrow(series):
+    # Map the whitespace Arrow's ASCII splitter does not know (\x1c-\x1f, NBSP,
+    # Unicode spaces) to ' ', then split on whitespace runs and re-join, which
+    # is much faster than a regex replace per whitespace run
+    other = _re2_class(r'[^\S \t\n\x0b\x0c\r]')
+    array = pc.replace_substring_regex(_as_arrow(series), f"[{other}]", " ")
+    array = pc.binary_join(pc.ascii_split_whitespace(array), pa.scalar(" ", pa.large_string()))
+    array = pc.utf8_trim(array, characters=" ").fill_null("")
+    return _to_series(array, series.index, series.name)
+
+def _normalize_installs_arrow(series):
+    array = _as_arrow(series)
+    array = pc.replace_substring(pc.replace_substring(array, ",", ""), "+", "")
+    array = pc.utf8_trim(array, characters=_python_chars(r'\s')).fill_null("")
+    return _to_series(array, series.index, series.name)
+
+def _parse_floats(values):
+    """float() over the distinct values of a string array, mapped back to every row"""
+    encoded = values.dictionary_encode()
+    if isinstance(encoded, pa.ChunkedArray):
+        encoded = encoded.combine_chunks()
+    parsed = []
+    for value in encoded.dictionary.to_pylist():
+        try:
+            parsed.append(float(value))
+        except ValueError:
+            parsed.append(None)
+    return pc.take(pa.array(parsed, type=pa.float64()), encoded.indices)
+
+def _normalize_rating_arrow(series):
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    digits = _re2_class(r'\d')
+    array = pc.replace_substring_regex(_as_arrow(series), f"[^{digits}.]+", "")
+    return _to_series(_parse_floats(array), series.index, series.name)
+
+def _normalize_reviews_arrow(series):
+    digits = _re2_class(r'\d')
+    array = pc.replace_substring_regex(_as_arrow(series), f"[^{digits}]+", "")
+    return _to_series(array.fill_null(""), series.index, series.name)
+
+def _clean_text_pandas(series):
+    return series.astype(object).str.replace(r'\s+', ' ', regex=True).str.strip().fillna("")
+
+def _normalize_installs_pandas(series):
+    series = series.astype(object).str.replace(',', '', regex=False).str.replace('+', '', regex=False)
+    return series.str.strip().fillna("")
+
+def _normalize_rating_pandas(series):
+    if pd.api.types.is_numeric_dtype(series):
+        return series.astype(float)
+    digits = series.astype(object).str.replace(r'[^\d\.]', '', regex=True)
+    codes, uniques = pd.factorize(digits)
+    parsed = np.array([normalize_rating(value) for value in uniques] + [None], dtype=float)
+    return pd.Series(parsed[codes], index=series.index, name=series.name)
+
+def _normalize_reviews_pandas(series):
+    series = series.astype(object).map(str, na_action='ignore').astype(object)
+    return series.str.replace(r'\D', '', regex=True).fillna("")
+
+def clean_frame(df, engine=None):
+    """
+    Vectorized equivalent of clean_frame_rows(). engine is "arrow" (Arrow
+    string kernels, the default when pyarrow is installed) or "pandas"
+    (object-dtype .str accessors). Ratings are parsed once per distinct value.
+    """
+    engine = engine or ("arrow" if pa is not None else "pandas")
+    if engine == "arrow":
+        text, installs, rating, reviews = (_clean_text_arrow, _normalize_installs_arrow,
+                                           _normalize_rating_arrow, _normalize_reviews_arrow)
+    elif engine == "pandas":
+        text, installs, rating, reviews = (_clean_text_pandas, _normalize_installs_pandas,
+                                           _normalize_rating_pandas, _normalize_reviews_pandas)
+    else:
+        raise ValueError(f"Unknown cleaning engine: {engine}")
+
+    df = df.copy()
+    for col in TEXT_COLUMNS:
+        df[col] = text(df[col])
+    df['downloads'] = installs(df['downloads'])
+    df['rating'] = rating(df['rating'])
+    df['reviews'] = reviews(df['reviews'])
+    return df
+
+def validate_frame(raw, cleaned):
+    """
+    Flag the cells the rules could not normalize, one boolean column per
+    checked field: a value was present in the raw data but the cleaned one is
+    empty, not a plain ASCII integer, out of range, or (for ratings) taken
+    from text holding several numbers such as "4.2 out of 5".
+    """
+    def present(col):
+        return (raw[col].notna() & (raw[col].astype(object).map(str).str.strip() != "")).astype(bool)
+
+    def plain_integer(col):
+        return cleaned[col].astype(object).map(str).str.fullmatch(r'[0-9]+').astype(bool)
+
+    ratings = raw['rating'].astype(object).map(str, na_action='ignore')
+    flags = pd.DataFrame(index=raw.index)
+    flags['rating'] = present('rating') & (
+        ~cleaned['rating'].between(0, 5) | (ratings.str.count(r'\d+(?:\.\d+)?') > 1).fillna(False)
+    )
+    flags['downloads'] = present('downloads') & ~plain_integer('downloads')
+    flags['reviews'] = present('reviews') & ~plain_integer('reviews')
+    return flags
+
+def read_snapshot_csv(input_csv, chunksize=None):
+    """
+    Read a snapshot CSV with every column as text. Type inference would see
+    a different sample per chunk (a column can come out int in one chunk and
+    float in the next), so both paths pin the dtypes to keep their output
+    identical.
+    """
+    return pd.read_csv(input_csv, encoding='utf-8', dtype=str, chunksize=chunksize)
+
+def clean_csv(input_csv, output_csv, chunksize=None, engine=None):
+    """
+    Clean a snapshot CSV. With chunksize the file is streamed through
+    clean_frame() `chunksize` rows at a time and appended to the output, so
+    peak memory is bounded by the chunk instead of the file size.
+    """
+    if not chunksize:
+        df = clean_frame(read_snapshot_csv(input_csv), engine)
+        df.to_csv(output_csv, index=False, encoding='utf-8')
+        return len(df)
+
+    rows = 0
+    with open(output_csv, 'w', newline='', encoding='utf-8') as out:
+        for i, chunk in enumerate(read_snapshot_csv(input_csv, chunksize)):
+            clean_frame(chunk, engine).to_csv(out, header=(i == 0), index=False)
+            rows += len(chunk)
+    return rows
+
+def main(input_csv="output_lxml_hdfc.csv", output_csv="output_lxml_cleaned.csv", chunksize=CHUNK_SIZE):
+    # Stream the CSV through the vectorized cleaner (update the file paths as needed)
+    rows = clean_csv(input_csv, output_csv, chunksize)
 
-# Apply cleaning functions to each relevant column
-df['app_title'] = df['app_title'].apply(clean_text)
-df['description'] = df['description'].apply(clean_text)
-df['whats_new'] = df['whats_new'].apply(clean_text)
-df['downloads'] = df['downloads'].apply(normalize_installs)
-df['rating'] = df['rating'].apply(normalize_rating)
-df['reviews'] = df['reviews'].apply(lambda x: re.sub(r'\D', '', str(x)) if pd.notnull(x) else "")
+    # You can add further cleaning steps as needed
 
-# You can add further cleaning steps as needed
+    print(f"Cleaned CSV written to {output_csv} ({rows} rows)")
 
-# Save cleaned CSV
-df.to_csv("output_lxml_cleaned.csv", index=False, encoding='utf-8')
-print("Cleaned CSV written to output_lxml_cleaned.csv")
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,24 @@
-import os
+import numpy as np
 import pandas as pd
-from sentence_transformers import SentenceTransformer, util
-from rapidfuzz import process, fuzz
+from company_vector_index import CompanyVectorIndex
+from embedding_cache import open_embedding_cache
+from fuzzy_company_index import FuzzyCompanyIndex
+from match_scoring import append_results, build_match_frame
+from matched_apps_filter import apps_to_match
 
-def main():
+def main(incremental=True, encode_processes=None, backend="torch"):
     # Load Data
     df_apps = pd.read_csv('apps-newl-1_clean.csv')
     df_companies = pd.read_excel('companylist.xlsx', sheet_name=0)
     df_matched = pd.read_excel('Company-App Matching v1.xlsx', sheet_name=0)
 
     # Exclude Already Matched Apps
-    matched_set = set(zip(
-        df_matched['APP_NAME'].str.lower().fillna(''),
-        df_matched['DEVELOPER'].str.lower().fillna('')
-    ))
-    def is_matched(row):
-        return (row['APP_NAME'].lower(), row['DEVELOPER'].lower()) in matched_set
-    df_apps_to_match = df_apps[~df_apps.apply(is_matched, axis=1)].copy()
+    # (and, on incremental runs, apps already in the results CSV)
+    csv_file = 'app_company_matches_fuzzy_nlp.csv'
+    df_apps_to_match = apps_to_match(df_apps, df_matched, csv_file, incremental)
+    if df_apps_to_match.empty:
+        print(f"No new apps to match; '{csv_file}' is up to date.")
+        return
 
     # Prepare Text Fields for NLP
     df_apps_to_match['app_text'] = (
@@ -33,76 +35,48 @@ def main():
     )
 
     # Generate NLP Embeddings
-    model = SentenceTransformer('all-MiniLM-L6-v2')
+    # (cached on disk; only new or changed texts are encoded, across all cores;
+    # backend="onnx-int8" for the quantized ONNX Runtime model)
+    embeddings = open_embedding_cache('all-MiniLM-L6-v2', backend, encode_processes)
     app_texts = df_apps_to_match['app_text'].tolist()
     company_texts = df_companies['company_text'].tolist()
-    app_embeddings = model.encode(app_texts, convert_to_tensor=True)
-    company_embeddings = model.encode(company_texts, convert_to_tensor=True)
-
-    # Compute Cosine Similarity Matrix
-    similarity_matrix = util.cos_sim(app_embeddings, company_embeddings)
+    app_embeddings = embeddings.encode(app_texts)
+    company_embeddings = embeddings.encode(company_texts)
+    embeddings.report()
 
     # Parameters for Matching
     threshold = 0.50         # NLP threshold
     fuzzy_threshold = 90     # Fuzzy string matching threshold (0-100 scale)
-    batch_size = 10
-    csv_file = 'app_company_matches_fuzzy_nlp.csv'
-    file_exists = os.path.isfile(csv_file)
-    rows_to_write = []
-
-    # Process Each App
-    for i, idx in enumerate(df_apps_to_match.index):
-        app_row = df_apps_to_match.loc[idx]
-        app_name = app_row['APP_NAME'].strip().lower()
-        sim_scores = similarity_matrix[i]
-
-        # Get best NLP match
-        best_idx = sim_scores.argsort(descending=True)[0].item()
-        best_score = sim_scores[best_idx].item()
-        nlp_match_company = df_companies.iloc[best_idx]['Company Name']
+    fuzzy_prefilter = False  # n-gram candidate index; same matches, faster for large company lists
+    top_k = 3                # Best NLP match plus ranked alternates
 
-        # Use RapidFuzz to find best fuzzy match against all company names
-        company_names = df_companies['Company Name'].tolist()
-        fuzzy_match, fuzzy_score, _ = process.extractOne(
-            app_name, [name.lower() for name in company_names], scorer=fuzz.ratio
-        )
-        
-        # Decide which match to use:
-        # If fuzzy score is high, override NLP match.
-        if fuzzy_score >= fuzzy_threshold:
-            final_match = fuzzy_match.title()  # assuming title case for company name
-            final_similarity = None  # Not applicable for fuzzy match
-        elif best_score >= threshold:
-            final_match = nlp_match_company
-            final_similarity = best_score
-        else:
-            final_match = None
-            final_similarity = None
+    # Nearest companies from a vector index (no apps x companies matrix),
+    # scored for all apps at once and built into a results frame column-wise
+    company_index = CompanyVectorIndex(company_embeddings)
+    top_scores, top_indices = company_index.search(app_embeddings, k=top_k)
+    results = build_match_frame(df_apps_to_match, df_companies, top_scores, top_indices, threshold)
 
-        # Optional: Rule-based override for known cases
-        if app_name == 'jupiter':
-            final_match = 'Jupiter'
-            final_similarity = None
+    # Best fuzzy match for every app name against the company names,
+    # normalized once and scored in multi-core rapidfuzz cdist calls
+    app_names = df_apps_to_match['APP_NAME'].fillna('').str.strip().str.lower()
+    fuzzy_index = FuzzyCompanyIndex(df_companies['Company Name'], prefilter=fuzzy_prefilter)
+    fuzzy_idx, fuzzy_score = fuzzy_index.best_matches(app_names, score_cutoff=fuzzy_threshold)
+    fuzzy_match = pd.Series(fuzzy_index.names_at(fuzzy_idx), dtype=object)
 
-        rows_to_write.append({
-            'APP_NAME': app_row['APP_NAME'],
-            'DEVELOPER': app_row['DEVELOPER'],
-            'MATCHED_COMPANY': final_match,
-            'SIMILARITY': final_similarity
-        })
+    # Decide which match to use:
+    # If fuzzy score is high, override NLP match.
+    override = fuzzy_score >= fuzzy_threshold
+    results.loc[override, 'MATCHED_COMPANY'] = fuzzy_match[override].str.title()  # assuming title case
+    results.loc[override, 'SIMILARITY'] = np.nan  # Not applicable for fuzzy match
 
-        # Write batch every 10 apps
-        if (i + 1) % batch_size == 0:
-            batch_df = pd.DataFrame(rows_to_write)
-            batch_df.to_csv(csv_file, mode='a', index=False, header=(not file_exists))
-            file_exists = True
-            rows_to_write.clear()
+    # Optional: Rule-based override for known cases
+    jupiter = (app_names == 'jupiter').to_numpy()
+    results.loc[jupiter, 'MATCHED_COMPANY'] = 'Jupiter'
+    results.loc[jupiter, 'SIMILARITY'] = np.nan
 
-    if rows_to_write:
-        batch_df = pd.DataFrame(rows_to_write)
-        batch_df.to_csv(csv_file, mode='a', index=False, header=(not file_exists))
+    append_results(csv_file, results)
 
-    print(f"Matching complete. Results appended to '{csv_file}' in batches of {batch_size}.")
+    print(f"Matching complete. {len(results)} results appended to '{csv_file}'.")
 
 if __name__ == '__main__':
     main()
@@ -3,6 +3,8 @@ import glob
 import csv
 import re
 from bs4 import BeautifulSoup
+from snapshot_store import SnapshotStore, capture_file_name
+from parquet_record_writer import ParquetRecordWriter, drop_app_partition
 
 def extract_timestamp_from_filename(filename):
     match = re.search(r'(\d{8}_\d{6})', filename)
@@ -20,10 +22,13 @@ def get_first_nonempty_bs(soup, selectors):
 def extract_data_bs(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
         content = f.read()
+    return extract_html_bs(content, os.path.basename(file_path))
+
+def extract_html_bs(content, file_name):
     soup = BeautifulSoup(content, 'html.parser')
     data = {
-        'file': os.path.basename(file_path),
-        'timestamp': extract_timestamp_from_filename(os.path.basename(file_path)),
+        'file': file_name,
+        'timestamp': extract_timestamp_from_filename(file_name),
         'app_title': get_first_nonempty_bs(soup, ["h1.AHFaub span", "h1.title"]),
         'rating':    get_first_nonempty_bs(soup, ["div.BHMmbe", "div[aria-label*='stars']"]),
         'downloads': get_first_nonempty_bs(soup, ["div:contains('Installs') + span", "div:contains('Installs') + div"]),
@@ -36,7 +41,7 @@ def extract_data_bs(file_path):
     data['whats_new'] = wn.get_text(" ", strip=True) if wn else ""
     return data
 
-def main_bs_multi():
+def main_bs_multi(store_dir=None, output_format="csv"):
     target_url = "{target_url}"
     downloads  = "500M+"                            # ← this also becomes your output folder name
 
@@ -56,6 +61,22 @@ def main_bs_multi():
         'downloads','reviews','description','whats_new'
     ]
 
+    if store_dir:
+        # Read captures from the content-addressed snapshot store instead of html folders
+        with SnapshotStore(store_dir) as store:
+            for app_id in store.app_ids():
+                print(f"Processing app: {app_id}")
+                rows = []
+                for _, timestamp, digest in store.captures(app_id):
+                    content = store.get(digest)
+                    if content is None:
+                        # Indexed capture whose blob is missing from the store
+                        print(f"  Skipping {capture_file_name(app_id, timestamp)}: blob {digest} not in store")
+                        continue
+                    rows.append(extract_html_bs(content, capture_file_name(app_id, timestamp)))
+                write_rows(output_dir, app_id, fieldnames, rows, output_format)
+        return
+
     for sub in os.listdir(base_dir):
         sub_path = os.path.join(base_dir, sub)
         if not os.path.isdir(sub_path):
@@ -65,14 +86,23 @@ def main_bs_multi():
         rows = []
         for fp in glob.glob(os.path.join(sub_path, "*.html")):
             rows.append(extract_data_bs(fp))
+        write_rows(output_dir, sub, fieldnames, rows, output_format)
 
-        csv_path = os.path.join(output_dir, f"{sub}.csv")
+def write_rows(output_dir, name, fieldnames, rows, output_format="csv"):
+    if output_format == "parquet":
+        # One dataset for every app, partitioned by app and year
+        csv_path = os.path.join(output_dir, "parquet")
+        drop_app_partition(csv_path, name)
+        with ParquetRecordWriter(csv_path, fieldnames, app_id=name) as writer:
+            writer.writerows(rows)
+    else:
+        csv_path = os.path.join(output_dir, f"{name}.csv")
         with open(csv_path, 'w', newline='', encoding='utf-8') as csvf:
             writer = csv.DictWriter(csvf, fieldnames=fieldnames)
             writer.writeheader()
             writer.writerows(rows)
 
-        print(f"  → Wrote {len(rows)} rows to {csv_path}")
+    print(f"  → Wrote {len(rows)} rows to {csv_path}")
 
 if __name__ == "__main__":
     main_bs_multi()
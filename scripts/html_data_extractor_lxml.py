@@ -35,10 +35,14 @@ Technical Features:
 - Memory-efficient file processing
 - Configurable input/output directory structure
 - Progress tracking and logging
+- Precompiled XPath extraction plan (ExtractionPlan / DEFAULT_PLAN)
+- Streaming extractor with early exit for large pages (extract_data_streaming)
+- Optional process-pool sharding of files across cores (main_lxml_multi)
 
 Input Structure:
 - html_snapshots/{target_url}/{downloads}/: Raw HTML files
 - Filename format: {app}_{timestamp}.html
+- Or a snapshot_store.SnapshotStore directory (store_dir)
 
 Output Structure:
 - {downloads} analysed data lxml/: Processed CSV files
@@ -68,7 +72,11 @@ import os
 import glob
 import csv
 import re
-from lxml import html
+import time
+from concurrent.futures import ProcessPoolExecutor
+from lxml import etree, html
+from snapshot_store import SnapshotStore, capture_file_name
+from parquet_record_writer import ParquetRecordWriter, drop_app_partition
 
 def extract_timestamp_from_filename(filename):
     # Example filename: hdfc_app_20150326_002237.html
@@ -145,6 +153,444 @@ def extract_data_lxml(file_path):
 
     return data
 
+class ExtractionPlan:
+    """
+    Precompiled XPath plan for Play Store snapshot fields.
+
+    `fields` is a list of (name, steps, join) entries; steps are tried in
+    priority order. A step is an XPath string, compiled to an
+    lxml.etree.XPath object once when the plan is built, or a function of
+    the tree. Selectors that share their scan (the same anchor elements) are
+    merged into one step `(xpath, branches)`: the expression is evaluated
+    once and each branch picks one selector's results, in document order,
+    out of the returned nodes, primary first. Fields with join=True
+    concatenate every text part of the first step or branch with results;
+    the others return the first non-empty result, exactly like
+    get_first_nonempty().
+    """
+
+    def __init__(self, fields):
+        self.fields = [
+            (name, [self._compile(step) for step in steps], join)
+            for name, steps, join in fields
+        ]
+
+    @staticmethod
+    def _compile(step):
+        source, branches = step if isinstance(step, tuple) else (step, [_every])
+        if isinstance(source, str):
+            source = etree.XPath(source)
+        return source, branches
+
+    def extract(self, tree):
+        """Return {field: text} for a parsed lxml tree"""
+        data = {}
+        for name, steps, join in self.fields:
+            data[name] = self._evaluate(tree, steps, join)
+        return data
+
+    @staticmethod
+    def _evaluate(tree, steps, join):
+        for source, branches in steps:
+            nodes = source(tree)
+            for branch in branches:
+                results = branch(nodes)
+                if not results:
+                    continue
+                if join:
+                    return " ".join([part.strip() for part in results if part.strip()])
+                first = results[0]
+                text = first.strip() if isinstance(first, str) else first.text_content().strip()
+                if text:
+                    return text
+        return ""
+
+
+def _every(nodes):
+    return nodes
+
+def _parent(node):
+    """Element a text result of an XPath belongs to"""
+    parent = node.getparent()
+    return parent.getparent() if node.is_tail else parent
+
+def _texts(nodes, test):
+    """Text results whose parent element passes test"""
+    return [node for node in nodes if test(_parent(node))]
+
+def _is_title_span(elem):
+    parent = elem.getparent()
+    return elem.tag == 'span' and parent is not None and parent.tag == 'h1' and parent.get('class') == 'AHFaub'
+
+def _is_review_count(elem):
+    """span[2] of a span.EymY4b"""
+    parent = elem.getparent()
+    if elem.tag != 'span' or parent is None or parent.tag != 'span' or parent.get('class') != 'EymY4b':
+        return False
+    spans = [child for child in parent if child.tag == 'span']
+    return len(spans) > 1 and spans[1] is elem
+
+def _document_order_key():
+    """Sort key giving document order: child indexes from the root down (each parent enumerated once)"""
+    indexes = {}
+
+    def key(elem):
+        path = []
+        parent = elem.getparent()
+        while parent is not None:
+            if parent not in indexes:
+                indexes[parent] = {child: i for i, child in enumerate(parent)}
+            path.append(indexes[parent][elem])
+            elem, parent = parent, parent.getparent()
+        return path[::-1]
+    return key
+
+WHATS_NEW = "What's New"
+_block_string = etree.XPath('string()')
+_phrase_texts = etree.XPath('.//text()[contains(., $phrase)]')
+_whatsnew_by_div = etree.XPath('//div[contains(., $phrase)]/following-sibling::div//text()')
+
+def _outer_divs(elem):
+    """Divs at or below elem that are not inside another div, in document order"""
+    if elem.tag == 'div':
+        return [elem]
+    return [div for child in elem.iterchildren(etree.Element) for div in _outer_divs(child)]
+
+def _whatsnew_notes(tree):
+    """
+    //div[contains(., "What's New")]/following-sibling::div//text().
+    Building the string value of every div walks each subtree once per
+    enclosing div. Only the outermost divs are tested here; when every
+    occurrence of the heading inside them lies within one text node, the
+    divs containing it are exactly the ancestor divs of those text nodes.
+    A heading split across inline tags (What's <span>New</span>) takes the
+    full expression.
+    """
+    occurrences, texts = 0, []
+    for div in _outer_divs(tree.getroottree().getroot()):
+        found = _block_string(div).count(WHATS_NEW)
+        if found:
+            occurrences += found
+            texts.extend(_phrase_texts(div, phrase=WHATS_NEW))
+    if not occurrences:
+        return []
+    if sum(text.count(WHATS_NEW) for text in texts) != occurrences:
+        return _whatsnew_by_div(tree, phrase=WHATS_NEW)
+
+    headings = {div for text in texts for div in _parent(text).iterancestors('div')}
+    headings.update(_parent(text) for text in texts if _parent(text).tag == 'div')
+    notes = {sibling for heading in headings for sibling in heading.itersiblings('div')}
+    # Each text node once, in document order: skip notes nested in another note
+    blocks = [note for note in notes if not any(outer in notes for outer in note.iterancestors('div'))]
+    blocks.sort(key=_document_order_key())
+    return [part for block in blocks for part in block.itertext()]
+
+# Primary and fallback selectors share one expression where they start from the
+# same elements. Rating and description select different elements: a merged
+# expression would test the fallback's predicate on every element even when
+# the primary matches, so those keep the fallback as a second step.
+PLAY_STORE_FIELDS = [
+    # One scan of the h1s: //h1[@class="AHFaub"]/span/text(), then //h1[contains(@class, "title")]/text()
+    ('app_title', [
+        ('//h1[@class="AHFaub" or contains(@class, "title")]//text()', [
+            lambda nodes: _texts(nodes, _is_title_span),
+            lambda nodes: _texts(nodes, lambda elem: elem.tag == 'h1' and 'title' in elem.get('class', '')),
+        ]),
+    ], False),
+    ('rating', [
+        '//div[@class="BHMmbe"]/text()',
+        '//div[contains(@aria-label, "stars")]/@aria-label'
+    ], False),
+    # Both selectors start from the same "Installs" divs
+    ('downloads', [
+        ('//div[contains(text(),"Installs")]/following-sibling::*[self::span or self::div]/text()', [
+            lambda nodes: _texts(nodes, lambda elem: elem.tag == 'span'),
+            lambda nodes: _texts(nodes, lambda elem: elem.tag == 'div'),
+        ]),
+    ], False),
+    # One scan of the spans: //span[@class="EymY4b"]/span[2]/text(), then //span[contains(text(),"reviews")]/text()
+    ('reviews', [
+        ('//span[@class="EymY4b" or contains(text(),"reviews")]//text()', [
+            lambda nodes: _texts(nodes, _is_review_count),
+            lambda nodes: _texts(nodes, lambda elem: elem.tag == 'span' and 'reviews' in _first_text(elem)),
+        ]),
+    ], False),
+    ('description', [
+        '//div[@jsname="sngebd"]//text()',
+        '//div[@itemprop="description"]//text()'
+    ], True),
+    ('whats_new', [
+        _whatsnew_notes,
+        '//div[contains(@class, "whats-new") or contains(@class, "recent-change")]//text()'
+    ], True),
+]
+
+# Compiled once at import time and shared by every call (and every pool worker)
+DEFAULT_PLAN = ExtractionPlan(PLAY_STORE_FIELDS)
+
+def extract_html_plan(content, file_name, plan=DEFAULT_PLAN):
+    """Extract one snapshot's fields from an HTML string with a precompiled ExtractionPlan"""
+    try:
+        tree = html.fromstring(content)
+    except Exception as e:
+        print(f"Error parsing {file_name}: {e}")
+        return None
+
+    data = {}
+    data['file'] = file_name
+    data['timestamp'] = extract_timestamp_from_filename(file_name)
+    data.update(plan.extract(tree))
+    return data
+
+def extract_data_lxml_plan(file_path, plan=DEFAULT_PLAN):
+    """Same output as extract_data_lxml(), evaluated with a precompiled ExtractionPlan"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    return extract_html_plan(content, os.path.basename(file_path), plan)
+
+# Snapshot stores opened by this process (one per pool worker)
+_open_stores = {}
+
+def extract_store_capture(job):
+    """Extract a capture from the snapshot store; job is (store_dir, app_id, timestamp)"""
+    store_dir, app_id, timestamp = job
+    store = _open_stores.get(store_dir)
+    if store is None:
+        store = _open_stores[store_dir] = SnapshotStore(store_dir)
+    content = store.get_capture(app_id, timestamp)
+    if content is None:
+        print(f"Skipping {capture_file_name(app_id, timestamp)}: capture not in store")
+        return None
+    return extract_html_plan(content, capture_file_name(app_id, timestamp))
+
+STREAMING_FIELDS = ['app_title', 'rating', 'downloads', 'reviews', 'description', 'whats_new']
+SINGLE_FIELDS = ['app_title', 'rating', 'downloads', 'reviews']
+JOINED_FIELDS = ['description', 'whats_new']
+
+def _first_text(elem):
+    """First text node of an element, as `elem/text()` would return it"""
+    if elem.text is not None:
+        return elem.text
+    for child in elem:
+        if child.tail is not None:
+            return child.tail
+    return ""
+
+class _Frame:
+    """An element still open in the pull parser, with the state its children need"""
+
+    __slots__ = ('elem', 'start', 'cursor', 'first', 'targets', 'blocks', 'heading', 'notes', 'installs', 'spans')
+
+    def __init__(self, elem, start, targets, blocks):
+        self.elem = elem
+        self.start = start          # document text offset at which the element opened
+        self.cursor = None          # last child whose tail is still to be read
+        self.first = None           # first direct text node, as elem/text() would return it
+        self.targets = targets      # (field, branch) selectors whose results are this element's text()
+        self.blocks = blocks        # (field, branch) blocks whose //text() includes this element
+        self.heading = False        # a div whose text contains "What's New"
+        self.notes = False          # a "What's New" heading child has ended: later child divs are notes
+        self.installs = False       # an "Installs" child div has ended: later spans/divs hold downloads
+        self.spans = 0              # span children opened so far
+
+class _StreamingCollector:
+    """
+    Event handler behind extract_data_streaming().
+
+    Every text node is read once, in document order, while the elements
+    around it are still open (an element's own text when its first child
+    starts, a child's tail when the next child starts or the element ends).
+    Each one is offered to the selectors it belongs to, so the first result
+    of a selector and the joined text of description / what's-new blocks
+    come out as the XPath expressions of extract_data_lxml() produce them.
+    Elements are cleared as soon as they end; only the open path is kept.
+    """
+
+    def __init__(self):
+        self.frames = []
+        self.first = {}
+        self.parts = {(field, branch): [] for field in JOINED_FIELDS for branch in (0, 1)}
+        self.open_blocks = dict.fromkeys(self.parts, 0)
+        self.owners = {}
+        self.closed = set()
+        self.offset = 0
+        self.recent = ""
+
+    def done(self):
+        """Every single-valued primary found and both joined primaries complete"""
+        return (all(self.first.get((field, 0), "").strip() for field in SINGLE_FIELDS)
+                and all(field in self.closed and self.parts[(field, 0)] for field in JOINED_FIELDS))
+
+    def _keep(self, key, value):
+        if key not in self.first:
+            self.first[key] = value
+
+    def _text(self, frame, text):
+        """One text node whose parent is frame's element"""
+        if not text:
+            return
+        if frame.first is None:
+            frame.first = text
+            if frame.elem.tag == 'span' and 'reviews' in text:
+                self._keep(('reviews', 1), text)
+        for key in frame.targets:
+            self._keep(key, text)
+        for key, count in self.open_blocks.items():
+            if count:
+                self.parts[key].append(text)
+
+        # "What's New" occurrences, also across text nodes: every open div
+        # that started before the occurrence contains it
+        window = self.recent + text
+        base = self.offset - len(self.recent)
+        at = window.find(WHATS_NEW)
+        while at != -1:
+            divs = [i for i, open_frame in enumerate(self.frames)
+                    if open_frame.elem.tag == 'div' and open_frame.start <= base + at]
+            for i in divs:
+                self.frames[i].heading = True
+            if divs and 'whats_new' not in self.owners:
+                # The notes end with the element around the outermost heading div
+                self.owners['whats_new'] = self.frames[divs[0] - 1] if divs[0] else None
+            at = window.find(WHATS_NEW, at + 1)
+        self.offset += len(text)
+        self.recent = window[-(len(WHATS_NEW) - 1):]
+
+    def _advance(self, frame, upto=None):
+        """Read frame's direct text nodes up to its child `upto` (None: to its end)"""
+        node = frame.cursor
+        if node is None:
+            self._text(frame, frame.elem.text)
+            node = frame.elem[0] if len(frame.elem) else None
+        else:
+            self._text(frame, node.tail)
+            node = node.getnext()
+        while node is not None and node is not upto:
+            self._text(frame, node.tail)
+            node = node.getnext()
+
+    def start(self, elem):
+        parent = self.frames[-1] if self.frames else None
+        if parent is not None:
+            self._advance(parent, elem)
+            parent.cursor = elem
+        tag, cls = elem.tag, elem.get('class', '')
+        parent_tag = parent.elem.tag if parent is not None else None
+        parent_cls = parent.elem.get('class', '') if parent is not None else ''
+
+        targets = []
+        if tag == 'span':
+            if parent_tag == 'h1' and parent_cls == 'AHFaub':
+                targets.append(('app_title', 0))
+            if parent_tag == 'span' and parent_cls == 'EymY4b':
+                parent.spans += 1
+                if parent.spans == 2:
+                    targets.append(('reviews', 0))
+            if parent is not None and parent.installs:
+                targets.append(('downloads', 0))
+        elif tag == 'h1' and 'title' in cls:
+            targets.append(('app_title', 1))
+        elif tag == 'div':
+            if cls == 'BHMmbe':
+                targets.append(('rating', 0))
+            if 'stars' in elem.get('aria-label', ''):
+                self._keep(('rating', 1), elem.get('aria-label'))
+            if parent is not None and parent.installs:
+                targets.append(('downloads', 1))
+
+        blocks = []
+        if tag == 'div':
+            if elem.get('jsname') == 'sngebd':
+                blocks.append(('description', 0))
+                if 'description' not in self.owners:
+                    self.owners['description'] = parent
+            if elem.get('itemprop') == 'description':
+                blocks.append(('description', 1))
+            if parent is not None and parent.notes:
+                blocks.append(('whats_new', 0))
+            if 'whats-new' in cls or 'recent-change' in cls:
+                blocks.append(('whats_new', 1))
+        for key in blocks:
+            self.open_blocks[key] += 1
+        self.frames.append(_Frame(elem, self.offset, targets, blocks))
+
+    def end(self, elem):
+        frame = self.frames[-1]
+        self._advance(frame)
+        self.frames.pop()
+        for key in frame.blocks:
+            self.open_blocks[key] -= 1
+        for field, owner in self.owners.items():
+            if owner is frame:
+                self.closed.add(field)
+
+        parent = self.frames[-1] if self.frames else None
+        if parent is not None and elem.tag == 'div':
+            if frame.heading:
+                parent.notes = True
+            if frame.first is not None and 'Installs' in frame.first:
+                parent.installs = True
+
+        elem.clear(keep_tail=True)
+        if parent is not None:
+            while elem.getprevious() is not None:
+                del parent.elem[0]
+
+    def result(self):
+        data = {}
+        for field in SINGLE_FIELDS:
+            value = self.first.get((field, 0), "").strip()
+            data[field] = value if value else self.first.get((field, 1), "").strip()
+        for field in JOINED_FIELDS:
+            parts = self.parts[(field, 0)] or self.parts[(field, 1)]
+            data[field] = " ".join([part.strip() for part in parts if part.strip()])
+        return {field: data[field] for field in STREAMING_FIELDS}
+
+def extract_data_streaming(file_path, chunk_size=64 * 1024):
+    """
+    Streaming variant of extract_data_lxml() for large snapshots.
+
+    Feeds the file to an lxml HTMLPullParser in chunks and returns the same
+    fields as extract_data_lxml(). Description and what's-new join every
+    matching block up to the end of the element enclosing the first one; once
+    those elements have closed and every other field's primary selector has
+    matched, reading stops and the rest of the page (typically its inline
+    scripts) is never parsed. When the "What's New" heading sits in a wrapper
+    div spanning the whole page, that point is the end of the page. A further
+    matching block after that point, elsewhere in the page, is not read.
+    """
+    parser = etree.HTMLPullParser(events=('start', 'end'), encoding='utf-8')
+    collector = _StreamingCollector()
+
+    def drain():
+        for event, elem in parser.read_events():
+            if event == 'start':
+                collector.start(elem)
+            else:
+                collector.end(elem)
+            if collector.done():
+                return True
+        return False
+
+    try:
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                parser.feed(chunk)
+                if drain():
+                    break
+            else:
+                parser.close()
+                drain()
+    except Exception as e:
+        print(f"Error parsing {file_path}: {e}")
+        return None
+
+    data = {}
+    data['file'] = os.path.basename(file_path)
+    data['timestamp'] = extract_timestamp_from_filename(data['file'])
+    data.update(collector.result())
+    return data
+
 # def main_lxml():
 #     # Change target_url as needed (folder name within your snapshots folder)
 #     target_url = "{target_url}"
@@ -170,7 +616,13 @@ def extract_data_lxml(file_path):
 # if __name__ == "__main__":
 #     main_lxml()
 
-def main_lxml_multi():
+def main_lxml_multi(parallel=True, workers=None, chunksize=16, store_dir=None, output_format="csv"):
+    """
+    Extract every snapshot folder (or every app in a snapshot store) to a
+    per-app CSV, optionally sharding files over a process pool. With
+    output_format="parquet" the rows go to one dataset under
+    `{output_dir}/parquet`, partitioned by app and year.
+    """
     target_url = "{target_url}"
     downloads  = "1M+"                            # ← this also becomes your output folder name
 
@@ -190,23 +642,69 @@ def main_lxml_multi():
         'downloads','reviews','description','whats_new'
     ]
 
-    for sub in os.listdir(base_dir):
-        sub_path = os.path.join(base_dir, sub)
-        if not os.path.isdir(sub_path):
-            continue
+    # Each group is (csv name, extraction function, inputs): snapshot store apps or html folders
+    if store_dir:
+        with SnapshotStore(store_dir) as store:
+            groups = [
+                (app_id, extract_store_capture,
+                 [(store_dir, app_id, timestamp) for _, timestamp, _ in store.captures(app_id)])
+                for app_id in store.app_ids()
+            ]
+    else:
+        groups = []
+        for sub in os.listdir(base_dir):
+            sub_path = os.path.join(base_dir, sub)
+            if os.path.isdir(sub_path):
+                groups.append((sub, extract_data_lxml_plan, glob.glob(os.path.join(sub_path, "*.html"))))
+
+    # One pool for the whole run; workers=None uses every core
+    pool = ProcessPoolExecutor(max_workers=workers) if parallel else None
+    total_files = 0
+    run_start = time.perf_counter()
 
-        print(f"Processing folder: {sub}")
-        rows = []
-        for fp in glob.glob(os.path.join(sub_path, "*.html")):
-            rows.append(extract_data_lxml(fp))
-
-        csv_path = os.path.join(output_dir, f"{sub}.csv")
-        with open(csv_path, 'w', newline='', encoding='utf-8') as csvf:
-            writer = csv.DictWriter(csvf, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
+    try:
+        for sub, extract, files in groups:
+            print(f"Processing folder: {sub}")
+            start = time.perf_counter()
 
-        print(f"  → Wrote {len(rows)} rows to {csv_path}")
+            # pool.map yields results in input order while later chunks are still parsing
+            if pool:
+                results = pool.map(extract, files, chunksize=chunksize)
+            else:
+                results = map(extract, files)
+
+            written = 0
+            if output_format == "parquet":
+                csv_path = os.path.join(output_dir, "parquet")
+                drop_app_partition(csv_path, sub)
+                with ParquetRecordWriter(csv_path, fieldnames, app_id=sub) as writer:
+                    for row in results:
+                        if row:
+                            writer.writerow(row)
+                            written += 1
+            else:
+                csv_path = os.path.join(output_dir, f"{sub}.csv")
+                with open(csv_path, 'w', newline='', encoding='utf-8') as csvf:
+                    writer = csv.DictWriter(csvf, fieldnames=fieldnames)
+                    writer.writeheader()
+                    for row in results:
+                        if row:
+                            writer.writerow(row)
+                            written += 1
+
+            elapsed = time.perf_counter() - start
+            total_files += len(files)
+            rate = len(files) / elapsed if elapsed > 0 else 0.0
+            print(f"  → Wrote {written} rows to {csv_path} ({rate:.1f} files/sec)")
+    finally:
+        if pool:
+            pool.shutdown()
+
+    elapsed = time.perf_counter() - run_start
+    mode = f"parallel, workers={workers or os.cpu_count()}, chunksize={chunksize}" if parallel else "serial"
+    if elapsed > 0:
+        print(f"Processed {total_files} files in {elapsed:.1f}s "
+              f"({total_files / elapsed:.1f} files/sec, {mode})")
 
 if __name__ == "__main__":
     main_lxml_multi()
@@ -0,0 +1,254 @@
+"""
+Batched LLM Record Cleaner
+==========================
+
+Batch engine for advanced_fintech_data_cleaner.py, replacing one HTTP
+request (on a fresh connection) plus a one-second sleep per DataFrame row.
+
+Key Features:
+- Many records per prompt: the model returns a JSON array in input order
+- Several batches in flight at once over one pooled requests.Session
+- On-disk SQLite response cache keyed by the SHA-256 of the prompt
+  instructions and the record, so re-runs (and duplicate rows) cost no calls
+- Failed or malformed batch responses fall back to the original records and
+  are not cached, so the next run retries them
+- Call, cache-hit and failure counts for every run
+- Tiered cleaning (clean_frame_tiered): the deterministic rules of
+  fintech_data_cleaner_standardizer first, validate_frame() to flag what they
+  could not normalize, and the LLM only for the flagged rows
+
+Usage:
+    cleaner = BatchRecordCleaner(GEMINI_ENDPOINT, GEMINI_API_KEY)
+    cleaned = cleaner.clean(records)
+    cleaner.report()
+
+    stats = TierStats()
+    cleaned_df = clean_frame_tiered(raw_df, cleaner, stats)
+    stats.report()
+
+Author: ISB Fintech Research Team
+Project: Fintech App Data Processing Pipeline
+Institution: Indian School of Business (ISB)
+"""
+
+import hashlib
+import json
+import math
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from fintech_data_cleaner_standardizer import clean_frame, validate_frame
+
+BATCH_INSTRUCTIONS = (
+    "You are a data cleaning assistant. Clean and normalize each JSON record in the "
+    "following array, extracted from Play Store HTML snapshots. Ensure that:\n"
+    "- All extra spaces and newlines are removed\n"
+    "- Ratings are converted to numeric values\n"
+    "- The number of installs is normalized (remove commas, plus signs, etc.)\n"
+    "- All text fields are properly trimmed\n"
+    "Return only a JSON array with exactly one cleaned record per input record, "
+    "in the same order.\n\n"
+    "Records:\n"
+)
+
+
+def json_safe(record):
+    """Record with NaN values replaced by None so it serializes as valid JSON"""
+    return {k: (None if isinstance(v, float) and math.isnan(v) else v) for k, v in record.items()}
+
+
+def record_key(record, instructions=BATCH_INSTRUCTIONS):
+    """Cache key: changes whenever the record or the prompt instructions change"""
+    payload = json.dumps([instructions, record], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """SQLite store of cleaned records keyed by record_key()"""
+
+    def __init__(self, path="gemini_cleaning_cache.sqlite"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, record TEXT)")
+        self.db.commit()
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        with self.lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                query = f"SELECT key, record FROM responses WHERE key IN ({','.join('?' * len(chunk))})"
+                for key, record in self.db.execute(query, chunk):
+                    found[key] = json.loads(record)
+        return found
+
+    def put_many(self, items):
+        with self.lock, self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?)",
+                [(key, json.dumps(record, ensure_ascii=False)) for key, record in items]
+            )
+
+    def close(self):
+        self.db.close()
+
+
+class BatchRecordCleaner:
+    """Clean records with an LLM endpoint in cached, concurrent batches"""
+
+    def __init__(self, endpoint, api_key, batch_size=20, max_in_flight=4,
+                 cache_path="gemini_cleaning_cache.sqlite", max_retries=3, retry_delay=5, timeout=120):
+        self.endpoint = endpoint
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self.cache = ResponseCache(cache_path) if cache_path else None
+
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight))
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=max_in_flight))
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json",
+        })
+
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.cache_hits = 0
+        self.failed_batches = 0
+        self.records_sent = 0
+
+    def _post_batch(self, records):
+        """One request for a batch; returns the cleaned records or None"""
+        payload = {
+            "prompt": BATCH_INSTRUCTIONS + json.dumps(records, ensure_ascii=False),
+            "temperature": 0,
+            "maxOutputTokens": 250 * len(records),
+        }
+        delay = self.retry_delay
+        for attempt in range(self.max_retries):
+            try:
+                with self.lock:
+                    self.calls += 1
+                response = self.session.post(self.endpoint, json=payload, timeout=self.timeout)
+                if response.status_code == 429 or response.status_code >= 500:
+                    raise requests.HTTPError(f"HTTP {response.status_code}")
+                response.raise_for_status()
+                # Assume the API returns the cleaned JSON array in a field called "result"
+                cleaned = json.loads(response.json().get("result", "[]"))
+                if isinstance(cleaned, list) and len(cleaned) == len(records) \
+                        and all(isinstance(r, dict) for r in cleaned):
+                    return cleaned
+                print(f"Malformed batch response ({len(records)} records), keeping originals")
+                return None
+            except (requests.RequestException, ValueError) as e:
+                if attempt == self.max_retries - 1:
+                    print("Error cleaning batch with Gemini:", e)
+                    return None
+                time.sleep(delay + random.uniform(0, 1))
+                delay *= 2
+        return None
+
+    def clean(self, records):
+        """Cleaned copies of records, in order; cache hits and duplicates are not sent"""
+        records = [json_safe(record) for record in records]
+        keys = [record_key(record) for record in records]
+        results = self.cache.get_many(set(keys)) if self.cache else {}
+        self.cache_hits += sum(1 for key in keys if key in results)
+
+        pending = {}
+        for key, record in zip(keys, records):
+            if key not in results:
+                pending.setdefault(key, record)
+        pending = list(pending.items())
+        batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+
+        with ThreadPoolExecutor(max_workers=self.max_in_flight) as pool:
+            responses = pool.map(lambda batch: self._post_batch([r for _, r in batch]), batches)
+            for batch, cleaned in zip(batches, responses):
+                self.records_sent += len(batch)
+                if cleaned is None:
+                    self.failed_batches += 1
+                    continue
+                items = [(key, record) for (key, _), record in zip(batch, cleaned)]
+                results.update(items)
+                if self.cache:
+                    self.cache.put_many(items)
+
+        return [results.get(key, record) for key, record in zip(keys, records)]
+
+    def report(self):
+        print(f"LLM cleaning: {self.calls} API calls for {self.records_sent} records, "
+              f"{self.cache_hits} cache hits, {self.failed_batches} failed batches")
+
+    def close(self):
+        self.session.close()
+        if self.cache:
+            self.cache.close()
+
+
+class TierStats:
+    """Row counts per cleaning tier"""
+
+    def __init__(self):
+        self.rows = 0
+        self.flagged = 0
+        self.resolved = 0
+
+    def report(self):
+        rules = self.rows - self.flagged
+        unresolved = self.flagged - self.resolved
+        pct = lambda n, d: 100.0 * n / d if d else 0.0
+        print(f"Tier 1 (rules):     {rules}/{self.rows} rows ({pct(rules, self.rows):.1f}%)")
+        print(f"Tier 2 (LLM):       {self.resolved}/{self.flagged} flagged rows resolved "
+              f"({pct(self.resolved, self.flagged):.1f}%)")
+        print(f"Unresolved:         {unresolved} rows keep their rule-cleaned values")
+
+
+def _present(frame, col):
+    return (frame[col].notna() & (frame[col].astype(object).map(str).str.strip() != "")).astype(bool)
+
+
+def clean_frame_tiered(raw, llm_cleaner, stats=None):
+    """
+    Rule-clean a raw snapshot frame and send only the rows validate_frame()
+    flags to llm_cleaner. The LLM's answer replaces a flagged cell only when
+    it is present and passes the same validator after rule cleaning;
+    otherwise the cell keeps its rule-cleaned value.
+    """
+    cleaned = clean_frame(raw)
+    flags = validate_frame(raw, cleaned)
+    flagged = flags.any(axis=1)
+    resolved = 0
+
+    if flagged.any():
+        raw_flagged = raw[flagged]
+        answers = llm_cleaner.clean(raw_flagged.to_dict('records'))
+        llm = pd.DataFrame(answers, index=raw_flagged.index).reindex(columns=raw.columns)
+        llm_cleaned = clean_frame(llm)
+        llm_flags = validate_frame(llm, llm_cleaned)
+
+        accepted = pd.DataFrame(index=raw_flagged.index)
+        for col in flags.columns:
+            accepted[col] = flags.loc[flagged, col] & ~llm_flags[col] & _present(llm, col)
+            rows = accepted.index[accepted[col]]
+            cleaned.loc[rows, col] = llm_cleaned.loc[rows, col]
+        resolved = int((accepted | ~flags[flagged]).all(axis=1).sum())
+
+    if stats is not None:
+        stats.rows += len(raw)
+        stats.flagged += int(flagged.sum())
+        stats.resolved += resolved
+    return cleaned
@@ -0,0 +1,69 @@
+"""
+Match Scoring
+=============
+
+Vectorized result stage shared by the app-company matchers, replacing the
+per-app loop of `.loc[idx]` lookups, argsorts, `.item()` calls and
+`iloc[best_idx]` company lookups. Scores come from CompanyVectorIndex in
+blocks of apps (torch.topk for exact search), and the results DataFrame is
+built column-wise with fancy indexing.
+
+Key Features:
+- Best match plus k-1 ranked alternates per app (ALT_COMPANY_n /
+  ALT_SIMILARITY_n columns)
+- Threshold applied to whole columns at once
+- Results appended to the existing CSV; a CSV written with a different
+  column set (e.g. before alternates existed) is rewritten with the union
+
+Usage:
+    scores, indices = CompanyVectorIndex(company_embeddings).search(app_embeddings, k=3)
+    results = build_match_frame(df_apps, df_companies, scores, indices, threshold=0.50)
+    append_results('app_company_matches_crude_all.csv', results)
+
+Author: ISB Fintech Research Team
+Project: Advanced App-Company Relationship Mining
+Institution: Indian School of Business (ISB)
+"""
+
+import csv
+import os
+
+import numpy as np
+import pandas as pd
+
+
+def build_match_frame(df_apps, df_companies, scores, indices, threshold):
+    """
+    Results frame for apps (in df_apps order) from top-k search results.
+    MATCHED_COMPANY/SIMILARITY hold the best company when its score reaches
+    threshold; the alternates are listed regardless of the threshold.
+    """
+    names = df_companies['Company Name'].to_numpy(dtype=object)[indices]
+    best_scores = scores[:, 0].astype(float)
+    matched = (best_scores >= threshold) & pd.notna(names[:, 0])
+
+    results = pd.DataFrame({
+        'APP_NAME': df_apps['APP_NAME'].to_numpy(),
+        'DEVELOPER': df_apps['DEVELOPER'].to_numpy(),
+        'MATCHED_COMPANY': np.where(matched, names[:, 0], None),
+        'SIMILARITY': np.where(matched, best_scores, np.nan),
+    })
+    for rank in range(1, indices.shape[1]):
+        results[f'ALT_COMPANY_{rank}'] = names[:, rank]
+        results[f'ALT_SIMILARITY_{rank}'] = scores[:, rank].astype(float)
+    return results
+
+
+def append_results(csv_file, results):
+    """Append results to csv_file, writing the header for a new file"""
+    if not os.path.isfile(csv_file) or os.path.getsize(csv_file) == 0:
+        results.to_csv(csv_file, index=False)
+        return
+    with open(csv_file, 'r', newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f), [])
+    if header == list(results.columns):
+        results.to_csv(csv_file, mode='a', index=False, header=False)
+    else:
+        # Column set changed since the file was started: rewrite it with both
+        previous = pd.read_csv(csv_file)
+        pd.concat([previous, results], ignore_index=True).to_csv(csv_file, index=False)
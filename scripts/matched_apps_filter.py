@@ -0,0 +1,77 @@
+"""
+Matched Apps Filter
+===================
+
+Vectorized "already matched" filter shared by the app-company matchers,
+replacing a row-wise `df_apps.apply(is_matched, axis=1)` lookup into a set
+of (name, developer) tuples, which also failed on missing names.
+
+Apps are keyed by their normalized (APP_NAME, DEVELOPER) pair and removed
+with a left anti-join against the keys to exclude:
+- the manually matched pairs (Company-App Matching v1.xlsx)
+- for incremental runs, the apps already present in the matcher's own
+  results CSV (app_company_matches_*.csv), so only apps added since the
+  last run are matched and appended
+
+Key Features:
+- Keys are stripped and lowercased; missing names or developers become
+  empty strings instead of raising
+- One merge for the whole app list, no per-row Python calls
+- Only the key columns of a results CSV are read, in chunks
+
+Usage:
+    df_apps_to_match = apps_to_match(df_apps, df_matched, 'app_company_matches_crude_all.csv')
+
+Author: ISB Fintech Research Team
+Project: Advanced App-Company Relationship Mining
+Institution: Indian School of Business (ISB)
+"""
+
+import os
+
+import pandas as pd
+
+KEY_COLUMNS = ['APP_NAME', 'DEVELOPER']
+
+
+def match_keys(df, columns=KEY_COLUMNS):
+    """Normalized key columns of df: stripped, lowercased, missing as ''"""
+    keys = pd.DataFrame(index=range(len(df)))
+    for col in columns:
+        values = df[col] if col in df.columns else pd.Series([None] * len(df))
+        values = values.astype(object).where(values.notna(), '')
+        keys[col] = values.astype(str).str.strip().str.lower().to_numpy()
+    return keys
+
+
+def result_keys(csv_file, chunksize=100000):
+    """Normalized app keys already written to a results CSV (empty if there is none)"""
+    if not os.path.isfile(csv_file) or os.path.getsize(csv_file) == 0:
+        return pd.DataFrame(columns=KEY_COLUMNS)
+    chunks = pd.read_csv(csv_file, usecols=KEY_COLUMNS, dtype=str, chunksize=chunksize)
+    return pd.concat([match_keys(chunk).drop_duplicates() for chunk in chunks],
+                     ignore_index=True).drop_duplicates()
+
+
+def exclude_matched(df_apps, *key_frames):
+    """Rows of df_apps whose normalized key is in none of key_frames (left anti-join)"""
+    frames = [keys for keys in key_frames if len(keys)]
+    if not frames:
+        return df_apps.copy()
+    exclude = pd.concat(frames, ignore_index=True).drop_duplicates()
+    merged = match_keys(df_apps).merge(exclude, on=KEY_COLUMNS, how='left', indicator=True)
+    return df_apps[(merged['_merge'] == 'left_only').to_numpy()].copy()
+
+
+def apps_to_match(df_apps, df_matched, results_csv=None, incremental=True):
+    """
+    Apps still to be matched: not in the manually matched pairs and, for
+    incremental runs, not already in results_csv from an earlier run.
+    """
+    key_frames = [match_keys(df_matched)]
+    if incremental and results_csv:
+        key_frames.append(result_keys(results_csv))
+    remaining = exclude_matched(df_apps, *key_frames)
+    print(f"Apps to match: {len(remaining)} of {len(df_apps)} "
+          f"({len(df_apps) - len(remaining)} already matched)")
+    return remaining
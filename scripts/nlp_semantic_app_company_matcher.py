@@ -17,22 +17,29 @@ Methodology:
 Technical Approach:
 1. Text Preprocessing: Combines multiple fields (name, description, category)
 2. Embedding Generation: Creates vector representations using pre-trained models
-3. Similarity Computation: Calculates cosine similarity matrix
+3. Similarity Computation: Top-k cosine search over a company vector index
 4. Threshold Filtering: Applies minimum similarity requirements
-5. Batch Processing: Outputs results in configurable batch sizes
+5. Output: Results built column-wise and appended in one write
 
 Key Features:
 - Uses 'all-MiniLM-L6-v2' sentence transformer model
 - Configurable similarity threshold (default: 0.50)
-- Memory-efficient batch processing (default: 10 records)
-- Excludes already matched app-company pairs
+- Best match plus ranked top-k alternates per app (default: k = 3)
+- Excludes already matched app-company pairs (vectorized anti-join)
+- Incremental runs: only apps not yet in the results CSV are matched
 - Outputs structured CSV with similarity scores
 
 Performance Optimizations:
 - Tensor-based computations for speed
-- Batch writing to reduce I/O operations
+- Persistent embedding cache: repeat runs only encode new or changed texts
+- Multi-process, length-sorted encoding streamed to disk shards, with
+  sentences/sec per core reported
+- Optional ONNX Runtime int8 backend (onnx_sentence_encoder.py) for
+  CPU-only nodes
+- Vector index (FAISS / hnswlib / blocked exact) instead of a dense
+  similarity matrix: memory grows with apps x k, not apps x companies
+- Vectorized scoring stage: blocked torch.topk, no per-app Python loop
 - Memory management for large datasets
-- Incremental processing support
 
 Input Data:
 - apps-newl-1_clean.csv: Cleaned fintech application dataset
@@ -49,17 +56,21 @@ Dependencies:
     - sentence-transformers: Semantic text embeddings
     - pandas: Data manipulation and analysis
     - torch: Tensor computations (via sentence-transformers)
+    - faiss-cpu / hnswlib: Vector index backends (optional)
+    - onnxruntime: int8 inference backend (optional)
 
 Author: ISB Fintech Research Team
 Project: Advanced App-Company Relationship Mining
 Institution: Indian School of Business (ISB)
 """
 
-import os
 import pandas as pd
-from sentence_transformers import SentenceTransformer, util
+from company_vector_index import CompanyVectorIndex
+from embedding_cache import open_embedding_cache
+from match_scoring import append_results, build_match_frame
+from matched_apps_filter import apps_to_match
 
-def main():
+def main(threshold=0.50, top_k=3, incremental=True, encode_processes=None, backend="torch"):
     # -------------------------------------------------------------------------
     # 1. Load Data
     # -------------------------------------------------------------------------
@@ -70,16 +81,14 @@ def main():
     # -------------------------------------------------------------------------
     # 2. Exclude Already Matched Apps
     # -------------------------------------------------------------------------
-    matched_set = set(zip(
-        df_matched['APP_NAME'].str.lower().fillna(''),
-        df_matched['DEVELOPER'].str.lower().fillna('')
-    ))
-
-    # Filter out apps that have already been matched
-    def is_matched(row):
-        return (row['APP_NAME'].lower(), row['DEVELOPER'].lower()) in matched_set
-
-    df_apps_to_match = df_apps[~df_apps.apply(is_matched, axis=1)].copy()
+    # Vectorized anti-join on normalized (APP_NAME, DEVELOPER) keys. With
+    # incremental=True, apps already in the results CSV from an earlier run
+    # are skipped too, so only newly added apps are matched.
+    csv_file = 'app_company_matches_crude_all.csv'
+    df_apps_to_match = apps_to_match(df_apps, df_matched, csv_file, incremental)
+    if df_apps_to_match.empty:
+        print(f"No new apps to match; '{csv_file}' is up to date.")
+        return
 
     # -------------------------------------------------------------------------
     # 3. Prepare Text Fields for NLP
@@ -103,67 +112,36 @@ def main():
     # -------------------------------------------------------------------------
     # 4. Generate Embeddings
     # -------------------------------------------------------------------------
-    model = SentenceTransformer('all-MiniLM-L6-v2')
+    # Embeddings persist in an on-disk cache; only new or changed texts are
+    # encoded, shortest first, with one worker process per core by default.
+    # backend="onnx-int8" runs the quantized ONNX Runtime model instead of torch.
+    embeddings = open_embedding_cache('all-MiniLM-L6-v2', backend, encode_processes)
 
     app_texts = df_apps_to_match['app_text'].tolist()
     company_texts = df_companies['company_text'].tolist()
 
-    app_embeddings = model.encode(app_texts, convert_to_tensor=True)
-    company_embeddings = model.encode(company_texts, convert_to_tensor=True)
+    app_embeddings = embeddings.encode(app_texts)
+    company_embeddings = embeddings.encode(company_texts)
+    embeddings.report()
 
     # -------------------------------------------------------------------------
-    # 5. Compute Similarity Scores
+    # 5. Find the Nearest Companies
     # -------------------------------------------------------------------------
-    similarity_matrix = util.cos_sim(app_embeddings, company_embeddings)
+    # Top-k cosine search over a company vector index, in blocks of apps,
+    # instead of materializing the full apps x companies similarity matrix
+    company_index = CompanyVectorIndex(company_embeddings)
+    top_scores, top_indices = company_index.search(app_embeddings, k=top_k)
 
     # -------------------------------------------------------------------------
-    # 6. Find Matches and Append to CSV in Batches of 10
+    # 6. Build the Matches Column-wise and Append to CSV
     # -------------------------------------------------------------------------
-    # Threshold for a "valid" match
-    threshold = 0.50
-    batch_size = 10
+    # Best company per app (if above threshold) plus top_k - 1 ranked alternates
+    results = build_match_frame(df_apps_to_match, df_companies, top_scores, top_indices, threshold)
 
-    # If the CSV doesn't exist, we'll need headers. Otherwise, we append without headers.
-    csv_file = 'app_company_matches_crude_all.csv'
-    file_exists = os.path.isfile(csv_file)
-
-    # Prepare to collect rows in memory and write them in batches of 10
-    rows_to_write = []
-    df_index = df_apps_to_match.index  # We'll iterate over the matched DataFrame's indices
-
-    for i, idx in enumerate(df_index):
-        app_row = df_apps_to_match.loc[idx]
-        sim_scores = similarity_matrix[i]
-
-        # Sort companies by descending similarity and get the best match
-        best_idx = sim_scores.argsort(descending=True)[0].item()
-        best_score = sim_scores[best_idx].item()
-        best_company = df_companies.iloc[best_idx]['Company Name']
-
-        # If best score is below threshold, set MATCHED_COMPANY to None
-        matched_company = best_company if best_score >= threshold else None
-
-        # Add row to our batch
-        rows_to_write.append({
-            'APP_NAME': app_row['APP_NAME'],
-            'DEVELOPER': app_row['DEVELOPER'],
-            'MATCHED_COMPANY': matched_company,
-            'SIMILARITY': best_score if matched_company else None
-        })
-
-        # After every 10 apps, write to CSV
-        if (i + 1) % batch_size == 0:
-            batch_df = pd.DataFrame(rows_to_write)
-            batch_df.to_csv(csv_file, mode='a', index=False, header=(not file_exists))
-            file_exists = True
-            rows_to_write.clear()
-
-    # Write any remaining rows (if total apps % 10 != 0)
-    if rows_to_write:
-        batch_df = pd.DataFrame(rows_to_write)
-        batch_df.to_csv(csv_file, mode='a', index=False, header=(not file_exists))
-
-    print(f"Matching complete. Results appended to '{csv_file}' in batches of {batch_size}.")
+    # If the CSV doesn't exist, it is created with headers. Otherwise, we append.
+    append_results(csv_file, results)
+
+    print(f"Matching complete. {len(results)} results appended to '{csv_file}'.")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,258 @@
+"""
+ONNX Runtime Sentence Encoder
+=============================
+
+Optional CPU inference backend for the semantic matchers: the
+SentenceTransformer model ('all-MiniLM-L6-v2') is exported once to ONNX,
+dynamically quantized to int8 weights, and run with ONNX Runtime instead of
+full-precision PyTorch.
+
+Export (first use, needs torch + sentence-transformers):
+    {root}/{model}/model.onnx         float32 transformer graph
+    {root}/{model}/model_int8.onnx    dynamic int8 quantization (QInt8 weights)
+    {root}/{model}/tokenizer files + encoder.json (max length, normalization)
+
+Inference (later runs) needs only onnxruntime and the tokenizer.
+
+Key Features:
+- `encode()` is call-compatible with SentenceTransformer.encode for
+  EmbeddingCache; embeddings use the same mean pooling and normalization
+- Batches are length-sorted to reduce padding; ONNX Runtime spreads each
+  batch over all cores
+- Separate embedding cache name per backend, so float and int8 vectors are
+  never mixed
+- Accuracy check against the float model on the matched-pairs spreadsheet
+  (embedding cosine, top-1 company agreement, and accuracy against the
+  spreadsheet's company column when present) plus latency/throughput
+
+Usage:
+    encoder = OnnxSentenceEncoder('all-MiniLM-L6-v2')
+    vectors = encoder.encode(texts)
+
+    python onnx_sentence_encoder.py    # accuracy + latency check
+
+Dependencies:
+    - onnxruntime
+    - transformers (tokenizer)
+    - torch, sentence-transformers, onnx (export only)
+
+Author: ISB Fintech Research Team
+Project: Advanced App-Company Relationship Mining
+Institution: Indian School of Business (ISB)
+"""
+
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+ONNX_INPUTS = ['input_ids', 'attention_mask', 'token_type_ids']
+
+
+def export_onnx_model(model_name, out_dir, opset=14):
+    """Export a mean-pooling SentenceTransformer to ONNX and quantize it to int8"""
+    try:
+        import onnx  # needed by torch.onnx.export and quantize_dynamic
+    except ImportError:
+        raise ImportError("Exporting the ONNX backend requires onnx: pip install onnx onnxruntime")
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    st_model = SentenceTransformer(model_name, device='cpu')
+    transformer = st_model[0]
+    pooling = [m for m in st_model if isinstance(m, Pooling)]
+    if len(pooling) != 1 or pooling[0].get_pooling_mode_str() != 'mean':
+        raise ValueError(f"{model_name}: only mean-pooling models can be exported")
+
+    class HiddenStates(torch.nn.Module):
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.model(input_ids=input_ids, attention_mask=attention_mask,
+                              token_type_ids=token_type_ids)[0]
+
+    os.makedirs(out_dir, exist_ok=True)
+    sample = transformer.tokenizer(["export sample"], return_tensors='pt')
+    if 'token_type_ids' not in sample:
+        sample['token_type_ids'] = torch.zeros_like(sample['input_ids'])
+    fp32_path = os.path.join(out_dir, "model.onnx")
+    torch.onnx.export(
+        HiddenStates(transformer.auto_model).eval(),
+        tuple(sample[name] for name in ONNX_INPUTS),
+        fp32_path,
+        input_names=ONNX_INPUTS,
+        output_names=['last_hidden_state'],
+        dynamic_axes={name: {0: 'batch', 1: 'sequence'} for name in ONNX_INPUTS + ['last_hidden_state']},
+        opset_version=opset,
+    )
+    quantize_dynamic(fp32_path, os.path.join(out_dir, "model_int8.onnx"), weight_type=QuantType.QInt8)
+
+    transformer.tokenizer.save_pretrained(out_dir)
+    with open(os.path.join(out_dir, "encoder.json"), 'w') as f:
+        json.dump({
+            'model_name': model_name,
+            'max_seq_length': st_model.max_seq_length,
+            'normalize': any(isinstance(m, Normalize) for m in st_model),
+        }, f, indent=2)
+    print(f"Exported {model_name} to {out_dir}")
+
+
+class OnnxSentenceEncoder:
+    """SentenceTransformer-compatible encode() backed by an ONNX Runtime session"""
+
+    def __init__(self, model_name, root="onnx_models", quantize=True, threads=None,
+                 session=None, tokenizer=None, max_seq_length=256, normalize=True):
+        self.model_name = model_name
+        self.dir = os.path.join(root, re.sub(r'[^A-Za-z0-9._-]+', '_', model_name))
+        self.quantize = quantize
+        self.threads = threads
+        self.cache_name = f"{model_name}-onnx-{'int8' if quantize else 'fp32'}"
+        # session/tokenizer may be passed in directly (e.g. for tests)
+        self.session = session
+        self.tokenizer = tokenizer
+        self.max_seq_length = max_seq_length
+        self.normalize = normalize
+        self.dim = None
+
+    def _load(self):
+        if self.session is not None:
+            return
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        model_path = os.path.join(self.dir, "model_int8.onnx" if self.quantize else "model.onnx")
+        if not os.path.isfile(model_path):
+            export_onnx_model(self.model_name, self.dir)
+        with open(os.path.join(self.dir, "encoder.json"), 'r') as f:
+            config = json.load(f)
+        self.max_seq_length = config['max_seq_length']
+        self.normalize = config['normalize']
+        self.tokenizer = AutoTokenizer.from_pretrained(self.dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+
+    def dimension(self):
+        """Embedding size, from the session's output shape (or one encoded sentence if it is dynamic)"""
+        self._load()
+        if self.dim is None:
+            dim = self.session.get_outputs()[0].shape[-1]
+            self.dim = dim if isinstance(dim, int) else self._encode_batch([""]).shape[1]
+        return self.dim
+
+    def _encode_batch(self, texts):
+        tokens = self.tokenizer(texts, padding=True, truncation=True,
+                                max_length=self.max_seq_length, return_tensors='np')
+        mask = tokens['attention_mask'].astype(np.int64)
+        feed = {}
+        for model_input in self.session.get_inputs():
+            values = tokens.get(model_input.name)
+            feed[model_input.name] = np.zeros_like(mask) if values is None else values.astype(np.int64)
+        hidden = self.session.run(None, feed)[0]
+
+        # Mean pooling over real tokens, as sentence-transformers' Pooling module
+        weights = mask[:, :, None].astype(np.float32)
+        vectors = (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        if self.normalize:
+            vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        return vectors.astype(np.float32)
+
+    def encode(self, sentences, batch_size=64, convert_to_numpy=True, **kwargs):
+        """Embeddings for sentences as a float32 (len(sentences), dim) array"""
+        self._load()
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else ["" if s is None else str(s) for s in sentences]
+        if not texts:
+            return np.zeros((0, self.dimension()), dtype=np.float32)
+
+        order = np.argsort([len(text) for text in texts], kind='stable')
+        result = None
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            vectors = self._encode_batch([texts[i] for i in rows])
+            if result is None:
+                result = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            result[rows] = vectors
+        return result[0] if single else result
+
+
+def time_encoder(encoder, texts, batch_size=64, latency_samples=200):
+    """(sentences/sec over texts, median single-sentence latency in ms)"""
+    start = time.perf_counter()
+    vectors = encoder.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    throughput = len(texts) / max(time.perf_counter() - start, 1e-9)
+
+    latencies = []
+    for text in texts[:latency_samples]:
+        start = time.perf_counter()
+        encoder.encode([text], batch_size=1, convert_to_numpy=True)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return vectors, throughput, float(np.median(latencies)) if latencies else 0.0
+
+
+def compare_backends(float_model, onnx_encoder, app_texts, company_texts,
+                     true_companies=None, company_names=None, batch_size=64):
+    """
+    Accuracy and speed of onnx_encoder against float_model on the same
+    texts: per-text embedding cosine, top-1 company agreement and, when the
+    true company of each app is known, top-1 accuracy of both backends.
+    """
+    from company_vector_index import CompanyVectorIndex
+
+    results = {}
+    for label, model in (("float", float_model), ("onnx", onnx_encoder)):
+        app_vectors, throughput, latency = time_encoder(model, app_texts, batch_size)
+        company_vectors = model.encode(company_texts, batch_size=batch_size, convert_to_numpy=True)
+        _, indices = CompanyVectorIndex(company_vectors, backend="exact").search(app_vectors, k=1)
+        results[label] = (app_vectors, indices[:, 0])
+        print(f"{label:<6} {throughput:10.1f} sentences/sec, median latency {latency:.2f} ms/sentence")
+
+    a, b = results['float'][0], results['onnx'][0]
+    cosine = (a * b).sum(axis=1) / np.maximum(np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1), 1e-12)
+    agreement = np.mean(results['float'][1] == results['onnx'][1])
+    print(f"Embedding cosine float vs onnx: mean {cosine.mean():.4f}, min {cosine.min():.4f}")
+    print(f"Top-1 company agreement: {agreement * 100:.2f}% of {len(app_texts)} apps")
+
+    if true_companies is not None and company_names is not None:
+        truth = np.array([str(c).strip().lower() for c in true_companies], dtype=object)
+        names = np.array([str(c).strip().lower() for c in company_names], dtype=object)
+        for label in ("float", "onnx"):
+            accuracy = np.mean(names[results[label][1]] == truth)
+            print(f"Top-1 accuracy vs spreadsheet ({label}): {accuracy * 100:.2f}%")
+    return cosine, agreement
+
+
+def main(model_name='all-MiniLM-L6-v2', company_column='Company Name', batch_size=64):
+    """Accuracy and latency of the int8 ONNX backend on the matched-pairs spreadsheet"""
+    import pandas as pd
+    from sentence_transformers import SentenceTransformer
+
+    df_companies = pd.read_excel('companylist.xlsx', sheet_name=0)
+    df_matched = pd.read_excel('Company-App Matching v1.xlsx', sheet_name=0)
+
+    app_texts = (df_matched['APP_NAME'].fillna('') + ' ' + df_matched['DEVELOPER'].fillna('')).tolist()
+    company_texts = (
+        df_companies['Company Name'].fillna('') + ' ' +
+        df_companies['Category'].fillna('') + ' ' +
+        df_companies['Sector'].fillna('') + ' ' +
+        df_companies['Business Model'].fillna('') + ' ' +
+        df_companies['Company Overview'].fillna('')
+    ).tolist()
+    true_companies = df_matched[company_column].tolist() if company_column in df_matched.columns else None
+
+    compare_backends(SentenceTransformer(model_name, device='cpu'), OnnxSentenceEncoder(model_name),
+                     app_texts, company_texts, true_companies,
+                     df_companies['Company Name'].tolist(), batch_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1389 @@
+"""
+Pipeline Performance Benchmarks
+===============================
+
+Micro-benchmarks comparing the original implementations of pipeline stages
+with their optimised counterparts on the same inputs. Every benchmark also
+checks that both sides produce the same output, so a speed-up is never
+reported for a result that changed.
+
+Available Benchmarks:
+- xpath-plan: extract_data_lxml() vs extract_data_lxml_plan() on a snapshot set
+  (representative synthetic pages by default), field by field
+- streaming: full-DOM extract_data_lxml_plan() vs extract_data_streaming(),
+  each run in a fresh process so peak RSS can be compared, field by field
+- cleaner: row-by-row clean_frame_rows() vs vectorized clean_frame() on a
+  multi-million-row snapshot table (synthetic, or a CSV repeated to size)
+- cleaner-chunked: whole-file vs chunked clean_csv(), each in a fresh
+  process, comparing peak RSS and the output files byte for byte
+- llm-batch: one request per record vs BatchRecordCleaner (cold and warm
+  cache) against a local stub of the cleaning endpoint
+- tiered: LLM for every row vs clean_frame_tiered() (rules, validator, LLM
+  for flagged rows only) against the same stub
+- vector-index: dense similarity matrix + full argsort vs CompanyVectorIndex
+  top-k search on random embeddings
+- embedding-cache: cold vs warm EmbeddingCache.encode() with a
+  SentenceTransformer model; --processes for multi-process encoding
+- embedding-pool: EmbeddingCache in-process vs multi-process encoding around
+  pool_min_misses with a fake model (workers' thread setting, vectors)
+- match-scoring: the per-app matcher loop vs top-k search plus the
+  column-wise build_match_frame(), from precomputed embeddings
+- fuzzy-index: per-app process.extractOne vs FuzzyCompanyIndex (cdist full
+  scan and n-gram prefilter) on synthetic company names
+- matched-filter: row-wise apply(is_matched) vs the anti-join of
+  matched_apps_filter.apps_to_match()
+- onnx-encoder: float PyTorch SentenceTransformer vs the int8 ONNX Runtime
+  encoder (throughput, latency, embedding cosine, top-1 agreement)
+- onnx-pooling: OnnxSentenceEncoder mean pooling and normalization with a
+  fake session and tokenizer against hand-computed embeddings
+- async-fetch: fetch_snapshots() at increasing concurrency against a local
+  Wayback stub, with a blocking on_result (parse + fsynced write) per snapshot
+- http-transport: a new connection per request (bare requests.get) vs the
+  shared keep-alive WaybackTransport, against a local Wayback stub
+- cdx-discovery: one unbounded JSON CDX query vs paged, streamed
+  CdxDiscovery (first row, total, resume after an interruption, warm cache)
+- cdx-plan: sequential per-app CDX queries vs plan_discovery() with
+  bounded-concurrency per-app queries and with one prefix scan
+- sampling-plan: fetching every monthly capture vs SamplingPlanner
+  cadences, comparing estimated with actual requests and runtime
+- adaptive-rate: the fixed sleeps of get_snapshot_content() (time-scaled)
+  vs AdaptiveRateController against a stub that returns 429 + Retry-After
+- scraper-concurrent: process_app() of the bulk scraper sequential vs
+  concurrent against a local Wayback stub, checking the stored snapshots,
+  ledger marks and CSV rows of each
+
+Usage:
+    python performance_benchmarks.py xpath-plan html_snapshots/ --repeat 3
+    python performance_benchmarks.py cleaner --rows 2000000
+
+Author: ISB Fintech Research Team
+Project: Historical App Data Processing Pipeline
+Institution: Indian School of Business (ISB)
+"""
+
+import argparse
+import filecmp
+import glob
+import json
+import multiprocessing
+import os
+import re
+import resource
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import numpy as np
+import pandas as pd
+
+
+def time_call(func, items, repeat):
+    """Best-of-`repeat` wall time for calling func on every item, plus the last results"""
+    best = None
+    results = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [func(item) for item in items]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, results
+
+
+def report(label, count, seconds, unit):
+    rate = count / seconds if seconds > 0 else float('inf')
+    print(f"  {label:<28} {seconds:8.3f}s  {rate:10.1f} {unit}/sec")
+
+
+def synthetic_play_store_pages(directory, script_kb=256):
+    """
+    Write representative archived Play Store pages to `directory`: the old
+    layout (primary selectors), the newer one (fallbacks only), a "What's New"
+    heading split across inline tags, a heading nested in wrapper divs,
+    repeated headings, several "recent-change" blocks, whitespace-only
+    primaries, nested
+    description blocks and a page without any field. Each page carries
+    `script_kb` KB of inline script, as archived pages do.
+    Returns the written file paths.
+    """
+    script = "<script>var data = '" + "x" * (script_kb * 1024) + "';</script>"
+    wrap = lambda body, depth: "<div class='w'>" * depth + body + "</div>" * depth
+    old_layout = (
+        "<h1 class='AHFaub'><span>Old Layout Bank</span></h1>"
+        "<div class='BHMmbe'>4.3</div>"
+        "<div class='hAyfc'><div>Installs</div><span>1,000,000+</span></div>"
+        "<span class='EymY4b'><span>icon</span><span>12,345</span> total</span>"
+        "<div jsname='sngebd'>Banking <b>made</b> simple.<br>Pay bills.</div>"
+        "<div><div>What's New</div><div>Bug fixes <i>and</i> UPI support</div><div>More notes</div></div>"
+    )
+    pages = {
+        'old_layout_20150326_002237': old_layout,
+        'new_layout_20200101_120000': (
+            "<h1 class='app-title'>New Layout Wallet</h1>"
+            "<div aria-label='Rated 4.1 stars out of five stars'></div>"
+            "<div><div>Installs</div><div>50,000+</div></div>"
+            "<span>9,876 reviews</span>"
+            "<div itemprop='description'><p>Wallet</p><p>for everyone</p></div>"
+            "<div class='recent-change'>Change A</div><div class='recent-change'>Change B</div>"
+        ),
+        'split_heading_20170615_080000': (
+            "<h1 class='AHFaub'><span>Split Heading Pay</span></h1>"
+            "<div><div>What's <span>New</span></div><div>Faster login</div></div>"
+            "<div class='whats-new'>Fallback notes</div>"
+        ),
+        'nested_heading_20180101_000000': wrap(
+            wrap("<div><h2>What's New</h2></div><div>Inner notes</div>", 3) + "<div>Outer notes</div>", 4),
+        'blank_primary_20160101_000000': (
+            "<h1 class='AHFaub'><span> </span></h1><h1 class='title'>Fallback Title</h1>"
+            "<div class='BHMmbe'>  </div><div aria-label='3.9 stars'></div>"
+            "<span class='EymY4b'><span>a</span><span> </span></span><span>77 reviews</span>"
+            "<div jsname='sngebd'> </div><div itemprop='description'>Desc fallback</div>"
+        ),
+        'nested_description_20190101_000000': (
+            "<div jsname='sngebd'>Outer <div jsname='sngebd'>inner</div> tail</div>"
+            "<div class='recent-change'>Outer change <div class='whats-new'>inner change</div> end</div>"
+            "<div class='recent-change'>Last change</div>"
+        ),
+        'repeated_heading_20190601_000000': (
+            "<div><div>What's New</div><div>First <div><div>What's New</div><div>Second</div></div></div></div>"
+            "<div><div><b>v2</b> What's New in v2</div><div>Tail heading notes</div></div>"
+        ),
+        'empty_20140101_000000': "<p>Nothing to see</p>",
+    }
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, body in pages.items():
+        path = os.path.join(directory, f"{name}.html")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"<html><head><title>{name}</title></head><body>{wrap(body, 6)}{script}</body></html>")
+        paths.append(path)
+    return paths
+
+
+def snapshot_files(snapshot_dir=None, limit=None):
+    """The .html files under snapshot_dir, or the synthetic_play_store_pages() set when it is None"""
+    if snapshot_dir is None:
+        snapshot_dir = tempfile.mkdtemp(prefix="play_store_pages_")
+        synthetic_play_store_pages(snapshot_dir)
+        print(f"No snapshot directory given: using representative pages in {snapshot_dir}")
+    files = sorted(glob.glob(os.path.join(snapshot_dir, "**", "*.html"), recursive=True))
+    return files[:limit] if limit else files
+
+
+def report_mismatches(expected_rows, rows, files):
+    """Print every field that differs between two extractors' rows; returns the number of differing rows"""
+    mismatches = 0
+    for fp, expected, row in zip(files, expected_rows, rows):
+        fields = [field for field in (expected or {}) if (row or {}).get(field) != expected[field]]
+        if fields:
+            mismatches += 1
+            for field in fields:
+                print(f"  {os.path.basename(fp)} {field}: expected {expected[field][:60]!r}, "
+                      f"got {(row or {}).get(field, '')[:60]!r}")
+    return mismatches
+
+
+def benchmark_xpath_plan(snapshot_dir=None, repeat=3, limit=None):
+    """Compare the string-XPath extractor with the precompiled ExtractionPlan"""
+    from lxml import html
+    from html_data_extractor_lxml import DEFAULT_PLAN, extract_data_lxml, extract_data_lxml_plan
+
+    files = snapshot_files(snapshot_dir, limit)
+    if not files:
+        print(f"No .html files found under {snapshot_dir}")
+        return
+
+    print(f"Benchmarking XPath extraction on {len(files)} files (best of {repeat})")
+    legacy_time, legacy_rows = time_call(extract_data_lxml, files, repeat)
+    plan_time, plan_rows = time_call(extract_data_lxml_plan, files, repeat)
+    report("extract_data_lxml", len(files), legacy_time, "files")
+    report("extract_data_lxml_plan", len(files), plan_time, "files")
+
+    # Isolate the XPath work from HTML parsing by reusing parsed trees
+    trees = []
+    for fp in files:
+        with open(fp, 'r', encoding='utf-8') as f:
+            trees.append(html.fromstring(f.read()))
+    extract_time, _ = time_call(DEFAULT_PLAN.extract, trees, repeat)
+    report("ExtractionPlan.extract only", len(trees), extract_time, "files")
+
+    mismatches = report_mismatches(legacy_rows, plan_rows, files)
+    print(f"  speed-up: {legacy_time / plan_time:.2f}x, mismatching rows: {mismatches}")
+
+
+def _run_extractor(name, files):
+    """Child-process body for benchmark_streaming: (seconds, peak RSS in KB, rows)"""
+    import html_data_extractor_lxml as extractor
+
+    func = getattr(extractor, name)
+    start = time.perf_counter()
+    rows = [func(fp) for fp in files]
+    elapsed = time.perf_counter() - start
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, rows
+
+
+def benchmark_streaming(snapshot_dir=None, limit=None):
+    """Compare the full-DOM extractor with the streaming extractor, one fresh process each"""
+    files = snapshot_files(snapshot_dir, limit)
+    if not files:
+        print(f"No .html files found under {snapshot_dir}")
+        return
+
+    size_mb = sum(os.path.getsize(fp) for fp in files) / 1e6
+    print(f"Benchmarking streaming extraction on {len(files)} files ({size_mb:.1f} MB)")
+    results = {}
+    for name in ("extract_data_lxml_plan", "extract_data_streaming"):
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            elapsed, max_rss, rows = pool.submit(_run_extractor, name, files).result()
+        results[name] = rows
+        report(name, len(files), elapsed, "files")
+        print(f"  {'':<28} peak RSS {max_rss / 1024:.1f} MB")
+
+    mismatches = report_mismatches(results["extract_data_lxml_plan"], results["extract_data_streaming"], files)
+    print(f"  rows with differing fields: {mismatches}")
+
+
+def synthetic_snapshot_table(rows, seed=0):
+    """Extractor-shaped table with the messy values the cleaner has to handle"""
+    rng = np.random.default_rng(seed)
+    samples = {
+        'app_title': ["  HDFC Bank\n", "Paytm: Secure UPI\tPayments ", "Jupiter\xa0Money", None],
+        'rating': ["4.5", "Rated 4.2 out of 5 stars", "४.१", "3.", "", None],
+        'downloads': ["1,000,000+", " 10,000,000+ ", "500+", None],
+        'reviews': ["1,234,567", "98,765 total", "१२३ reviews", None],
+        'description': ["Bank anytime.\r\n\r\nPay bills,  recharge and transfer money " * 12,
+                        "  Invest   in mutual funds\u2003and stocks.  " * 6, None],
+        'whats_new': ["", " Bug fixes and\n performance improvements ", None],
+    }
+    data = {
+        'file': [f"app_{i:08d}.html" for i in range(rows)],
+        'timestamp': ["20200101_000000"] * rows,
+    }
+    for col, values in samples.items():
+        codes = rng.integers(0, len(values), rows)
+        data[col] = [values[code] for code in codes]
+    return pd.DataFrame(data)
+
+
+def benchmark_cleaner(rows=2000000, input_csv=None):
+    """Compare the per-cell apply() cleaner with the vectorized clean_frame() engines"""
+    from fintech_data_cleaner_standardizer import clean_frame, clean_frame_rows, pa
+
+    if input_csv:
+        sample = pd.read_csv(input_csv, encoding='utf-8')
+        df = sample.iloc[np.arange(rows) % len(sample)].reset_index(drop=True)
+    else:
+        df = synthetic_snapshot_table(rows)
+    print(f"Benchmarking data cleaning on {len(df)} rows")
+
+    start = time.perf_counter()
+    expected = clean_frame_rows(df)
+    report("clean_frame_rows (apply)", len(df), time.perf_counter() - start, "rows")
+
+    engines = ["arrow", "pandas"] if pa is not None else ["pandas"]
+    for engine in engines:
+        # Warm the lazily built character classes outside the timed run
+        clean_frame(df.head(10), engine=engine)
+        start = time.perf_counter()
+        cleaned = clean_frame(df, engine=engine)
+        report(f"clean_frame ({engine})", len(df), time.perf_counter() - start, "rows")
+        identical = all(expected[col].astype(object).equals(cleaned[col].astype(object))
+                        for col in expected.columns)
+        print(f"  {'':<28} identical output: {identical}")
+        del cleaned
+
+
+def _write_synthetic_csv(path, rows):
+    synthetic_snapshot_table(rows).to_csv(path, index=False, encoding='utf-8')
+    return os.path.getsize(path)
+
+
+def _run_clean_csv(input_csv, output_csv, chunksize):
+    """Child-process body for benchmark_chunked_cleaner: (seconds, peak RSS in KB)"""
+    from fintech_data_cleaner_standardizer import clean_csv
+
+    start = time.perf_counter()
+    clean_csv(input_csv, output_csv, chunksize)
+    return time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def benchmark_chunked_cleaner(rows=1000000, chunksize=100000, input_csv=None):
+    """Compare whole-file and chunked clean_csv() memory and output"""
+    # spawn, not fork: a forked child would start with this process's pages resident
+    context = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        if not input_csv:
+            input_csv = os.path.join(tmp, "snapshots.csv")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                pool.submit(_write_synthetic_csv, input_csv, rows).result()
+        size_mb = os.path.getsize(input_csv) / 1e6
+        print(f"Benchmarking chunked cleaning of {input_csv} ({size_mb:.1f} MB)")
+
+        outputs = []
+        for label, size in (("whole file", None), (f"chunksize={chunksize}", chunksize)):
+            output_csv = os.path.join(tmp, f"cleaned_{len(outputs)}.csv")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                elapsed, max_rss = pool.submit(_run_clean_csv, input_csv, output_csv, size).result()
+            outputs.append(output_csv)
+            print(f"  {label:<28} {elapsed:8.3f}s  peak RSS {max_rss / 1024:.1f} MB")
+        print(f"  identical output: {filecmp.cmp(outputs[0], outputs[1], shallow=False)}")
+
+
+def stub_clean_value(field, value):
+    """What the stub "model" returns for a field: trimmed text, first rating number, ASCII counts"""
+    if not isinstance(value, str):
+        return value
+    if field == 'rating':
+        match = re.search(r'\d+(?:\.\d+)?', value)
+        return float(match.group()) if match else None
+    if field in ('downloads', 'reviews'):
+        return "".join(str(int(c)) for c in value if c.isdecimal()) or None
+    return " ".join(value.split())
+
+
+def start_cleaning_stub(latency=0.5):
+    """
+    Local stand-in for the LLM cleaning endpoint: echoes the record (or array
+    of records) at the end of the prompt with whitespace collapsed, after
+    `latency` seconds. Returns the running server; its URL is
+    http://127.0.0.1:{server.server_port}/.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            payload = json.loads(body['prompt'].rsplit(":\n", 1)[1])
+            clean = lambda record: {k: stub_clean_value(k, v) for k, v in record.items()}
+            result = [clean(r) for r in payload] if isinstance(payload, list) else clean(payload)
+            time.sleep(latency)
+            data = json.dumps({"result": json.dumps(result)}).encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stub_captures(app_id, captures):
+    """Synthetic CDX rows (timestamp original statuscode digest length) for one app, ~5 days apart"""
+    start = datetime(2014, 1, 1)
+    url = f"https://play.google.com/store/apps/details?id={app_id}"
+    return [[(start + timedelta(days=5 * i, seconds=i)).strftime('%Y%m%d%H%M%S'), url, "200",
+             f"D{zlib.crc32(f'{app_id}-{i // 3}'.encode()):010d}", str(40000 + (i * 7919) % 20000)]
+            for i in range(captures)]
+
+
+def stub_tls_context():
+    """Server TLS context with a throwaway self-signed certificate for 127.0.0.1"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = os.path.join(tmp, "cert.pem"), os.path.join(tmp, "key.pem")
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "ec", "-pkeyopt", "ec_paramgen_curve:prime256v1",
+                        "-nodes", "-keyout", key, "-out", cert, "-days", "1", "-subj", "/CN=127.0.0.1"],
+                       check=True, capture_output=True)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert, key)
+    return context
+
+
+def start_wayback_stub(latency=0.0, connect_delay=0.05, app_ids=(), captures=600, cdx_row_delay=0.0,
+                       cdx_latency=0.0, throttle_rate=None, retry_after=1, tls=False):
+    """
+    Local stand-in for web.archive.org. Every new connection first waits
+    `connect_delay` seconds, standing in for the TCP + TLS handshake. With
+    tls=True the stub serves HTTPS (throwaway self-signed certificate) and
+    the wait comes before its side of the TLS handshake, so a client sees
+    it inside its own connect time; over plain HTTP the kernel completes the
+    TCP handshake before the stub accepts, so the wait only delays the first
+    response.
+    - GET /web/{timestamp}/{url}: a small snapshot page after `latency` seconds;
+      with throttle_rate, requests beyond that many per second (token
+      bucket, burst of 5) get 429 with `Retry-After: {retry_after}`
+    - GET /cdx/search/cdx: plain-text or JSON CDX rows for app_ids
+      (`captures` each), honouring url, matchType=prefix, collapse=timestamp:N,
+      limit, showResumeKey and resumeKey (an offset); each query costs
+      `cdx_latency` seconds plus `cdx_row_delay` seconds per row
+    Returns the running server; its URL is http(s)://127.0.0.1:{server.server_port}.
+    """
+    index = sorted((row for app_id in app_ids for row in stub_captures(app_id, captures)),
+                   key=lambda row: (row[1], row[0]))
+    bucket = {'tokens': 5.0, 'updated': time.monotonic(), 'lock': threading.Lock()}
+
+    def admit():
+        if throttle_rate is None:
+            return True
+        with bucket['lock']:
+            now = time.monotonic()
+            bucket['tokens'] = min(5.0, bucket['tokens'] + (now - bucket['updated']) * throttle_rate)
+            bucket['updated'] = now
+            if bucket['tokens'] < 1:
+                return False
+            bucket['tokens'] -= 1
+            return True
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            time.sleep(connect_delay)
+            if tls:
+                self.request.do_handshake()
+            super().setup()
+
+        def send_body(self, data, content_type, status=200, extra_headers=None):
+            self.send_response(status)
+            for name, value in (extra_headers or {}).items():
+                self.send_header(name, value)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def cdx(self, query):
+            url = query.get('url', [''])[0]
+            if query.get('matchType', [''])[0] == 'prefix':
+                rows = [row for row in index if row[1].startswith(url)]
+            else:
+                rows = [row for row in index if row[1] == url]
+            collapse = re.fullmatch(r'timestamp:(\d+)', query.get('collapse', [''])[0])
+            offset = int(query.get('resumeKey', ['0'])[0])
+            limit = int(query.get('limit', [str(len(rows))])[0])
+            page, last = [], None
+            for row in rows[offset:]:
+                if len(page) == limit:
+                    break
+                offset += 1
+                group = (row[1], row[0][:int(collapse.group(1))]) if collapse else None
+                if collapse and group == last:
+                    continue
+                last = group
+                page.append(row)
+            time.sleep(cdx_latency + cdx_row_delay * len(page))
+            more = offset < len(rows) and query.get('showResumeKey', [''])[0] == 'true'
+            if query.get('output', [''])[0] == 'json':
+                data = json.dumps([["timestamp", "original", "statuscode", "digest", "length"]] + page)
+            else:
+                data = "".join(' '.join(row) + "\n" for row in page) + (f"\n{offset}\n" if more else "")
+            self.send_body(data.encode('utf-8'), "text/plain")
+
+        def do_GET(self):
+            path, _, query = self.path.partition('?')
+            if path == "/cdx/search/cdx":
+                self.cdx(parse_qs(query))
+                return
+            if not admit():
+                self.send_body(b"Too Many Requests", "text/plain", 429, {"Retry-After": str(retry_after)})
+                return
+            time.sleep(latency)
+            self.send_body(f"<html><body><h1>{self.path}</h1></body></html>".encode('utf-8'), "text/html")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    if tls:
+        server.socket = stub_tls_context().wrap_socket(server.socket, server_side=True,
+                                                       do_handshake_on_connect=False)
+    # Clients closing a streamed CDX response early are expected
+    server.handle_error = lambda request, client_address: None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def benchmark_llm_batch(rows=200, latency=0.5, batch_size=20, max_in_flight=4):
+    """Per-record requests vs cached, concurrent batches against a local stub endpoint"""
+    import requests
+    from llm_batch_cleaner import BatchRecordCleaner
+
+    records = synthetic_snapshot_table(rows).to_dict('records')
+    server = start_cleaning_stub(latency)
+    endpoint = f"http://127.0.0.1:{server.server_port}/"
+    print(f"Benchmarking LLM cleaning of {rows} records (stub latency {latency}s)")
+
+    # The original loop: one request per record on a new connection (its 1s sleep excluded)
+    start = time.perf_counter()
+    for record in records[:min(rows, 20)]:
+        prompt = "Record:\n" + json.dumps(record, ensure_ascii=False)
+        requests.post(endpoint, json={"prompt": prompt}).json()
+    per_record = (time.perf_counter() - start) / min(rows, 20)
+    report("per-record (extrapolated)", rows, per_record * rows, "records")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "cache.sqlite")
+        for label in ("batched, cold cache", "batched, warm cache"):
+            cleaner = BatchRecordCleaner(endpoint, "stub", batch_size=batch_size,
+                                         max_in_flight=max_in_flight, cache_path=cache_path)
+            start = time.perf_counter()
+            cleaned = cleaner.clean(records)
+            report(label, rows, time.perf_counter() - start, "records")
+            print(f"  {'':<28} API calls: {cleaner.calls}, cache hits: {cleaner.cache_hits}")
+            cleaner.close()
+    server.shutdown()
+    in_order = all(a['file'] == b['file'] for a, b in zip(records, cleaned))
+    print(f"  records returned in input order: {in_order}")
+
+
+def benchmark_tiered(rows=2000, latency=0.5, batch_size=20, max_in_flight=4):
+    """LLM for every row vs rules first and the LLM only for validator-flagged rows"""
+    from llm_batch_cleaner import BatchRecordCleaner, TierStats, clean_frame_tiered
+
+    df = synthetic_snapshot_table(rows)
+    df['file'] = df['file'] + df.index.map(lambda i: " " * (i % 7))   # distinct records, no dedup
+    server = start_cleaning_stub(latency)
+    endpoint = f"http://127.0.0.1:{server.server_port}/"
+    print(f"Benchmarking tiered cleaning of {rows} rows (stub latency {latency}s)")
+
+    cleaner = BatchRecordCleaner(endpoint, "stub", batch_size=batch_size,
+                                 max_in_flight=max_in_flight, cache_path=None)
+    start = time.perf_counter()
+    cleaner.clean(df.to_dict('records'))
+    report("LLM for every row", rows, time.perf_counter() - start, "rows")
+    print(f"  {'':<28} API calls: {cleaner.calls}")
+
+    cleaner = BatchRecordCleaner(endpoint, "stub", batch_size=batch_size,
+                                 max_in_flight=max_in_flight, cache_path=None)
+    stats = TierStats()
+    start = time.perf_counter()
+    clean_frame_tiered(df, cleaner, stats)
+    report("tiered", rows, time.perf_counter() - start, "rows")
+    print(f"  {'':<28} API calls: {cleaner.calls}")
+    stats.report()
+    server.shutdown()
+
+
+def benchmark_vector_index(apps=20000, companies=30000, dim=384, k=5, backend="auto"):
+    """Dense apps x companies matrix with a full argsort vs blocked top-k index search"""
+    from company_vector_index import CompanyVectorIndex, normalize_rows
+
+    rng = np.random.default_rng(0)
+    app_vectors = rng.standard_normal((apps, dim), dtype=np.float32)
+    company_vectors = rng.standard_normal((companies, dim), dtype=np.float32)
+    print(f"Benchmarking company search: {apps} apps x {companies} companies, dim {dim}")
+
+    start = time.perf_counter()
+    dense = normalize_rows(app_vectors) @ normalize_rows(company_vectors).T
+    dense_best = np.array([np.argsort(-row)[0] for row in dense])
+    report("dense matrix + argsort", apps, time.perf_counter() - start, "apps")
+    print(f"  {'':<28} similarity matrix: {dense.nbytes / 1e6:.0f} MB")
+    del dense
+
+    start = time.perf_counter()
+    index = CompanyVectorIndex(company_vectors, backend=backend)
+    build = time.perf_counter() - start
+    scores, indices = index.search(app_vectors, k=k)
+    report(f"index ({index.backend}), k={k}", apps, time.perf_counter() - start, "apps")
+    print(f"  {'':<28} build {build:.3f}s, results: {(scores.nbytes + indices.nbytes) / 1e6:.1f} MB")
+    print(f"  best match agreement: {np.mean(indices[:, 0] == dense_best) * 100:.2f}%")
+
+
+def benchmark_embedding_cache(input_csv=None, column='company_text', rows=5000,
+                              model_name='all-MiniLM-L6-v2', changed=0.02, processes=1):
+    """
+    Cold start, warm start and a warm start with a few changed texts, with
+    the real SentenceTransformer model; with processes > 1 the cold start is
+    also run in-process for comparison
+    """
+    from embedding_cache import EmbeddingCache
+
+    if input_csv:
+        texts = pd.read_csv(input_csv)[column].fillna('').astype(str).tolist()[:rows]
+    else:
+        texts = synthetic_snapshot_table(rows)['description'].fillna('').tolist()
+        texts = [f"{i} {text}" for i, text in enumerate(texts)]
+    edited = [text + " (updated)" if i % int(1 / changed) == 0 else text for i, text in enumerate(texts)]
+    print(f"Benchmarking embedding cache on {len(texts)} texts with {model_name}")
+
+    runs = [("cold start", texts, processes), ("warm start", texts, processes),
+            (f"warm, {changed:.0%} changed", edited, processes)]
+    if processes > 1:
+        runs.insert(0, ("cold start, 1 process", texts, 1))
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, batch, workers in runs:
+            root = os.path.join(tmp, "single") if workers == 1 and processes > 1 else tmp
+            cache = EmbeddingCache(model_name, root, processes=workers)
+            start = time.perf_counter()
+            vectors = cache.encode(batch)
+            report(label, len(batch), time.perf_counter() - start, "texts")
+            print(f"  {'':<28} {cache.misses} encoded, {cache.hits} from cache, "
+                  f"multi-process pool: {'yes' if cache.pool_used else 'no'}")
+            if cache.misses:
+                used = workers if cache.pool_used else 1
+                rate = cache.misses / cache.encode_seconds
+                print(f"  {'':<28} {rate:.1f} sentences/sec, {rate / used:.1f} per process")
+        print(f"  embeddings: {vectors.shape}")
+
+
+
+def fake_embeddings(texts, dim=16):
+    """Deterministic stand-in sentence embeddings: one seeded vector per text"""
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        vectors[row] = np.random.default_rng(zlib.crc32(text.encode('utf-8'))).standard_normal(dim)
+    return vectors
+
+
+def _fake_pool_encode(texts):
+    """Worker body of FakeSentenceModel's pool: embeddings plus the encoding process and its thread setting"""
+    return fake_embeddings(texts), os.getpid(), os.environ.get('OMP_NUM_THREADS')
+
+
+class FakeSentenceModel:
+    """
+    SentenceTransformer stand-in for EmbeddingCache: encode() runs in-process
+    and the multi-process pool spawns real workers, as sentence-transformers
+    does, so each call records (pid, OMP_NUM_THREADS, texts) of the process
+    that encoded it
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.pools_started = 0
+        self.pools_stopped = 0
+
+    def encode(self, texts, batch_size=64, convert_to_numpy=True):
+        self.calls.append((os.getpid(), os.environ.get('OMP_NUM_THREADS'), len(texts)))
+        return fake_embeddings(texts)
+
+    def start_multi_process_pool(self, devices):
+        # Workers start now, so they inherit the environment of this moment
+        pool = multiprocessing.get_context('spawn').Pool(len(devices))
+        self.pools_started += 1
+        return pool
+
+    def encode_multi_process(self, texts, pool, batch_size=64):
+        parts = np.array_split(np.arange(len(texts)), pool._processes)
+        vectors = []
+        for part_vectors, pid, threads in pool.map(_fake_pool_encode, [[texts[i] for i in part] for part in parts]):
+            self.calls.append((pid, threads, len(part_vectors)))
+            vectors.append(part_vectors)
+        return np.concatenate(vectors)
+
+    def stop_multi_process_pool(self, pool):
+        pool.close()
+        pool.join()
+        self.pools_stopped += 1
+
+
+def benchmark_embedding_pool(pool_min_misses=500, processes=2):
+    """
+    EmbeddingCache encoding paths with FakeSentenceModel (no torch needed):
+    misses below pool_min_misses encode in-process, at the threshold in pool
+    workers that get cpu_count / processes threads while the parent's
+    environment is left unchanged, also with two caches starting pools from
+    two threads at once; every lookup must return the model's vectors in
+    input order
+    """
+    from embedding_cache import EmbeddingCache
+
+    threads = str(max(1, (os.cpu_count() or 1) // processes))
+    parent = os.getpid()
+    saved = os.environ.pop('OMP_NUM_THREADS', None)
+    print(f"Checking EmbeddingCache encoding paths: {processes} processes, "
+          f"pool from {pool_min_misses} misses, {threads} thread(s) per worker")
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            def run(label, cache, texts):
+                model = cache.model
+                calls = len(model.calls)
+                start = time.perf_counter()
+                vectors = cache.encode(texts)
+                report(label, len(texts), time.perf_counter() - start, "texts")
+                new_calls = model.calls[calls:]
+                pids = {pid for pid, _, _ in new_calls}
+                print(f"  {'':<28} {cache.misses} encoded, {cache.hits} from cache, pool: "
+                      f"{'yes' if cache.pool_used else 'no'}, {len(pids)} encoding process(es)")
+                assert np.array_equal(vectors, fake_embeddings(texts)), f"{label}: wrong vectors"
+                assert os.environ.get('OMP_NUM_THREADS') is None, f"{label}: parent environment changed"
+                return new_calls
+
+            below = [f"text {i}" for i in range(pool_min_misses - 1)]
+            cache = EmbeddingCache("fake", os.path.join(tmp, "below"), model=FakeSentenceModel(),
+                                   processes=processes, pool_min_misses=pool_min_misses)
+            calls = run("below threshold", cache, below)
+            assert not cache.pool_used and cache.model.pools_started == 0
+            assert all(pid == parent and env is None for pid, env, _ in calls), "encoded outside the parent"
+
+            at = [f"text {i}" for i in range(pool_min_misses)]
+            cache = EmbeddingCache("fake", os.path.join(tmp, "at"), model=FakeSentenceModel(),
+                                   processes=processes, pool_min_misses=pool_min_misses)
+            calls = run("at threshold", cache, at)
+            assert cache.pool_used and cache.model.pools_started == cache.model.pools_stopped == 1
+            assert all(pid != parent and env == threads for pid, env, _ in calls), \
+                f"pool workers ran in the parent or without OMP_NUM_THREADS={threads}"
+
+            calls = run("warm, repeated + shuffled", cache, (at[::-1] + at[:10]) * 2)
+            assert not calls and cache.model.pools_started == 1
+
+            # Two caches starting their pools at the same time
+            caches = [EmbeddingCache("fake", os.path.join(tmp, f"thread{i}"), model=FakeSentenceModel(),
+                                     processes=processes, pool_min_misses=pool_min_misses)
+                      for i in range(2)]
+            batches = [[f"thread {i} text {j}" for j in range(pool_min_misses)] for i in range(2)]
+            results = [None, None]
+            workers = [threading.Thread(target=lambda i=i: results.__setitem__(i, caches[i].encode(batches[i])))
+                       for i in range(2)]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            report("two caches, two threads", 2 * pool_min_misses, time.perf_counter() - start, "texts")
+            for cache, batch, vectors in zip(caches, batches, results):
+                assert vectors is not None and np.array_equal(vectors, fake_embeddings(batch)), "wrong vectors"
+                assert all(pid != parent and env == threads for pid, env, _ in cache.model.calls)
+            assert os.environ.get('OMP_NUM_THREADS') is None, "parent environment changed"
+            print(f"  {'':<28} both pools' workers ran with OMP_NUM_THREADS={threads}, "
+                  f"parent environment unchanged")
+    finally:
+        if saved is not None:
+            os.environ['OMP_NUM_THREADS'] = saved
+
+def benchmark_match_scoring(apps=5000, companies=20000, dim=384, k=3, threshold=0.5):
+    """Per-app loop over a similarity matrix vs blocked top-k and a column-wise results frame"""
+    from company_vector_index import CompanyVectorIndex, normalize_rows
+    from match_scoring import build_match_frame
+
+    rng = np.random.default_rng(0)
+    app_vectors = rng.standard_normal((apps, dim), dtype=np.float32)
+    company_vectors = rng.standard_normal((companies, dim), dtype=np.float32)
+    df_apps = pd.DataFrame({'APP_NAME': [f"app {i}" for i in range(apps)],
+                            'DEVELOPER': [f"dev {i}" for i in range(apps)]},
+                           index=rng.permutation(apps * 2)[:apps])
+    df_companies = pd.DataFrame({'Company Name': [f"company {i}" for i in range(companies)]})
+    # Low threshold for random vectors so both paths emit matches
+    threshold = min(threshold, 0.1)
+    print(f"Benchmarking match scoring: {apps} apps x {companies} companies")
+
+    start = time.perf_counter()
+    similarity = normalize_rows(app_vectors) @ normalize_rows(company_vectors).T
+    rows = []
+    for i, idx in enumerate(df_apps.index):
+        app_row = df_apps.loc[idx]
+        best_idx = int(np.argsort(-similarity[i])[0])
+        best_score = float(similarity[i][best_idx])
+        best_company = df_companies.iloc[best_idx]['Company Name']
+        matched_company = best_company if best_score >= threshold else None
+        rows.append({'APP_NAME': app_row['APP_NAME'], 'DEVELOPER': app_row['DEVELOPER'],
+                     'MATCHED_COMPANY': matched_company,
+                     'SIMILARITY': best_score if matched_company else None})
+    legacy = pd.DataFrame(rows)
+    report("per-app loop", apps, time.perf_counter() - start, "apps")
+
+    start = time.perf_counter()
+    scores, indices = CompanyVectorIndex(company_vectors, backend="exact").search(app_vectors, k=k)
+    results = build_match_frame(df_apps, df_companies, scores, indices, threshold)
+    report(f"top-k + column-wise, k={k}", apps, time.perf_counter() - start, "apps")
+
+    same = (legacy['MATCHED_COMPANY'].fillna('') == results['MATCHED_COMPANY'].fillna('')).mean()
+    print(f"  same MATCHED_COMPANY: {same * 100:.2f}%, alternates per app: {k - 1}")
+
+
+def benchmark_fuzzy_index(apps=5000, companies=20000, score_cutoff=90):
+    """extractOne per app vs cdist over all apps vs the n-gram prefiltered index"""
+    import random
+    import string
+    from rapidfuzz import fuzz, process
+    from fuzzy_company_index import FuzzyCompanyIndex
+
+    rng = random.Random(0)
+    word = lambda: ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9)))
+    names = [' '.join(word() for _ in range(rng.randint(1, 3))).title() for _ in range(companies)]
+
+    def near(name):
+        chars = list(name.lower())
+        chars[rng.randrange(len(chars))] = rng.choice(string.ascii_lowercase)
+        return ''.join(chars)
+    app_names = [near(rng.choice(names)) if rng.random() < 0.5 else word() for _ in range(apps)]
+    print(f"Benchmarking fuzzy matching: {apps} apps x {companies} companies")
+
+    start = time.perf_counter()
+    legacy = []
+    for name in app_names:
+        company_names = [n.lower() for n in names]
+        legacy.append(process.extractOne(name, company_names, scorer=fuzz.ratio))
+    report("extractOne per app", apps, time.perf_counter() - start, "apps")
+    legacy_hits = np.array([score >= score_cutoff for _, score, _ in legacy])
+    legacy_idx = np.array([i for _, _, i in legacy])
+
+    for label, prefilter in (("cdist, workers=-1", False), ("n-gram prefilter", True)):
+        start = time.perf_counter()
+        index = FuzzyCompanyIndex(names, prefilter=prefilter)
+        indices, scores = index.best_matches(app_names, score_cutoff=score_cutoff)
+        report(label, apps, time.perf_counter() - start, "apps")
+        hits = scores >= score_cutoff
+        same = np.mean((hits == legacy_hits) & (~hits | (indices == legacy_idx)))
+        print(f"  {'':<28} same matches >= {score_cutoff}: {same * 100:.2f}%")
+
+
+def benchmark_matched_filter(apps=200000, matched=5000):
+    """Row-wise is_matched apply vs the normalized-key anti-join"""
+    from matched_apps_filter import apps_to_match
+
+    rng = np.random.default_rng(0)
+    df_apps = pd.DataFrame({'APP_NAME': [f"App {i}" for i in rng.integers(0, apps, apps)],
+                            'DEVELOPER': [f"Developer {i % 997}" for i in range(apps)]})
+    df_matched = df_apps.sample(matched, random_state=0)
+    print(f"Benchmarking matched-app exclusion: {apps} apps, {matched} matched pairs")
+
+    start = time.perf_counter()
+    matched_set = set(zip(df_matched['APP_NAME'].str.lower().fillna(''),
+                          df_matched['DEVELOPER'].str.lower().fillna('')))
+    def is_matched(row):
+        return (row['APP_NAME'].lower(), row['DEVELOPER'].lower()) in matched_set
+    legacy = df_apps[~df_apps.apply(is_matched, axis=1)]
+    report("apply(is_matched)", apps, time.perf_counter() - start, "apps")
+
+    start = time.perf_counter()
+    remaining = apps_to_match(df_apps, df_matched)
+    report("anti-join", apps, time.perf_counter() - start, "apps")
+    print(f"  same apps kept: {legacy.index.equals(remaining.index)}")
+
+
+def benchmark_onnx_encoder(rows=2000, companies=2000, model_name='all-MiniLM-L6-v2', batch_size=64):
+    """Float SentenceTransformer vs int8 ONNX Runtime encoder on synthetic texts"""
+    from sentence_transformers import SentenceTransformer
+    from onnx_sentence_encoder import OnnxSentenceEncoder, compare_backends
+
+    table = synthetic_snapshot_table(rows + companies)
+    texts = (table['app_title'].fillna('') + ' ' + table['description'].fillna('')).tolist()
+    texts = [f"{i} {text}" for i, text in enumerate(texts)]
+    print(f"Benchmarking {model_name}: {rows} app texts, {companies} company texts")
+    compare_backends(SentenceTransformer(model_name, device='cpu'), OnnxSentenceEncoder(model_name),
+                     texts[:rows], texts[rows:], batch_size=batch_size)
+
+
+
+class FakeWordTokenizer:
+    """Tokenizer stand-in: one id per whitespace-separated word, zero-padded, no token_type_ids"""
+
+    def __init__(self, vocab=1000):
+        self.vocab = vocab
+
+    def ids(self, text, max_length):
+        return [zlib.crc32(word.encode('utf-8')) % (self.vocab - 1) + 1 for word in text.split()][:max_length]
+
+    def __call__(self, texts, padding=True, truncation=True, max_length=256, return_tensors='np'):
+        rows = [self.ids(text, max_length) for text in texts]
+        width = max([len(row) for row in rows] + [1])
+        input_ids = np.zeros((len(rows), width), dtype=np.int64)
+        mask = np.zeros((len(rows), width), dtype=np.int64)
+        for i, row in enumerate(rows):
+            input_ids[i, :len(row)] = row
+            mask[i, :len(row)] = 1
+        return {'input_ids': input_ids, 'attention_mask': mask}
+
+
+class FakeOnnxSession:
+    """InferenceSession stand-in whose hidden state for a token is a fixed row of `table`"""
+
+    def __init__(self, table, output_dim=None):
+        self.table = table
+        self.output_dim = output_dim if output_dim is not None else table.shape[1]
+        self.runs = 0
+
+    def get_inputs(self):
+        return [type('Input', (), {'name': name})() for name in ('input_ids', 'attention_mask', 'token_type_ids')]
+
+    def get_outputs(self):
+        return [type('Output', (), {'shape': ['batch', 'sequence', self.output_dim]})()]
+
+    def run(self, output_names, feed):
+        assert feed['input_ids'].shape == feed['attention_mask'].shape == feed['token_type_ids'].shape
+        assert not feed['token_type_ids'].any(), "missing token_type_ids must be fed as zeros"
+        self.runs += 1
+        return [self.table[feed['input_ids']]]
+
+
+def benchmark_onnx_pooling(texts=200, dim=32, batch_size=16, max_seq_length=12):
+    """
+    OnnxSentenceEncoder pooling with FakeOnnxSession / FakeWordTokenizer
+    passed through its constructor: embeddings must equal a hand-computed
+    mean of each text's token rows (padding ignored, truncated to
+    max_seq_length), normalized or not, in input order across length-sorted
+    batches; encode([]) must return (0, dim)
+    """
+    from onnx_sentence_encoder import OnnxSentenceEncoder
+
+    rng = np.random.default_rng(0)
+    tokenizer = FakeWordTokenizer()
+    table = rng.standard_normal((tokenizer.vocab, dim)).astype(np.float32)
+    # Padding tokens get a huge hidden state, so any leak into the mean shows
+    table[0] = 1e4
+    words = [f"w{i}" for i in range(300)]
+    batch = [" ".join(rng.choice(words, size=rng.integers(0, 2 * max_seq_length))) for _ in range(texts)]
+
+    def expected(normalize):
+        rows = []
+        for text in batch:
+            ids = tokenizer.ids(text, max_seq_length)
+            vector = table[ids].mean(axis=0) if ids else np.zeros(dim, dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            rows.append(vector / norm if normalize and norm else vector)
+        return np.array(rows, dtype=np.float32)
+
+    print(f"Checking ONNX encoder pooling on {texts} texts (fake session and tokenizer, dim {dim})")
+    for normalize in (True, False):
+        session = FakeOnnxSession(table)
+        encoder = OnnxSentenceEncoder("fake", session=session, tokenizer=tokenizer,
+                                      max_seq_length=max_seq_length, normalize=normalize)
+        start = time.perf_counter()
+        vectors = encoder.encode(batch, batch_size=batch_size)
+        label = "normalized mean" if normalize else "mean"
+        report(label, texts, time.perf_counter() - start, "texts")
+        error = float(np.abs(vectors - expected(normalize)).max())
+        print(f"  {'':<28} {session.runs} session runs, max abs error vs hand-computed {error:.2e}")
+        assert vectors.shape == (texts, dim) and vectors.dtype == np.float32
+        assert error < 1e-5, f"{label} pooling differs from the hand-computed embeddings"
+        assert np.allclose(encoder.encode(batch[3]), vectors[3], atol=1e-6), "single sentence differs"
+
+    empty = OnnxSentenceEncoder("fake", session=FakeOnnxSession(table), tokenizer=tokenizer).encode([])
+    dynamic = OnnxSentenceEncoder("fake", session=FakeOnnxSession(table, output_dim='hidden'),
+                                  tokenizer=tokenizer).encode([])
+    print(f"  encode([]): {empty.shape}, with a dynamic output dimension: {dynamic.shape}")
+    assert empty.shape == dynamic.shape == (0, dim)
+
+def benchmark_async_fetch(snapshots=40, latency=0.2, rate=20.0, write_delay=0.02,
+                          concurrencies=(1, 2, 4, 8)):
+    """Snapshot fetch throughput of the asyncio engine by concurrency, at a fixed controller rate"""
+    from adaptive_rate_controller import AdaptiveRateController
+    from async_snapshot_fetcher import fetch_snapshots
+    from wayback_http_transport import get_transport
+
+    server = start_wayback_stub(latency=latency, connect_delay=0)
+    base = f"http://127.0.0.1:{server.server_port}/web"
+    rows = [[f"2020{i:010d}", f"https://play.google.com/store/apps/details?id=app{i}"] for i in range(snapshots)]
+    print(f"Benchmarking async fetch: {snapshots} snapshots, {latency * 1000:.0f} ms each, "
+          f"{rate:.0f} req/s, {write_delay * 1000:.0f} ms blocking on_result")
+
+    for concurrency in concurrencies:
+        fetched = []
+
+        def on_result(snapshot, content):
+            time.sleep(write_delay)  # stands in for extraction + fsynced row write
+            fetched.append(content is not None)
+
+        # Rate held at `rate`, so only concurrency changes between runs
+        controller = AdaptiveRateController(initial_rate=rate, max_rate=rate, jitter=0)
+        start = time.perf_counter()
+        fetch_snapshots(rows, on_result, concurrency=concurrency, base_url=base, controller=controller)
+        report(f"concurrency={concurrency}", sum(fetched), time.perf_counter() - start, "snapshots")
+    get_transport().report()
+    server.shutdown()
+
+
+def benchmark_http_transport(requests_count=200, connect_delay=0.05):
+    """Bare requests.get per snapshot vs the shared pooled transport, over HTTPS"""
+    import requests
+    from wayback_http_transport import WaybackTransport
+
+    server = start_wayback_stub(connect_delay=connect_delay, tls=True)
+    base = f"https://127.0.0.1:{server.server_port}/web"
+    urls = [f"{base}/2020{i:010d}/https://play.google.com/store/apps/details?id=app{i}"
+            for i in range(requests_count)]
+    print(f"Benchmarking HTTP transport: {requests_count} HTTPS requests, "
+          f"{connect_delay * 1000:.0f} ms per new connection (before the TLS handshake)")
+
+    # Created first: it also silences the unverified-certificate warnings
+    transport = WaybackTransport()
+    start = time.perf_counter()
+    for url in urls:
+        requests.get(url, timeout=30, verify=False)
+    report("requests.get per request", requests_count, time.perf_counter() - start, "requests")
+
+    start = time.perf_counter()
+    for url in urls:
+        transport.get(url, timeout=30)
+    report("shared WaybackTransport", requests_count, time.perf_counter() - start, "requests")
+    transport.report()
+    transport.close()
+    server.shutdown()
+
+
+def benchmark_cdx_discovery(captures=20000, page_size=2000, row_delay=0.0002):
+    """Unbounded JSON CDX query vs paged, checkpointed, cached discovery"""
+    from cdx_discovery import DEFAULT_PARAMS, CdxDiscovery
+    from wayback_http_transport import WaybackTransport
+
+    app_id = "com.example.archived"
+    url = f"https://play.google.com/store/apps/details?id={app_id}"
+    params = dict(DEFAULT_PARAMS, collapse="")
+    server = start_wayback_stub(connect_delay=0, app_ids=[app_id], captures=captures, cdx_row_delay=row_delay)
+    endpoint = f"http://127.0.0.1:{server.server_port}/cdx/search/cdx"
+    transport = WaybackTransport()
+    print(f"Benchmarking CDX discovery: {captures} captures, pages of {page_size}")
+
+    start = time.perf_counter()
+    legacy = transport.get(endpoint, params=dict(params, url=url, output='json'), timeout=None).json()[1:]
+    report("one JSON query", len(legacy), time.perf_counter() - start, "rows")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        discovery = CdxDiscovery(tmp, page_size=page_size, transport=transport, endpoint=endpoint)
+        start = time.perf_counter()
+        rows = discovery.iter_snapshots(url, params)
+        first = [next(rows)]
+        print(f"  {'':<28} first row after {time.perf_counter() - start:.3f}s")
+        # Stop mid-way, as an interrupted run would
+        first += [next(rows) for _ in range(captures // 2)]
+        rows.close()
+        interrupted = time.perf_counter() - start
+
+        discovery = CdxDiscovery(tmp, page_size=page_size, transport=transport, endpoint=endpoint)
+        start = time.perf_counter()
+        paged = discovery.snapshots(url, params)
+        report("paged, resumed", len(paged), interrupted + time.perf_counter() - start, "rows")
+        print(f"  {'':<28} resumed run fetched {discovery.pages} of "
+              f"{-(-captures // page_size)} pages; same rows: {paged == legacy}")
+
+        start = time.perf_counter()
+        cached = discovery.snapshots(url, params)
+        report("warm cache", len(cached), time.perf_counter() - start, "rows")
+    server.shutdown()
+
+
+def benchmark_cdx_plan(apps=200, other_apps=200, captures=120, cdx_latency=0.05, workers=8):
+    """Startup discovery for a run: one app after another vs plan_discovery()"""
+    from cdx_discovery import CdxDiscovery, app_url, plan_discovery
+    from wayback_http_transport import WaybackTransport
+
+    app_ids = [f"com.example.app{i:05d}" for i in range(apps)]
+    # Apps under the same URL prefix that the run does not ask for
+    others = [f"com.example.other{i:05d}" for i in range(other_apps)]
+    server = start_wayback_stub(connect_delay=0, app_ids=app_ids + others, captures=captures,
+                                cdx_latency=cdx_latency)
+    endpoint = f"http://127.0.0.1:{server.server_port}/cdx/search/cdx"
+    transport = WaybackTransport()
+    print(f"Benchmarking CDX discovery plan: {apps} apps (+{other_apps} others), "
+          f"{captures} captures each, {cdx_latency * 1000:.0f} ms per CDX query")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        discovery = CdxDiscovery(os.path.join(tmp, "sequential"), transport=transport, endpoint=endpoint)
+        start = time.perf_counter()
+        sequential = {app_id: discovery.snapshots(app_url(app_id)) for app_id in app_ids}
+        report("sequential per-app queries", apps, time.perf_counter() - start, "apps")
+
+        for mode in ("concurrent", "prefix"):
+            discovery = CdxDiscovery(os.path.join(tmp, mode), transport=transport, endpoint=endpoint)
+            start = time.perf_counter()
+            plan = plan_discovery(app_ids, mode=mode, max_workers=workers, discovery=discovery)
+            report(f"plan_discovery({mode})", apps, time.perf_counter() - start, "apps")
+            seeded = all(discovery.is_complete(app_url(app_id)) for app_id in app_ids)
+            print(f"  {'':<28} {discovery.pages} CDX pages; same plan: {plan == sequential}; "
+                  f"per-app caches filled: {seeded}")
+    transport.close()
+    server.shutdown()
+
+
+def benchmark_sampling_plan(apps=20, captures=600, latency=0.02):
+    """Every monthly capture vs sampled plans: requests, estimate accuracy and fetch time"""
+    from snapshot_sampling_planner import SamplingPlanner
+    from wayback_http_transport import WaybackTransport
+
+    server = start_wayback_stub(latency=latency, connect_delay=0)
+    base = f"http://127.0.0.1:{server.server_port}/web"
+    transport = WaybackTransport()
+    # The scrapers' discovery output: the first capture of each month (collapse=timestamp:6)
+    plan = {}
+    for i in range(apps):
+        app_id = f"com.example.app{i:03d}"
+        monthly = {}
+        for row in stub_captures(app_id, captures):
+            monthly.setdefault(row[0][:6], row)
+        plan[app_id] = list(monthly.values())
+    print(f"Benchmarking sampling plans: {apps} apps, {len(plan[app_id])} monthly captures each, "
+          f"{latency * 1000:.0f} ms per snapshot")
+
+    baseline = None
+    for label, planner in (("every monthly capture", SamplingPlanner(None)),
+                           ("quarter", SamplingPlanner("quarter")),
+                           ("quarter, prefer digest", SamplingPlanner("quarter", prefer="digest")),
+                           ("year", SamplingPlanner("year")),
+                           ("12 per app", SamplingPlanner(None, per_app=12))):
+        planner.seconds_per_request = baseline or latency
+        estimate = planner.estimate(plan)
+        start = time.perf_counter()
+        fetched = set()
+        for app_id, snapshots in planner.sample(plan).items():
+            for snapshot in snapshots:
+                if snapshot[3] not in fetched:
+                    fetched.add(snapshot[3])
+                    transport.get(f"{base}/{snapshot[0]}/{snapshot[1]}", timeout=30)
+        elapsed = time.perf_counter() - start
+        if baseline is None:
+            baseline = elapsed / max(len(fetched), 1)
+        report(label, len(fetched), elapsed, "requests")
+        print(f"  {'':<28} {estimate['selected']} selected, estimated {estimate['requests']} requests / "
+              f"{estimate['seconds']:.1f}s, ~{estimate['bytes'] / 1e6:.1f} MB archived")
+    transport.close()
+    server.shutdown()
+
+
+def benchmark_adaptive_rate(snapshots=150, throttle_rate=10.0, latency=0.01, scale=0.05, max_retries=3):
+    """Fixed pre-request sleeps and backoff (scaled by `scale`) vs AIMD pacing, under a 429-ing stub"""
+    import random
+    from adaptive_rate_controller import AdaptiveRateController
+    from wayback_http_transport import WaybackTransport
+
+    server = start_wayback_stub(latency=latency, connect_delay=0, throttle_rate=throttle_rate)
+    base = f"http://127.0.0.1:{server.server_port}/web"
+    urls = [f"{base}/2020{i:010d}/https://play.google.com/store/apps/details?id=app{i}"
+            for i in range(snapshots)]
+    transport = WaybackTransport()
+    print(f"Benchmarking request pacing: {snapshots} snapshots, stub allows {throttle_rate:.0f} req/s "
+          f"(429 + Retry-After beyond), old delays scaled by {scale}")
+
+    def fixed(url):
+        # get_snapshot_content() before the controller, plus the 1s pause after each snapshot
+        base_delay = 10 * scale
+        status = None
+        for attempt in range(max_retries):
+            time.sleep(base_delay + random.uniform(1, 5) * scale)
+            status = transport.get(url, timeout=30).status_code
+            if status == 200:
+                break
+            base_delay *= 2
+        time.sleep(1 * scale)
+        return status
+
+    controller = AdaptiveRateController(initial_rate=1 / (14 * scale), min_rate=1 / (120 * scale),
+                                        max_rate=5 * throttle_rate, increase=1.0)
+
+    def adaptive(url):
+        status = None
+        for attempt in range(max_retries):
+            status = controller.call(lambda: transport.get(url, timeout=30)).status_code
+            if status == 200:
+                break
+        return status
+
+    for label, fetch in (("fixed sleeps + backoff", fixed), ("AdaptiveRateController", adaptive)):
+        transport.stats.requests = 0
+        start = time.perf_counter()
+        statuses = [fetch(url) for url in urls]
+        elapsed = time.perf_counter() - start
+        report(label, snapshots, elapsed, "snapshots")
+        print(f"  {'':<28} {transport.stats.requests} requests, "
+              f"{sum(status == 200 for status in statuses)} fetched")
+    controller.report()
+    transport.close()
+    server.shutdown()
+
+
+def benchmark_scraper_concurrent(captures=120, latency=0.05, rate=20.0, concurrency=4):
+    """
+    wayback_bulk_historical_scraper.process_app() sequential vs concurrent
+    against a local Wayback stub (in a scratch directory), checking that every
+    selected snapshot ends up in the snapshot store, the ledger and the CSV
+    """
+    import csv
+    import adaptive_rate_controller
+    import cdx_discovery
+
+    app_ids = ("com.example.sequential", "com.example.concurrent")
+    server = start_wayback_stub(latency=latency, connect_delay=0, app_ids=app_ids, captures=captures)
+    workdir = tempfile.mkdtemp(prefix="scraper_concurrent_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import wayback_bulk_historical_scraper as scraper
+        scraper.WAYBACK_URL = f"http://127.0.0.1:{server.server_port}/web"
+        cdx_discovery._discovery = cdx_discovery.CdxDiscovery(
+            endpoint=f"http://127.0.0.1:{server.server_port}/cdx/search/cdx")
+        adaptive_rate_controller._controller = adaptive_rate_controller.AdaptiveRateController(
+            initial_rate=rate, max_rate=rate, jitter=0)
+        print(f"Benchmarking process_app(): {captures} stub captures per app, "
+              f"{latency * 1000:.0f} ms per snapshot, {rate:.0f} req/s, in {workdir}")
+
+        for app_id, workers in zip(app_ids, (1, concurrency)):
+            start = time.perf_counter()
+            scraper.process_app(app_id, concurrency=workers)
+            elapsed = time.perf_counter() - start
+
+            selected = scraper.sampling_planner().select(scraper.get_wayback_snapshots(
+                f"https://play.google.com/store/apps/details?id={app_id}"))
+            store, ledger = scraper.get_snapshot_store(), scraper.get_progress_ledger()
+            stored = sum(store.get_capture(app_id, snapshot[0]) is not None for snapshot in selected)
+            marked = sum(ledger.is_done(app_id, snapshot[0]) for snapshot in selected)
+            with open(f"app_data_{app_id}.csv", newline='', encoding='utf-8') as f:
+                rows = list(csv.DictReader(f))
+            failed = sum(row['html_file'] == "Failed to save HTML" for row in rows)
+            report(f"concurrency={workers}", len(selected), elapsed, "snapshots")
+            print(f"  {'':<28} {stored} stored, {marked} marked done, {len(rows)} rows "
+                  f"({failed} without HTML), app complete: "
+                  f"{ledger.is_done(app_id, scraper.APP_LEVEL, scraper.STATUS_COMPLETE)}")
+            assert stored == marked == len(rows) == len(selected) and not failed, \
+                f"process_app(concurrency={workers}) lost snapshots"
+    finally:
+        os.chdir(cwd)
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline performance benchmarks")
+    sub = parser.add_subparsers(dest="benchmark", required=True)
+
+    xpath = sub.add_parser("xpath-plan", help="extract_data_lxml vs ExtractionPlan")
+    xpath.add_argument("snapshot_dir", nargs="?", help="default: synthetic representative pages")
+    xpath.add_argument("--repeat", type=int, default=3)
+    xpath.add_argument("--limit", type=int, default=None)
+
+    streaming = sub.add_parser("streaming", help="full-DOM vs streaming extraction")
+    streaming.add_argument("snapshot_dir", nargs="?")
+    streaming.add_argument("--limit", type=int, default=None)
+
+    cleaner = sub.add_parser("cleaner", help="row-by-row vs vectorized data cleaning")
+    cleaner.add_argument("--rows", type=int, default=2000000)
+    cleaner.add_argument("--input", default=None, help="CSV to repeat up to --rows instead of synthetic data")
+
+    chunked = sub.add_parser("cleaner-chunked", help="whole-file vs chunked CSV cleaning")
+    chunked.add_argument("--rows", type=int, default=1000000)
+    chunked.add_argument("--chunksize", type=int, default=100000)
+    chunked.add_argument("--input", default=None, help="CSV to clean instead of a synthetic one")
+
+    llm = sub.add_parser("llm-batch", help="per-record vs batched, cached LLM cleaning (local stub)")
+    llm.add_argument("--rows", type=int, default=200)
+    llm.add_argument("--latency", type=float, default=0.5)
+    llm.add_argument("--batch-size", type=int, default=20)
+    llm.add_argument("--in-flight", type=int, default=4)
+
+    tiered = sub.add_parser("tiered", help="LLM for every row vs rules-first tiered cleaning (local stub)")
+    tiered.add_argument("--rows", type=int, default=2000)
+    tiered.add_argument("--latency", type=float, default=0.5)
+    tiered.add_argument("--batch-size", type=int, default=20)
+    tiered.add_argument("--in-flight", type=int, default=4)
+
+    vectors = sub.add_parser("vector-index", help="dense similarity matrix vs vector index top-k")
+    vectors.add_argument("--apps", type=int, default=20000)
+    vectors.add_argument("--companies", type=int, default=30000)
+    vectors.add_argument("--dim", type=int, default=384)
+    vectors.add_argument("--k", type=int, default=5)
+    vectors.add_argument("--backend", default="auto", choices=["auto", "faiss", "hnswlib", "exact"])
+
+    emb = sub.add_parser("embedding-cache", help="cold vs warm cached sentence embeddings")
+    emb.add_argument("--input", default=None, help="CSV with the texts to encode")
+    emb.add_argument("--column", default="company_text")
+    emb.add_argument("--rows", type=int, default=5000)
+    emb.add_argument("--model", default="all-MiniLM-L6-v2")
+    emb.add_argument("--processes", type=int, default=1, help="encoding worker processes")
+
+    emb_pool = sub.add_parser("embedding-pool", help="EmbeddingCache encoding paths with a fake model")
+    emb_pool.add_argument("--pool-min-misses", type=int, default=500)
+    emb_pool.add_argument("--processes", type=int, default=2)
+
+    scoring = sub.add_parser("match-scoring", help="per-app matcher loop vs top-k column-wise scoring")
+    scoring.add_argument("--apps", type=int, default=5000)
+    scoring.add_argument("--companies", type=int, default=20000)
+    scoring.add_argument("--k", type=int, default=3)
+
+    fuzzy = sub.add_parser("fuzzy-index", help="per-app extractOne vs FuzzyCompanyIndex")
+    fuzzy.add_argument("--apps", type=int, default=5000)
+    fuzzy.add_argument("--companies", type=int, default=20000)
+    fuzzy.add_argument("--cutoff", type=int, default=90)
+
+    excluded = sub.add_parser("matched-filter", help="apply(is_matched) vs normalized-key anti-join")
+    excluded.add_argument("--apps", type=int, default=200000)
+    excluded.add_argument("--matched", type=int, default=5000)
+
+    onnx = sub.add_parser("onnx-encoder", help="float PyTorch vs int8 ONNX Runtime sentence encoding")
+    onnx.add_argument("--rows", type=int, default=2000)
+    onnx.add_argument("--companies", type=int, default=2000)
+    onnx.add_argument("--model", default="all-MiniLM-L6-v2")
+
+    pooling = sub.add_parser("onnx-pooling", help="ONNX encoder pooling vs hand-computed embeddings")
+    pooling.add_argument("--texts", type=int, default=200)
+    pooling.add_argument("--dim", type=int, default=32)
+
+    fetcher = sub.add_parser("async-fetch", help="async snapshot fetching by concurrency (local stub)")
+    fetcher.add_argument("--snapshots", type=int, default=40)
+    fetcher.add_argument("--latency", type=float, default=0.2)
+    fetcher.add_argument("--rate", type=float, default=20.0, help="controller request rate (requests/second)")
+
+    transport = sub.add_parser("http-transport", help="per-request connections vs shared keep-alive transport")
+    transport.add_argument("--requests", type=int, default=200)
+    transport.add_argument("--connect-delay", type=float, default=0.05)
+
+    cdx = sub.add_parser("cdx-discovery", help="unbounded JSON CDX query vs paged, resumable discovery")
+    cdx.add_argument("--captures", type=int, default=20000)
+    cdx.add_argument("--page-size", type=int, default=2000)
+
+    plan = sub.add_parser("cdx-plan", help="sequential per-app CDX queries vs plan_discovery()")
+    plan.add_argument("--apps", type=int, default=200)
+    plan.add_argument("--other-apps", type=int, default=200)
+    plan.add_argument("--captures", type=int, default=120)
+    plan.add_argument("--cdx-latency", type=float, default=0.05)
+    plan.add_argument("--workers", type=int, default=8)
+
+    sampling = sub.add_parser("sampling-plan", help="every monthly capture vs sampled fetch plans")
+    sampling.add_argument("--apps", type=int, default=20)
+    sampling.add_argument("--captures", type=int, default=600)
+    sampling.add_argument("--latency", type=float, default=0.02)
+
+    scraper = sub.add_parser("scraper-concurrent", help="sequential vs concurrent process_app() (local stub)")
+    scraper.add_argument("--captures", type=int, default=120)
+    scraper.add_argument("--latency", type=float, default=0.05)
+    scraper.add_argument("--rate", type=float, default=20.0)
+    scraper.add_argument("--concurrency", type=int, default=4)
+
+    pacing = sub.add_parser("adaptive-rate", help="fixed sleeps vs AIMD pacing against a 429-ing stub")
+    pacing.add_argument("--snapshots", type=int, default=150)
+    pacing.add_argument("--throttle-rate", type=float, default=10.0)
+    pacing.add_argument("--scale", type=float, default=0.05, help="time scale applied to the old fixed delays")
+
+    args = parser.parse_args()
+    if args.benchmark == "xpath-plan":
+        benchmark_xpath_plan(args.snapshot_dir, args.repeat, args.limit)
+    elif args.benchmark == "streaming":
+        benchmark_streaming(args.snapshot_dir, args.limit)
+    elif args.benchmark == "cleaner":
+        benchmark_cleaner(args.rows, args.input)
+    elif args.benchmark == "cleaner-chunked":
+        benchmark_chunked_cleaner(args.rows, args.chunksize, args.input)
+    elif args.benchmark == "llm-batch":
+        benchmark_llm_batch(args.rows, args.latency, args.batch_size, args.in_flight)
+    elif args.benchmark == "tiered":
+        benchmark_tiered(args.rows, args.latency, args.batch_size, args.in_flight)
+    elif args.benchmark == "vector-index":
+        benchmark_vector_index(args.apps, args.companies, args.dim, args.k, args.backend)
+    elif args.benchmark == "embedding-cache":
+        benchmark_embedding_cache(args.input, args.column, args.rows, args.model, processes=args.processes)
+    elif args.benchmark == "embedding-pool":
+        benchmark_embedding_pool(args.pool_min_misses, args.processes)
+    elif args.benchmark == "match-scoring":
+        benchmark_match_scoring(args.apps, args.companies, k=args.k)
+    elif args.benchmark == "fuzzy-index":
+        benchmark_fuzzy_index(args.apps, args.companies, args.cutoff)
+    elif args.benchmark == "matched-filter":
+        benchmark_matched_filter(args.apps, args.matched)
+    elif args.benchmark == "onnx-encoder":
+        benchmark_onnx_encoder(args.rows, args.companies, args.model)
+    elif args.benchmark == "onnx-pooling":
+        benchmark_onnx_pooling(args.texts, args.dim)
+    elif args.benchmark == "async-fetch":
+        benchmark_async_fetch(args.snapshots, args.latency, args.rate)
+    elif args.benchmark == "http-transport":
+        benchmark_http_transport(args.requests, args.connect_delay)
+    elif args.benchmark == "cdx-discovery":
+        benchmark_cdx_discovery(args.captures, args.page_size)
+    elif args.benchmark == "cdx-plan":
+        benchmark_cdx_plan(args.apps, args.other_apps, args.captures, args.cdx_latency, args.workers)
+    elif args.benchmark == "sampling-plan":
+        benchmark_sampling_plan(args.apps, args.captures, args.latency)
+    elif args.benchmark == "adaptive-rate":
+        benchmark_adaptive_rate(args.snapshots, args.throttle_rate, scale=args.scale)
+    elif args.benchmark == "scraper-concurrent":
+        benchmark_scraper_concurrent(args.captures, args.latency, args.rate, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
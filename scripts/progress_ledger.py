@@ -0,0 +1,161 @@
+"""
+Scraping Progress Ledger
+========================
+
+Embedded SQLite ledger that records which (app_id, timestamp) snapshots have
+been scraped, replacing the scraping_progress*.txt files that every scraper
+loaded into a Python set on startup and appended to one line at a time.
+
+Key Features:
+- WAL journal with synchronous=NORMAL: readers never block the writer and a
+  crash loses at most the last uncommitted batch, never corrupts the ledger
+- Primary-key lookup on (app_id, timestamp) for resume checks, so startup
+  cost no longer grows with the number of processed snapshots
+- Marks are buffered and committed in batches of `batch_size`
+- Importer for the legacy text files, understanding `app_id|timestamp`,
+  `app_id_data|timestamp` and bare `timestamp` lines; each file is imported
+  once per app_id and re-imported only if it changed
+
+Usage:
+    with ProgressLedger("scraping_progress.sqlite") as ledger:
+        ledger.import_progress_file("scraping_progress.txt")
+        if not ledger.is_done(app_id, timestamp):
+            ...
+            ledger.mark(app_id, timestamp)
+
+Author: ISB Fintech Research Team
+Project: Comprehensive Fintech App Market Analysis
+Institution: Indian School of Business (ISB)
+"""
+
+import os
+import sqlite3
+import time
+
+STATUS_DONE = "done"
+STATUS_COMPLETE = "complete"
+
+# Timestamp used for app-level status rows (e.g. an app whose snapshots are all scraped)
+APP_LEVEL = ""
+
+
+class ProgressLedger:
+    """Indexed, batched record of scraped snapshots"""
+
+    def __init__(self, path="scraping_progress.sqlite", batch_size=100):
+        self.path = path
+        self.batch_size = batch_size
+        self.pending = {}
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS progress ("
+            "app_id TEXT NOT NULL, timestamp TEXT NOT NULL, status TEXT NOT NULL, "
+            "updated_at REAL, PRIMARY KEY (app_id, timestamp)) WITHOUT ROWID"
+        )
+        # Imports are keyed by (file, app_id): the same file imported for another
+        # app attributes its bare timestamp lines differently. (Supersedes the
+        # path-keyed "imports" table; re-importing is idempotent.)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS imported_files ("
+            "path TEXT NOT NULL, app_id TEXT NOT NULL, size INTEGER, mtime REAL, rows INTEGER, "
+            "PRIMARY KEY (path, app_id))"
+        )
+        self.db.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def status(self, app_id, timestamp):
+        """Recorded status of a snapshot, or None"""
+        key = (app_id, timestamp)
+        if key in self.pending:
+            return self.pending[key]
+        row = self.db.execute(
+            "SELECT status FROM progress WHERE app_id = ? AND timestamp = ?", key
+        ).fetchone()
+        return row[0] if row else None
+
+    def is_done(self, app_id, timestamp, status=STATUS_DONE):
+        return self.status(app_id, timestamp) == status
+
+    def mark(self, app_id, timestamp, status=STATUS_DONE):
+        """Record a snapshot's status; committed with the next batch"""
+        self.pending[(app_id, timestamp)] = status
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Commit every buffered mark in one transaction"""
+        if not self.pending:
+            return
+        now = time.time()
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO progress VALUES (?, ?, ?, ?)",
+                [(app_id, timestamp, status, now) for (app_id, timestamp), status in self.pending.items()]
+            )
+        self.pending = {}
+
+    def count(self, app_id=None, status=STATUS_DONE):
+        self.flush()
+        if app_id is None:
+            query = ("SELECT COUNT(*) FROM progress WHERE status = ? AND timestamp != ?",
+                     (status, APP_LEVEL))
+        else:
+            query = ("SELECT COUNT(*) FROM progress WHERE app_id = ? AND status = ? AND timestamp != ?",
+                     (app_id, status, APP_LEVEL))
+        return self.db.execute(*query).fetchone()[0]
+
+    def import_progress_file(self, progress_file, app_id=None):
+        """
+        Load a legacy scraping_progress*.txt file. Bare timestamp lines are
+        attributed to `app_id` (or left unattributed when it is None) and the
+        `_data` suffix used by older archive.org runs is folded into the app id.
+        Returns the number of lines imported, 0 if the file was already imported
+        for this app_id.
+        """
+        if not os.path.exists(progress_file):
+            return 0
+        stat = os.stat(progress_file)
+        key = os.path.abspath(progress_file)
+        seen = self.db.execute("SELECT size, mtime FROM imported_files WHERE path = ? AND app_id = ?",
+                               (key, app_id or "")).fetchone()
+        if seen and seen[0] == stat.st_size and seen[1] == stat.st_mtime:
+            return 0
+
+        self.flush()
+        now = time.time()
+        rows = 0
+        batch = []
+        with open(progress_file, 'r') as f, self.db:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if '|' in line:
+                    line_app, timestamp = line.split('|', 1)
+                    if line_app.endswith('_data'):
+                        line_app = line_app[:-len('_data')]
+                else:
+                    line_app, timestamp = (app_id or ""), line
+                batch.append((line_app, timestamp, STATUS_DONE, now))
+                rows += 1
+                if len(batch) >= 10000:
+                    self.db.executemany("INSERT OR IGNORE INTO progress VALUES (?, ?, ?, ?)", batch)
+                    batch = []
+            self.db.executemany("INSERT OR IGNORE INTO progress VALUES (?, ?, ?, ?)", batch)
+            self.db.execute(
+                "INSERT OR REPLACE INTO imported_files VALUES (?, ?, ?, ?, ?)",
+                (key, app_id or "", stat.st_size, stat.st_mtime, rows)
+            )
+        print(f"Imported {rows} progress entries from {progress_file} into {self.path}")
+        return rows
+
+    def close(self):
+        self.flush()
+        self.db.close()
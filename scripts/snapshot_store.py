@@ -0,0 +1,287 @@
+"""
+Content-Addressed Snapshot Store
+================================
+
+Compressed, de-duplicated storage for raw Wayback Machine HTML snapshots,
+replacing the one-uncompressed-file-per-capture layout under
+html_snapshots/{app_id}/. Snapshots are keyed by the CDX `digest` column
+(SHA-1 of the archived payload), so byte-identical captures of a Play Store
+page are stored once no matter how many timestamps point at them.
+
+Layout:
+    {root}/segments/segment-000001.pack   append-only compressed blobs
+    {root}/index.sqlite                   blob and capture index
+
+    blobs(digest, segment, offset, length, codec, raw_length)
+    captures(app_id, timestamp, digest, original_url)
+
+Key Features:
+- zstd compression when the `zstandard` package is installed, gzip otherwise
+  (the codec is recorded per blob, so stores can mix both)
+- Segments rotate at `segment_size` bytes; blobs are never rewritten
+- Index rows are only committed after the blob bytes are flushed, so a crash
+  can leave unreferenced bytes in a segment but never a dangling index entry
+- Captures can be listed per app and read back for the HTML extractors
+- CaptureDeduplicator skips downloading captures whose CDX digest is
+  already stored and reuses the earlier parsed record
+
+Usage:
+    store = SnapshotStore("html_snapshots/store")
+    digest = store.put(app_id, timestamp, html_content, digest=cdx_digest)
+    html_content = store.get_capture(app_id, timestamp)
+
+Author: ISB Fintech Research Team
+Project: Comprehensive Fintech App Market Analysis
+Institution: Indian School of Business (ISB)
+"""
+
+import base64
+import gzip
+import hashlib
+import os
+import sqlite3
+from collections import OrderedDict
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+STORE_REF_PREFIX = "snapshot-store:"
+
+
+def compute_digest(html_content):
+    """CDX-style digest (base32 SHA-1) for content that came without one"""
+    return base64.b32encode(hashlib.sha1(html_content.encode('utf-8')).digest()).decode('ascii')
+
+
+class SnapshotStore:
+    """Append-only packfile store of compressed HTML snapshots keyed by digest"""
+
+    def __init__(self, root="html_snapshots/store", segment_size=256 * 1024 * 1024,
+                 compression_level=None, sync=False):
+        self.root = root
+        self.segment_dir = os.path.join(root, "segments")
+        os.makedirs(self.segment_dir, exist_ok=True)
+        self.segment_size = segment_size
+        self.sync = sync
+        self.codec = "zstd" if zstandard else "gzip"
+        if zstandard:
+            self.compressor = zstandard.ZstdCompressor(level=compression_level or 10)
+            self.decompressor = zstandard.ZstdDecompressor()
+        else:
+            self.compression_level = compression_level or 6
+
+        self.db = sqlite3.connect(os.path.join(root, "index.sqlite"))
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            "digest TEXT PRIMARY KEY, segment INTEGER, offset INTEGER, "
+            "length INTEGER, codec TEXT, raw_length INTEGER)"
+        )
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS captures ("
+            "app_id TEXT, timestamp TEXT, digest TEXT, original_url TEXT, "
+            "PRIMARY KEY (app_id, timestamp))"
+        )
+        self.db.execute("CREATE INDEX IF NOT EXISTS captures_digest ON captures (digest)")
+        self.db.commit()
+
+        row = self.db.execute("SELECT MAX(segment) FROM blobs").fetchone()
+        self.segment = row[0] or 1
+        self.writer = None
+        self.readers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _segment_path(self, segment):
+        return os.path.join(self.segment_dir, f"segment-{segment:06d}.pack")
+
+    def _compress(self, raw):
+        if self.codec == "zstd":
+            return self.compressor.compress(raw)
+        return gzip.compress(raw, compresslevel=self.compression_level)
+
+    def _decompress(self, data, codec):
+        if codec == "zstd":
+            if not zstandard:
+                raise RuntimeError("Snapshot was stored with zstd; install the zstandard package")
+            return self.decompressor.decompress(data)
+        return gzip.decompress(data)
+
+    def _append(self, data):
+        """Append a blob to the current segment, rotating when it is full"""
+        if self.writer is None:
+            self.writer = open(self._segment_path(self.segment), 'ab')
+        offset = self.writer.tell()
+        if offset and offset + len(data) > self.segment_size:
+            self.writer.close()
+            self.segment += 1
+            self.writer = open(self._segment_path(self.segment), 'ab')
+            offset = self.writer.tell()
+        self.writer.write(data)
+        self.writer.flush()
+        if self.sync:
+            os.fsync(self.writer.fileno())
+        return self.segment, offset
+
+    def has_blob(self, digest):
+        return self.db.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone() is not None
+
+    def put(self, app_id, timestamp, html_content, digest=None, original_url=None):
+        """Store one capture and return its digest; known content is only indexed, not rewritten"""
+        digest = digest or compute_digest(html_content)
+        if not self.has_blob(digest):
+            raw = html_content.encode('utf-8')
+            data = self._compress(raw)
+            segment, offset = self._append(data)
+            self.db.execute(
+                "INSERT INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, segment, offset, len(data), self.codec, len(raw))
+            )
+        self.add_capture(app_id, timestamp, digest, original_url)
+        return digest
+
+    def add_capture(self, app_id, timestamp, digest, original_url=None):
+        """Point a capture at an already stored blob"""
+        self.db.execute(
+            "INSERT OR REPLACE INTO captures VALUES (?, ?, ?, ?)",
+            (app_id, timestamp, digest, original_url)
+        )
+        self.db.commit()
+
+    def digest_app(self, digest):
+        """App that first captured a digest, or None"""
+        row = self.db.execute(
+            "SELECT app_id FROM captures WHERE digest = ? ORDER BY timestamp LIMIT 1", (digest,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def get(self, digest):
+        """Return the HTML stored under digest, or None"""
+        row = self.db.execute(
+            "SELECT segment, offset, length, codec FROM blobs WHERE digest = ?", (digest,)
+        ).fetchone()
+        if row is None:
+            return None
+        segment, offset, length, codec = row
+        if self.writer is not None and segment == self.segment:
+            self.writer.flush()
+        reader = self.readers.get(segment)
+        if reader is None:
+            reader = self.readers[segment] = open(self._segment_path(segment), 'rb')
+        reader.seek(offset)
+        return self._decompress(reader.read(length), codec).decode('utf-8')
+
+    def get_capture(self, app_id, timestamp):
+        row = self.db.execute(
+            "SELECT digest FROM captures WHERE app_id = ? AND timestamp = ?", (app_id, timestamp)
+        ).fetchone()
+        return self.get(row[0]) if row else None
+
+    def app_ids(self):
+        return [row[0] for row in self.db.execute("SELECT DISTINCT app_id FROM captures ORDER BY app_id")]
+
+    def captures(self, app_id=None):
+        """List (app_id, timestamp, digest) capture rows, optionally for one app, in time order"""
+        if app_id is None:
+            query = self.db.execute(
+                "SELECT app_id, timestamp, digest FROM captures ORDER BY app_id, timestamp")
+        else:
+            query = self.db.execute(
+                "SELECT app_id, timestamp, digest FROM captures WHERE app_id = ? ORDER BY timestamp",
+                (app_id,))
+        return query.fetchall()
+
+    def ref(self, digest):
+        """Value stored in the CSV `html_file` column for a stored snapshot"""
+        return f"{STORE_REF_PREFIX}{digest}"
+
+    def stats(self):
+        blobs, stored, raw = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(length), 0), COALESCE(SUM(raw_length), 0) FROM blobs"
+        ).fetchone()
+        captures = self.db.execute("SELECT COUNT(*) FROM captures").fetchone()[0]
+        return {'captures': captures, 'blobs': blobs, 'raw_bytes': raw, 'stored_bytes': stored}
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        for reader in self.readers.values():
+            reader.close()
+        self.readers = {}
+        self.db.close()
+
+
+class CaptureDeduplicator:
+    """
+    Skip network fetches for CDX rows whose digest has already been fetched.
+
+    Parsed records are kept in a bounded in-memory cache for the current run;
+    digests fetched by earlier runs (or other apps) are found in the store and
+    re-parsed from disk with `extract`. Counts are split into same-app hits
+    (consecutive identical monthly captures) and cross-app hits.
+    """
+
+    def __init__(self, store, extract, max_records=10000):
+        self.store = store
+        self.extract = extract
+        self.max_records = max_records
+        self.records = OrderedDict()
+        self.owners = {}
+        self.same_app_hits = 0
+        self.cross_app_hits = 0
+        self.bytes_saved = 0
+
+    def remember(self, app_id, digest, record):
+        """Cache the parsed record of a freshly fetched capture"""
+        if not digest:
+            return
+        self.owners.setdefault(digest, app_id)
+        self.records[digest] = {k: v for k, v in record.items()
+                                if k not in ('timestamp', 'snapshot_url', 'html_file', 'app_id')}
+        self.records.move_to_end(digest)
+        if len(self.records) > self.max_records:
+            self.records.popitem(last=False)
+
+    def reuse(self, app_id, snapshot):
+        """Return a copy of the parsed record for a known digest and index the capture, else None"""
+        timestamp, original_url = snapshot[0], snapshot[1]
+        digest = snapshot[3] if len(snapshot) > 3 else None
+        if not digest:
+            return None
+
+        record = self.records.get(digest)
+        if record is None:
+            if not self.store.has_blob(digest):
+                return None
+            record = self.extract(self.store.get(digest))
+            self.owners.setdefault(digest, self.store.digest_app(digest))
+            self.remember(app_id, digest, record)
+            record = self.records[digest]
+
+        self.store.add_capture(app_id, timestamp, digest, original_url)
+        if self.owners.get(digest) == app_id:
+            self.same_app_hits += 1
+        else:
+            self.cross_app_hits += 1
+        length = snapshot[4] if len(snapshot) > 4 else ""
+        if str(length).isdigit():
+            self.bytes_saved += int(length)
+        return dict(record)
+
+    def report(self):
+        saved = self.same_app_hits + self.cross_app_hits
+        print(f"Digest dedup saved {saved} requests ({self.same_app_hits} same-app, "
+              f"{self.cross_app_hits} cross-app) and {self.bytes_saved / 1e6:.1f} MB of archived payload")
+
+
+def capture_file_name(app_id, timestamp):
+    """File-style name for a stored capture, matching the old html_snapshots naming"""
+    return f"{app_id}_{timestamp[:8]}_{timestamp[8:14]}.html"
@@ -10,20 +10,26 @@ Key Features:
 - Wayback Machine API integration for historical snapshot discovery
 - Robust proxy rotation system for distributed scraping
 - Adaptive rate limiting and retry mechanisms
+- Optional concurrent fetching (async_snapshot_fetcher), paced by the same
+  adaptive rate controller
 - SSL/TLS handling for secure connections
 - Comprehensive error handling and logging
 - HTML content extraction and storage
 
 Technical Implementation:
-- Uses custom TLSAdapter for SSL certificate handling
+- Shared pooled HTTP transport (wayback_http_transport) with TLSAdapter
+  for SSL certificate handling and connection reuse metrics
 - Implements proxy rotation using free proxy services
-- Applies exponential backoff for failed requests
+- AIMD request pacing (adaptive_rate_controller): faster while responses are
+  fast 200s, multiplicative backoff on 429/5xx/errors, honours Retry-After
 - Supports batch processing of multiple applications
-- Stores raw HTML snapshots for later processing
+- Stores raw HTML snapshots in a compressed, digest-keyed store (snapshot_store)
 
 Data Collection Process:
-1. Retrieve available snapshots from Wayback Machine CDX API
-2. Filter snapshots by status code and temporal distribution
+1. Retrieve available snapshots from Wayback Machine CDX API for all apps
+   up front (paged, resumable and cached per app by cdx_discovery)
+2. Filter snapshots by status code and sample them to the target cadence
+   (snapshot_sampling_planner), estimating requests and runtime up front
 3. Download HTML content using rotating proxies and headers
 4. Extract app metadata using BeautifulSoup parsing
 5. Store both raw HTML and structured data
@@ -42,33 +48,40 @@ Project: Comprehensive Fintech App Market Analysis
 Institution: Indian School of Business (ISB)
 """
 
-import requests
 import pandas as pd
 from bs4 import BeautifulSoup
 import random
-import time
 from datetime import datetime
-import csv
 import os
-from urllib.parse import quote
 from requests.exceptions import ConnectionError
-import ssl
-from requests.adapters import HTTPAdapter
-from urllib3.util.ssl_ import create_urllib3_context
-
-# Create a custom TLSAdapter to disable certificate verification
-class TLSAdapter(HTTPAdapter):
-    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
-        ctx = ssl.create_default_context()
-        # Disable hostname checking and certificate verification
-        ctx.check_hostname = False
-        ctx.verify_mode = ssl.CERT_NONE
-        pool_kwargs['ssl_context'] = ctx
-        return super(TLSAdapter, self).init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
-
-# Create a session and mount the adapter for HTTPS connections
-session = requests.Session()
-session.mount("https://", TLSAdapter())
+from async_snapshot_fetcher import fetch_snapshots
+from snapshot_store import CaptureDeduplicator, SnapshotStore
+from progress_ledger import APP_LEVEL, STATUS_COMPLETE, ProgressLedger
+from buffered_csv_writer import open_record_writer
+from wayback_http_transport import get_transport
+from adaptive_rate_controller import get_rate_controller
+from cdx_discovery import get_cdx_discovery, plan_discovery
+from snapshot_sampling_planner import SamplingPlanner
+
+# Wayback Machine snapshot endpoint ({WAYBACK_URL}/{timestamp}/{url})
+WAYBACK_URL = "https://web.archive.org/web"
+
+# Concurrent fetch settings: requests in flight (their rate is set by the adaptive rate controller)
+FETCH_CONCURRENCY = 8
+
+# Snapshot discovery for all apps before fetching: "concurrent" per-app
+# CDX queries (DISCOVERY_WORKERS at a time) or one "prefix" scan
+DISCOVERY_MODE = "concurrent"
+DISCOVERY_WORKERS = 8
+
+# Captures fetched per app: one per "week"/"month"/"quarter"/"year" (None: all
+# discovered), optionally capped at SAMPLES_PER_APP spread over the period
+SAMPLING_CADENCE = "month"
+SAMPLES_PER_APP = None
+
+# Record output: "csv" (app_data_{app_id}.csv) or "parquet" (one dataset partitioned by app and year)
+OUTPUT_FORMAT = "csv"
+PARQUET_ROOT = "app_data_parquet"
 
 # User agent and headers
 headers = {
@@ -91,8 +104,8 @@ def get_free_proxies():
     url = "https://free-proxy-list.net/"
     proxies = []
     try:
-        # Disable SSL verification here as well
-        response = requests.get(url, headers=headers, timeout=15, verify=False)
+        # Shared transport (SSL verification disabled here as well)
+        response = get_transport().get(url, headers=headers, timeout=15)
         soup = BeautifulSoup(response.text, 'html.parser')
         table = soup.find("table", id="proxylisttable")
         if table:
@@ -114,40 +127,47 @@ random.shuffle(PROXIES)
 if not PROXIES:
     print("Warning: No free proxies found. Requests will be made directly without proxy.")
 
+# Shared snapshot store, opened on first use
+SNAPSHOT_STORE_DIR = "html_snapshots/store"
+_snapshot_store = None
+_deduplicator = None
+_progress_ledger = None
+
+def get_snapshot_store():
+    global _snapshot_store
+    if _snapshot_store is None:
+        _snapshot_store = SnapshotStore(SNAPSHOT_STORE_DIR)
+    return _snapshot_store
+
+def get_progress_ledger():
+    """Resume ledger shared by every app processed in this run"""
+    global _progress_ledger
+    if _progress_ledger is None:
+        _progress_ledger = ProgressLedger("scraping_progress.sqlite")
+    return _progress_ledger
+
+def get_deduplicator():
+    """Digest-based dedup shared by every app processed in this run"""
+    global _deduplicator
+    if _deduplicator is None:
+        _deduplicator = CaptureDeduplicator(get_snapshot_store(), extract_app_data)
+    return _deduplicator
+
+def sampling_planner():
+    """Sampling planner for the configured cadence, timed at the controller's current request rate"""
+    return SamplingPlanner(SAMPLING_CADENCE, SAMPLES_PER_APP,
+                           seconds_per_request=1 / get_rate_controller().rate)
+
 def get_wayback_snapshots(url):
-    """Get all available snapshots from Wayback Machine for a URL"""
-    encoded_url = quote(url, safe='')
-    cdx_api_url = (
-        f"https://web.archive.org/cdx/search/cdx?url={encoded_url}"
-        "&output=json&fl=timestamp,original,statuscode,digest,length"
-        "&filter=statuscode:200&collapse=timestamp:6"
-    )
-    
-    try:
-        response = session.get(cdx_api_url, headers=headers, timeout=15)
-        if response.status_code == 200:
-            snapshots = response.json()
-            # Remove header row if present
-            if snapshots and len(snapshots) > 0:
-                return snapshots[1:]
-            return []
-        else:
-            print(f"Failed to get snapshots: {response.status_code}")
-            return []
-    except Exception as e:
-        print(f"Error getting snapshots: {e}")
-        return []
+    """Get all available snapshots from Wayback Machine for a URL (paged, resumable, cached)"""
+    return get_cdx_discovery().snapshots(url, headers=headers)
 
-def get_snapshot_content(timestamp, url, max_retries=3, base_delay=10):
-    """Get the content of a specific snapshot with retry logic and proxy support"""
-    wayback_url = f"https://web.archive.org/web/{timestamp}/{url}"
+def get_snapshot_content(timestamp, url, max_retries=3):
+    """Get the content of a specific snapshot with retry logic and proxy support, paced by the rate controller"""
+    wayback_url = f"{WAYBACK_URL}/{timestamp}/{url}"
     
     for attempt in range(max_retries):
         try:
-            delay = base_delay + random.uniform(1, 5)
-            print(f"Waiting {delay:.2f} seconds before request...")
-            time.sleep(delay)
-            
             proxy = None
             if PROXIES:
                 proxy_choice = random.choice(PROXIES)
@@ -156,22 +176,18 @@ def get_snapshot_content(timestamp, url, max_retries=3, base_delay=10):
             else:
                 print("No proxy being used.")
             
-            response = session.get(wayback_url, headers=headers, proxies=proxy, timeout=30)
+            # Waits for the next request slot; 429/5xx/errors slow the rate, Retry-After is honoured
+            response = get_rate_controller().call(
+                lambda: get_transport().get(wayback_url, headers=headers, proxies=proxy, timeout=30)
+            )
             if response.status_code == 200:
                 return response.text
             else:
                 print(f"Failed to get snapshot content: {response.status_code}")
-                base_delay *= 2  # Increase delay for next attempt
         except ConnectionError as e:
             print(f"Connection error on attempt {attempt+1}/{max_retries}: {e}")
-            wait_time = (2 ** attempt) * 60 + random.uniform(1, 30)
-            print(f"Waiting {wait_time:.2f} seconds before retrying...")
-            time.sleep(wait_time)
         except Exception as e:
             print(f"Error on attempt {attempt+1}/{max_retries}: {e}")
-            wait_time = (2 ** attempt) * 60 + random.uniform(1, 30)
-            print(f"Waiting {wait_time:.2f} seconds before retrying...")
-            time.sleep(wait_time)
     
     return None
 
@@ -327,50 +343,71 @@ def extract_app_data(html_content):
     
     return app_data
 
-def save_html_to_file(app_id, timestamp, html_content):
-    """Save the complete HTML content to a text file under a directory named with app_id"""
-    html_dir = f"html_snapshots/{app_id}"
-    if not os.path.exists(html_dir):
-        os.makedirs(html_dir)
-    
-    formatted_date = datetime.strptime(timestamp, '%Y%m%d%H%M%S').strftime('%Y%m%d_%H%M%S')
-    filename = f"{html_dir}/{app_id}_{formatted_date}.html"
-    
+def save_html_to_file(app_id, timestamp, html_content, digest=None, original_url=None):
+    """Save the complete HTML content to the content-addressed snapshot store"""
     try:
-        with open(filename, 'w', encoding='utf-8') as file:
-            file.write(html_content)
-        return filename
+        store = get_snapshot_store()
+        digest = store.put(app_id, timestamp, html_content, digest=digest, original_url=original_url)
+        return store.ref(digest)
     except Exception as e:
-        print(f"Error saving HTML to file: {e}")
+        print(f"Error saving HTML to snapshot store: {e}")
         return None
 
-def save_to_csv(app_data, csv_filename, fields):
-    """Save a single entry to CSV file"""
-    file_exists = os.path.isfile(csv_filename)
+def save_snapshot_result(app_id, snapshot, content, writer, app_data=None):
+    """
+    Store the HTML, extract app data and record progress for one snapshot.
+    `app_data` is passed instead of `content` when the digest was already fetched.
+    """
+    timestamp, original_url = snapshot[0], snapshot[1]
+    digest = snapshot[3] if len(snapshot) > 3 else None
+    readable_date = datetime.strptime(timestamp, '%Y%m%d%H%M%S').strftime('%Y-%m-%d %H:%M:%S')
+    if app_data is not None:
+        html_filename = get_snapshot_store().ref(digest)
+    elif content:
+        html_filename = save_html_to_file(app_id, timestamp, content, digest=digest, original_url=original_url)
+        app_data = extract_app_data(content)
+        get_deduplicator().remember(app_id, digest, app_data)
+    else:
+        print(f"Skipping snapshot from {readable_date} - could not retrieve content")
+        return
+
+    app_data['timestamp'] = timestamp
+    app_data['snapshot_url'] = f"https://web.archive.org/web/{timestamp}/{original_url}"
     
-    with open(csv_filename, 'a', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fields)
-        if not file_exists:
-            writer.writeheader()
+    # The ledger mark is committed by the writer once this row is fsynced
+    if html_filename:
+        app_data['html_file'] = html_filename
+        writer.writerow(app_data, progress=(app_id, timestamp))
+    else:
+        app_data['html_file'] = "Failed to save HTML"
         writer.writerow(app_data)
+    if content:
+        print(f"Data extracted and saved for snapshot from {readable_date}")
+        if html_filename:
+            print(f"HTML content saved as {html_filename}")
+    else:
+        print(f"Reused data for duplicate snapshot from {readable_date} ({digest})")
 
-def process_app(app_id):
+def process_app(app_id, concurrency=1, output_format="csv"):
+    """Scrape every snapshot of one app; concurrency > 1 switches to the asyncio fetch engine"""
     print(f"\nStarting processing for App ID: {app_id}")
     target_url = f"https://play.google.com/store/apps/details?id={app_id}"
     print(f"Target URL: {target_url}")
     
-    # Define output filenames and directory for this app
+    # Define output filenames for this app; legacy per-app progress files are imported once
     csv_filename = f"app_data_{app_id}.csv"
-    progress_file = f"scraping_progress_{app_id}.txt"
+    ledger = get_progress_ledger()
+    ledger.import_progress_file(f"scraping_progress_{app_id}.txt", app_id=app_id)
     
-    # Check if this app has already been processed (progress file exists)
-    if os.path.exists(progress_file):
+    # Check if every snapshot of this app has already been processed
+    if ledger.is_done(app_id, APP_LEVEL, STATUS_COMPLETE):
         print(f"App ID {app_id} has already been processed. Skipping...")
         return
     
     print(f"Fetching snapshots for {target_url}...")
-    snapshots = get_wayback_snapshots(target_url)
-    print(f"Found {len(snapshots)} snapshots")
+    discovered = get_wayback_snapshots(target_url)
+    snapshots = sampling_planner().select(discovered)
+    print(f"Found {len(discovered)} snapshots, {len(snapshots)} selected ({SAMPLING_CADENCE or 'all'})")
     
     fields = [
         'timestamp', 'snapshot_url', 'app_name', 'developer', 'rating', 
@@ -379,46 +416,76 @@ def process_app(app_id):
         'html_file'
     ]
     
-    processed_timestamps = set()
-    if os.path.exists(progress_file):
-        with open(progress_file, 'r') as f:
-            processed_timestamps = set(line.strip() for line in f)
-    
+    pending = []
     for i, snapshot in enumerate(snapshots):
-        timestamp = snapshot[0]
-        original_url = snapshot[1]
-        if timestamp in processed_timestamps:
-            print(f"Skipping already processed snapshot {i+1}/{len(snapshots)} from {timestamp}")
+        if ledger.is_done(app_id, snapshot[0]):
+            print(f"Skipping already processed snapshot {i+1}/{len(snapshots)} from {snapshot[0]}")
             continue
+        pending.append(snapshot)
+    
+    dedup = get_deduplicator()
+    writer = open_record_writer(output_format, csv_filename, fields, ledger=ledger,
+                                app_id=app_id, parquet_root=PARQUET_ROOT)
+    save = lambda snapshot, content, app_data=None: save_snapshot_result(
+        app_id, snapshot, content, writer, app_data
+    )
+    
+    try:
+        run_fetch_plan(app_id, pending, save, dedup, concurrency)
+    finally:
+        writer.close()
+    
+    # Complete only if discovery reached the end of the CDX listing as well
+    listed = get_cdx_discovery().is_complete(target_url)
+    if listed and snapshots and all(ledger.is_done(app_id, snapshot[0]) for snapshot in snapshots):
+        ledger.mark(app_id, APP_LEVEL, STATUS_COMPLETE)
+    ledger.flush()
+    
+    dedup.report()
+    print(f"All data has been saved to {writer.path} for App ID: {app_id}")
+
+def run_fetch_plan(app_id, pending, save, dedup, concurrency):
+    """Fetch (or reuse by digest) every pending snapshot and hand each result to save()"""
+    if concurrency > 1:
+        # Fetch one capture per unknown digest; repeats are resolved from the store afterwards
+        to_fetch, repeats, seen = [], [], set()
+        for snapshot in pending:
+            digest = snapshot[3] if len(snapshot) > 3 else None
+            app_data = dedup.reuse(app_id, snapshot)
+            if app_data is not None:
+                save(snapshot, None, app_data)
+            elif digest and digest in seen:
+                repeats.append(snapshot)
+            else:
+                seen.add(digest)
+                to_fetch.append(snapshot)
         
-        readable_date = datetime.strptime(timestamp, '%Y%m%d%H%M%S').strftime('%Y-%m-%d %H:%M:%S')
-        print(f"Processing snapshot {i+1}/{len(snapshots)} from {readable_date}...")
-        
-        content = get_snapshot_content(timestamp, original_url)
-        
-        if content:
-            html_filename = save_html_to_file(app_id, timestamp, content)
-            app_data = extract_app_data(content)
-            app_data['timestamp'] = timestamp
-            app_data['snapshot_url'] = f"https://web.archive.org/web/{timestamp}/{original_url}"
-            
-            if html_filename:
-                app_data['html_file'] = html_filename
-                with open(progress_file, 'a') as f:
-                    f.write(f"{timestamp}\n")
+        print(f"Fetching {len(to_fetch)} snapshots with concurrency={concurrency}, "
+              f"starting at {get_rate_controller().rate:.2f} req/s...")
+        fetch_snapshots(
+            to_fetch, save,
+            headers=headers, proxies=PROXIES, concurrency=concurrency, base_url=WAYBACK_URL
+        )
+        for snapshot in repeats:
+            app_data = dedup.reuse(app_id, snapshot)
+            if app_data is not None:
+                save(snapshot, None, app_data)
             else:
-                app_data['html_file'] = "Failed to save HTML"
+                save(snapshot, get_snapshot_content(snapshot[0], snapshot[1]))
+    else:
+        for i, snapshot in enumerate(pending):
+            timestamp = snapshot[0]
+            original_url = snapshot[1]
+            readable_date = datetime.strptime(timestamp, '%Y%m%d%H%M%S').strftime('%Y-%m-%d %H:%M:%S')
+            print(f"Processing snapshot {i+1}/{len(pending)} from {readable_date}...")
             
-            save_to_csv(app_data, csv_filename, fields)
-            print(f"Data extracted and saved for snapshot from {readable_date}")
-            if html_filename:
-                print(f"HTML content saved to {html_filename}")
-        else:
-            print(f"Skipping snapshot from {readable_date} - could not retrieve content")
-        
-        time.sleep(1)
-    
-    print(f"All data has been saved to {csv_filename} for App ID: {app_id}")
+            app_data = dedup.reuse(app_id, snapshot)
+            if app_data is not None:
+                save(snapshot, None, app_data)
+                continue
+            
+            content = get_snapshot_content(timestamp, original_url)
+            save(snapshot, content)
 
 def main():
     # Read the list of App IDs from the file app_id_names.txt
@@ -431,9 +498,19 @@ def main():
     
     print(f"Found {len(app_ids)} App IDs to process.")
     
+    # Discover the snapshots of every unfinished app up front (cached per app)
+    ledger = get_progress_ledger()
+    pending_apps = [app_id for app_id in app_ids if not ledger.is_done(app_id, APP_LEVEL, STATUS_COMPLETE)]
+    plan = plan_discovery(pending_apps, mode=DISCOVERY_MODE, max_workers=DISCOVERY_WORKERS, headers=headers)
+    planner = sampling_planner()
+    planner.report(planner.estimate(plan, is_done=ledger.is_done, known_digest=get_snapshot_store().has_blob))
+    
     for app_id in app_ids:
-        process_app(app_id)
-        time.sleep(5)  # Optional delay between processing different apps
+        process_app(app_id, concurrency=FETCH_CONCURRENCY, output_format=OUTPUT_FORMAT)
+    
+    get_cdx_discovery().report()
+    get_transport().report()
+    get_rate_controller().report()
 
 if __name__ == "__main__":
     main()
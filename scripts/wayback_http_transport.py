@@ -0,0 +1,226 @@
+"""
+Wayback HTTP Transport
+======================
+
+One shared, pooled HTTP client for every Wayback / archive.org scraper,
+replacing bare `requests.get(...)` calls (a new TCP + TLS handshake per CDX
+query and snapshot) and the default-sized `TLSAdapter` session of
+wayback_bulk_historical_scraper.py.
+
+Key Features:
+- One requests.Session with keep-alive connection pools sized for the
+  scrapers (pool_maxsize connections per host, reused across apps)
+- TLSAdapter (certificate verification disabled, as before) lives here
+- Connection classes that time every new connection (TCP + TLS), so each
+  run reports how many requests reused a pooled connection and the
+  handshake time that saved
+- Optional HTTP/2 via httpx (http2=True, needs `httpx[http2]`): requests
+  to web.archive.org are multiplexed over one connection. Requests with
+  per-request proxies or streamed bodies still go through the pooled
+  requests session
+
+Usage:
+    transport = get_transport()
+    response = transport.get(url, headers=headers, timeout=30)
+    transport.report()
+
+Dependencies:
+    - requests / urllib3
+    - httpx[http2] (optional)
+
+Author: ISB Fintech Research Team
+Project: Historical App Data Collection
+Institution: Indian School of Business (ISB)
+"""
+
+import ssl
+import threading
+import time
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# Connections kept per host, and hosts (incl. proxies) kept in the pool cache
+POOL_MAXSIZE = 32
+POOL_CONNECTIONS = 16
+
+
+class TransportStats:
+    """Request, new-connection and handshake counters shared by all pools"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.connect_seconds = 0.0
+        self.http2_requests = 0
+
+    def record_request(self, http2=False):
+        with self.lock:
+            self.requests += 1
+            self.http2_requests += int(http2)
+
+    def record_connection(self, seconds):
+        with self.lock:
+            self.connections += 1
+            self.connect_seconds += seconds
+
+    @property
+    def reuse_ratio(self):
+        """Share of requests served on an already open connection"""
+        return max(self.requests - self.connections, 0) / self.requests if self.requests else 0.0
+
+    @property
+    def handshake_seconds_saved(self):
+        """Reused requests times the mean cost of opening a connection"""
+        if not self.connections:
+            return 0.0
+        return max(self.requests - self.connections, 0) * self.connect_seconds / self.connections
+
+
+def _timed_pool_classes(stats):
+    """HTTP(S) connection pool classes whose connections report connect() time to stats"""
+
+    class TimedHTTPConnection(HTTPConnection):
+        def connect(self):
+            start = time.perf_counter()
+            super().connect()
+            stats.record_connection(time.perf_counter() - start)
+
+    class TimedHTTPSConnection(HTTPSConnection):
+        def connect(self):
+            # TCP connect, proxy tunnel and TLS handshake
+            start = time.perf_counter()
+            super().connect()
+            stats.record_connection(time.perf_counter() - start)
+
+    class TimedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TimedHTTPConnection
+
+    class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TimedHTTPSConnection
+
+    return {'http': TimedHTTPConnectionPool, 'https': TimedHTTPSConnectionPool}
+
+
+class TLSAdapter(HTTPAdapter):
+    """HTTPAdapter without certificate verification whose pools time new connections"""
+
+    def __init__(self, stats=None, verify_certificates=False, **kwargs):
+        self.stats = stats or TransportStats()
+        self.verify_certificates = verify_certificates
+        super().__init__(**kwargs)
+
+    def _ssl_context(self):
+        ctx = ssl.create_default_context()
+        if not self.verify_certificates:
+            # Disable hostname checking and certificate verification
+            ctx.check_hostname = False
+            ctx.verify_mode = ssl.CERT_NONE
+        return ctx
+
+    def init_poolmanager(self, connections, maxsize, block=False, **pool_kwargs):
+        pool_kwargs['ssl_context'] = self._ssl_context()
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = _timed_pool_classes(self.stats)
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        new = proxy not in self.proxy_manager
+        if new:
+            proxy_kwargs['ssl_context'] = self._ssl_context()
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        if new:
+            manager.pool_classes_by_scheme = _timed_pool_classes(self.stats)
+        return manager
+
+
+class WaybackTransport:
+    """Shared keep-alive HTTP client for the scrapers, with connection reuse metrics"""
+
+    def __init__(self, pool_maxsize=POOL_MAXSIZE, pool_connections=POOL_CONNECTIONS,
+                 verify=False, http2=False, headers=None):
+        self.stats = TransportStats()
+        self.verify = verify
+        if not verify:
+            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+        self.session = requests.Session()
+        adapter = TLSAdapter(self.stats, verify_certificates=verify,
+                             pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        if headers:
+            self.session.headers.update(headers)
+
+        self.client = None
+        if http2:
+            if httpx is None:
+                print("httpx is not installed; HTTP/2 disabled (pip install 'httpx[http2]')")
+            else:
+                self.client = httpx.Client(
+                    http2=True, verify=verify, headers=headers, follow_redirects=True,
+                    limits=httpx.Limits(max_connections=pool_maxsize,
+                                        max_keepalive_connections=pool_maxsize),
+                )
+
+    def _httpx_trace(self, tls):
+        """httpcore trace hook timing a new connection (TCP connect + TLS) for stats"""
+        started = {}
+        done_event = "connection.start_tls.complete" if tls else "connection.connect_tcp.complete"
+
+        def trace(event_name, info):
+            if event_name == "connection.connect_tcp.started":
+                started['at'] = time.perf_counter()
+            elif event_name == done_event and 'at' in started:
+                self.stats.record_connection(time.perf_counter() - started.pop('at'))
+        return trace
+
+    def get(self, url, headers=None, timeout=30, proxies=None, stream=False, **kwargs):
+        """GET through the HTTP/2 client when possible, otherwise the pooled session"""
+        if self.client is not None and not proxies and not stream:
+            trace = self._httpx_trace(url.startswith("https"))
+            response = self.client.get(url, headers=headers, timeout=timeout,
+                                       extensions={'trace': trace}, **kwargs)
+            self.stats.record_request(http2=response.http_version == "HTTP/2")
+            return response
+        # verify is passed per request: a REQUESTS_CA_BUNDLE in the environment
+        # would otherwise take precedence over session.verify
+        kwargs.setdefault('verify', self.verify)
+        response = self.session.get(url, headers=headers, timeout=timeout, proxies=proxies,
+                                    stream=stream, **kwargs)
+        self.stats.record_request()
+        return response
+
+    def report(self):
+        stats = self.stats
+        print(f"HTTP transport: {stats.requests} requests over {stats.connections} connections, "
+              f"reuse ratio {stats.reuse_ratio:.1%}, ~{stats.handshake_seconds_saved:.1f}s of "
+              f"handshakes saved ({stats.connect_seconds:.1f}s spent connecting)")
+        if stats.http2_requests:
+            print(f"HTTP/2: {stats.http2_requests} requests multiplexed")
+
+    def close(self):
+        self.session.close()
+        if self.client is not None:
+            self.client.close()
+
+
+# Shared transport, opened on first use
+HTTP2 = False
+_transport = None
+
+
+def get_transport():
+    """Transport shared by every scraper running in this process"""
+    global _transport
+    if _transport is None:
+        _transport = WaybackTransport(http2=HTTP2)
+    return _transport
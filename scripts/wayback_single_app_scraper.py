@@ -39,9 +39,9 @@ Extraction Strategy:
 
 Performance Considerations:
 - Efficient snapshot discovery via CDX API
-- Respectful request timing with delays
+- Adaptive request pacing (adaptive_rate_controller) honouring Retry-After
 - Memory-efficient streaming processing
-- Incremental CSV writing for large datasets
+- Buffered, batched CSV writing for large datasets
 
 Usage:
     # Configure target URL in script
@@ -63,51 +63,43 @@ Project: Historical Fintech App Data Collection
 Institution: Indian School of Business (ISB)
 """
 
-import requests
 import pandas as pd
-import time
 from bs4 import BeautifulSoup
 from datetime import datetime
-import csv
 import os
-from urllib.parse import quote
-
-# Disable SSL warnings
-import urllib3
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+from urllib.parse import parse_qs, urlparse
+from buffered_csv_writer import open_record_writer
+from wayback_http_transport import get_transport
+from adaptive_rate_controller import get_rate_controller
+from cdx_discovery import get_cdx_discovery
+from snapshot_sampling_planner import SamplingPlanner
 
 # Target URL
 target_url = "https://play.google.com/store/apps/details?id=com.balancehero.truebalance"
 
+# Record output: "csv" or "parquet" (dataset partitioned by app and year)
+OUTPUT_FORMAT = "csv"
+
+# Captures fetched: one per "week"/"month"/"quarter"/"year" (None: all
+# discovered), optionally capped at SAMPLES_PER_APP spread over the period
+SAMPLING_CADENCE = "month"
+SAMPLES_PER_APP = None
+
 # User agent
 user_agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 headers = {"User-Agent": user_agent}
 
 def get_wayback_snapshots(url):
-    """Get all available snapshots from Wayback Machine for a URL"""
-    encoded_url = quote(url, safe='')
-    cdx_api_url = f"https://web.archive.org/cdx/search/cdx?url={encoded_url}&output=json&fl=timestamp,original,statuscode,digest,length&filter=statuscode:200&collapse=timestamp:6"
-    
-    try:
-        response = requests.get(cdx_api_url, headers=headers, verify=False)
-        if response.status_code == 200:
-            snapshots = response.json()
-            # Remove the header row
-            if snapshots and len(snapshots) > 0:
-                return snapshots[1:]
-            return []
-        else:
-            print(f"Failed to get snapshots: {response.status_code}")
-            return []
-    except Exception as e:
-        print(f"Error getting snapshots: {e}")
-        return []
+    """Get all available snapshots from Wayback Machine for a URL (paged, resumable, cached)"""
+    return get_cdx_discovery().snapshots(url, headers=headers)
 
 def get_snapshot_content(timestamp, url):
-    """Get the content of a specific snapshot"""
+    """Get the content of a specific snapshot, paced by the rate controller"""
     wayback_url = f"https://web.archive.org/web/{timestamp}/{url}"
     try:
-        response = requests.get(wayback_url, headers=headers, verify=False, timeout=30)
+        response = get_rate_controller().call(
+            lambda: get_transport().get(wayback_url, headers=headers, timeout=30)
+        )
         if response.status_code == 200:
             return response.text
         else:
@@ -246,24 +238,14 @@ def extract_app_data(html_content):
     
     return app_data
 
-def save_to_csv(app_data, csv_filename, fields):
-    """Save a single entry to CSV file"""
-    file_exists = os.path.isfile(csv_filename)
-    
-    with open(csv_filename, 'a', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fields)
-        
-        # Write header if file doesn't exist
-        if not file_exists:
-            writer.writeheader()
-        
-        # Write the data row
-        writer.writerow(app_data)
-
 def main():
+    app_id = parse_qs(urlparse(target_url).query)['id'][0]
     print(f"Fetching snapshots for {target_url}...")
-    snapshots = get_wayback_snapshots(target_url)
-    print(f"Found {len(snapshots)} snapshots")
+    discovered = get_wayback_snapshots(target_url)
+    planner = SamplingPlanner(SAMPLING_CADENCE, SAMPLES_PER_APP, seconds_per_request=1 / get_rate_controller().rate)
+    snapshots = planner.select(discovered)
+    print(f"Found {len(discovered)} snapshots")
+    planner.report(planner.estimate({app_id: discovered}))
     
     # Create CSV file
     csv_filename = "truebalance_app_data_timeseries_main.csv"
@@ -275,6 +257,8 @@ def main():
         'version', 'size', 'content_rating'
     ]
     
+    writer = open_record_writer(OUTPUT_FORMAT, csv_filename, fields, app_id=app_id)
+    
     # Process each snapshot
     for i, snapshot in enumerate(snapshots):
         timestamp = snapshot[0]
@@ -295,17 +279,18 @@ def main():
             app_data['timestamp'] = timestamp
             app_data['snapshot_url'] = f"https://web.archive.org/web/{timestamp}/{original_url}"
             
-            # Save this entry to CSV immediately
-            save_to_csv(app_data, csv_filename, fields)
+            # Buffer this entry; rows are flushed in batches and on close
+            writer.writerow(app_data)
             
             print(f"Data extracted and saved for snapshot from {readable_date}")
         else:
             print(f"Skipping snapshot from {readable_date} - could not retrieve content")
-        
-        # Be nice to the Wayback Machine servers
-        time.sleep(1)
     
-    print(f"All data has been saved to {csv_filename}")
+    writer.close()
+    get_cdx_discovery().report()
+    get_transport().report()
+    get_rate_controller().report()
+    print(f"All data has been saved to {writer.path}")
 
 if __name__ == "__main__":
     main()